@@ -14,11 +14,37 @@ from utils.google_sheets import (
     fetch_payment_data,
     append_row,
     update_row,
-    get_gspread_client
+    open_spreadsheet,
+    get_worksheet,
+    get_sheet_cache_stats,
+    get_many_sheets,
+    get_write_queue_status,
+    flush_pending_writes,
+    get_storage_status,
+    get_source_version,
+    invalidate_sheet,
+    start_write_queue
+)
+from utils.google_calendar import (
+    get_calendar_service, get_event_cache_stats, iter_month_events, iter_range_events, load_months,
+    month_records
+)
+from utils.event_records import normalize_events
+from utils.hours_cube import HoursCube
+from utils.instructor_directory import InstructorDirectory, get_instructor_directory
+from utils.rates_store import get_month_rates, save_rates
+from utils.wage_store import DEFAULT_HOURLY_WAGE, get_wage_index, save_wages
+from utils.snapshots import SnapshotStore, fingerprint
+from utils.warmer import CacheWarmer
+from utils.calendar_push import CalendarWatch
+from utils.client_matcher import get_client_matcher
+from utils.rate_limit import (
+    PRIORITY_EXPORT,
+    PRIORITY_INTERACTIVE,
+    QuotaExceededError,
+    get_rate_limit_stats,
+    set_request_priority
 )
-from googleapiclient.discovery import build
-from google.oauth2.service_account import Credentials
-from googleapiclient.discovery import build
 import calendar as pycalendar
 import pytz
 from datetime import datetime, timedelta, date
@@ -27,6 +53,7 @@ from google.oauth2.credentials import Credentials as OAuthCredentials
 from google_auth_oauthlib.flow import InstalledAppFlow
 from google.auth.transport.requests import Request
 import pickle
+import threading
 from time import time
 
 app = Flask(__name__)
@@ -38,9 +65,56 @@ def inject_now():
     """Make 'now' available to all templates."""
     return {'now': datetime.now()}
 
+# Exports are bulk writes; page loads and edits get the quota first
+EXPORT_ENDPOINTS = {'export_billing_to_sheets', 'export_payments_to_sheets'}
+
+@app.before_request
+def set_api_priority():
+    """Give Google API calls of this request their quota priority."""
+    if request.endpoint in EXPORT_ENDPOINTS:
+        set_request_priority(PRIORITY_EXPORT)
+    else:
+        set_request_priority(PRIORITY_INTERACTIVE)
+
+@app.errorhandler(QuotaExceededError)
+def handle_quota_exceeded(e):
+    """Tell the client to retry instead of failing with a 500."""
+    response = jsonify({'success': False, 'error': str(e)})
+    response.status_code = 503
+    response.headers['Retry-After'] = str(int(e.retry_after) + 1)
+    return response
+
 # Simple in-memory cache for billing API
 billing_cache = {}  # (month, year): (timestamp, data)
-CACHE_TTL = 60  # seconds
+payment_cache = {}  # (month, year): (timestamp, data)
+hours_cubes = {}  # (month, year): (event records, HoursCube)
+CACHE_TTL = int(os.getenv("AGGREGATE_CACHE_TTL", 60))  # seconds
+
+# Computed billing persisted per month, so restarts and new workers serve
+# an unchanged month without rebuilding it from Google
+billing_snapshots = None
+if os.getenv("BILLING_SNAPSHOTS_ENABLED", "1") == "1":
+    billing_snapshots = SnapshotStore(os.getenv("BILLING_SNAPSHOT_DIR", "billing_snapshots"), 'billing')
+
+# Source reads that fell back to defaults while computing a result. A
+# result built on them is served but never persisted.
+_degraded = threading.local()
+
+def note_degraded(source):
+    """Record that a source read failed and a fallback was used."""
+    reasons = getattr(_degraded, 'sources', None)
+    if reasons is not None:
+        reasons.append(source)
+
+def drop_billing_snapshot(month, year):
+    """Forget a month's billing, in memory and on disk, after a rate change."""
+    billing_cache.pop((month, year), None)
+    if billing_snapshots is not None:
+        billing_snapshots.drop(year, month)
+
+def drop_payment_data(month, year):
+    """Forget a month's payment totals, which depend on the wages."""
+    payment_cache.pop((month, year), None)
 
 @app.route('/')
 def dashboard():
@@ -406,101 +480,32 @@ def payments():
         total_payment=payment_data.get('total_payment', 0)
     )
 
-def get_payment_data(month, year):
+def get_payment_data(month, year, use_cache=True):
     """Fetch and process payment data for a specific month and year."""
+    cache_key = (month, year)
+    if use_cache and cache_key in payment_cache:
+        ts, data = payment_cache[cache_key]
+        if time() - ts < CACHE_TTL:
+            return data
     try:
-        # Get calendar service
-        service = get_calendar_service()
-        if not service:
-            return {'records': [], 'total_hours': 0, 'total_payment': 0}
-        
-        # Calculate date range for the month
-        start_date = datetime(year, month, 1).isoformat() + 'Z'  # 'Z' indicates UTC time
-        if month == 12:
-            end_date = datetime(year + 1, 1, 1).isoformat() + 'Z'
-        else:
-            end_date = datetime(year, month + 1, 1).isoformat() + 'Z'
-        
-        # Fetch events from calendar
-        events_result = service.events().list(
-            calendarId=os.getenv('CALENDAR_ID'),
-            timeMin=start_date,
-            timeMax=end_date,
-            singleEvents=True,
-            orderBy='startTime'
-        ).execute()
-        
-        events = events_result.get('items', [])
-        
-        # Get valid clients for filtering
-        valid_clients = get_client_names_from_sheets()
-        
-        # Filter events by valid client names
-        filtered_events = []
-        for event in events:
-            title = event.get('summary', '').strip()
-            # Find matching client name anywhere in the title
-            for client in valid_clients:
-                if client in title:
-                    event['matched_client'] = client  # Store matched client name
-                    filtered_events.append(event)
-                    break
-        
-        # Process filtered events into payment data
+        # Hours of the month by instructor and client
+        cube = get_hours_cube(month, year)
+        
+        # Process the hours of known instructors into payment data
         instructor_data = {}
-        instructors_map = create_instructors_map()
-        valid_instructors = set(instructors_map.values())  # Get set of valid instructor names
+        valid_instructors = get_instructors().names
         
-        for event in filtered_events:
-            # Skip events without an organizer
-            if 'organizer' not in event or 'email' not in event['organizer']:
-                continue
-                
-            # Get instructor name from email
-            organizer_email = event['organizer']['email']
-            username = organizer_email.split('@')[0]
-            instructor_name = instructors_map.get(username, username)
-            
-            # Skip if instructor not in valid instructors
+        for instructor_name, hours, by_client in cube.by_instructor():
             if instructor_name not in valid_instructors:
                 continue
-            
-            # Calculate event duration in hours
-            start = event.get('start', {}).get('dateTime', event.get('start', {}).get('date'))
-            end = event.get('end', {}).get('dateTime', event.get('end', {}).get('date'))
-            
-            if not start or not end:
-                continue
-                
-            try:
-                start_dt = datetime.fromisoformat(start.replace('Z', '+00:00'))
-                end_dt = datetime.fromisoformat(end.replace('Z', '+00:00'))
-                duration_hours = (end_dt - start_dt).total_seconds() / 3600
-            except (ValueError, TypeError):
-                continue
-            
-            # Use the pre-matched client name from the filter
-            client_name = event.get('matched_client', 'Unknown Client')
-            
-            # Initialize instructor data if not exists
-            if instructor_name not in instructor_data:
-                # Try to get the saved hourly wage, or use default (200)
-                saved_hourly_wage = get_hourly_wage(instructor_name, month, year) or 200
-                instructor_data[instructor_name] = {
-                    'total_hours': 0,
-                    'by_client': {},
-                    'hourly_rate': saved_hourly_wage,  # Use saved rate or default
-                    'total_payment': 0
-                }
-            
-            # Update instructor data
-            instructor = instructor_data[instructor_name]
-            instructor['total_hours'] += duration_hours
-            
-            # Track hours by client
-            if client_name not in instructor['by_client']:
-                instructor['by_client'][client_name] = 0
-            instructor['by_client'][client_name] += duration_hours
+            # Try to get the saved hourly wage, or use default (200)
+            saved_hourly_wage = get_hourly_wage(instructor_name, month, year) or 200
+            instructor_data[instructor_name] = {
+                'total_hours': hours,
+                'by_client': dict(by_client),
+                'hourly_rate': saved_hourly_wage,  # Use saved rate or default
+                'total_payment': 0
+            }
         
         # Calculate total payment for each instructor
         for instructor in instructor_data.values():
@@ -529,12 +534,16 @@ def get_payment_data(month, year):
             total_hours += data['total_hours']
             total_payment += data['total_payment']
         
-        return {
+        payment_data = {
             'records': records,
             'total_hours': total_hours,
             'total_payment': total_payment
         }
+        payment_cache[cache_key] = (time(), payment_data)
+        return payment_data
         
+    except QuotaExceededError:
+        raise
     except Exception as e:
         print(f"Error getting payment data: {e}")
         return {'records': [], 'total_hours': 0, 'total_payment': 0}
@@ -589,19 +598,34 @@ def billing():
                          selected_year=selected_year,
                          years=years)
 
+def prefetch_reference_sheets():
+    """Load the client and instructor sheets in one batched request.
+
+    This primes the sheet cache, so the get_client_names_from_sheets() and
+    get_instructors() calls that follow are served locally.
+    """
+    try:
+        get_many_sheets([
+            os.getenv("clients_private_SHEET_NAME", "לקוחות פרטיים"),
+            os.getenv("clients_institutional_SHEET_NAME", "לקוחות מוסדיים"),
+            os.getenv("INSTRUCTORS_SHEET_NAME", "מדריכים")
+        ])
+    except QuotaExceededError:
+        raise
+    except Exception as e:
+        print(f"Error prefetching reference sheets: {e}")
+
 def get_client_names_from_sheets():
     """Fetch client names from both private and institutional clients sheets."""
-    from utils.google_sheets import get_sheet_data
-    
     try:
-        # Get private clients
+        # Get private and institutional clients in one request
         private_clients_sheet = os.getenv("clients_private_SHEET_NAME", "לקוחות פרטיים")
-        _, private_clients = get_sheet_data(private_clients_sheet)
+        institutional_clients_sheet = os.getenv("clients_institutional_SHEET_NAME", "לקוחות מוסדיים")
+        (_, private_clients), (_, institutional_clients) = get_many_sheets(
+            [private_clients_sheet, institutional_clients_sheet]
+        )
         private_client_names = {client.get('שם', '').strip() for client in private_clients if client.get('שם').strip()}
         
-        # Get institutional clients
-        institutional_clients_sheet = os.getenv("clients_institutional_SHEET_NAME", "לקוחות מוסדיים")
-        _, institutional_clients = get_sheet_data(institutional_clients_sheet)
         institutional_client_names = {client.get('גוף', '').strip() for client in institutional_clients if client.get('גוף').strip()}
         
         # Combine all client names
@@ -609,30 +633,36 @@ def get_client_names_from_sheets():
         print(f"DEBUG: Found {len(all_client_names)} unique client names in sheets")
         return all_client_names
         
+    except QuotaExceededError:
+        raise
     except Exception as e:
         print(f"ERROR fetching client names: {str(e)}")
         import traceback
         traceback.print_exc()
+        note_degraded('clients')
         return set()
 
-def create_instructors_map():
-    """Create a mapping of email usernames to full instructor names"""
+def get_client_name_matcher():
+    """Return the matcher for client names in event titles.
+
+    The automaton is rebuilt only when the client sheets change.
+    """
+    return get_client_matcher(get_client_names_from_sheets())
+
+def get_instructors():
+    """Return the instructor directory, rebuilt only when the sheet changes."""
     try:
         # Get the sheet name from environment variables or use a default
         sheet_name = os.getenv("INSTRUCTORS_SHEET_NAME", "מדריכים")
-        instructors = fetch_instructors(sheet_name)
-        email_to_name = {}
-        for instructor in instructors:
-            email = instructor.get('מייל', '').strip()
-            if '@' in email:
-                username = email.split('@')[0]
-                email_to_name[username] = instructor.get('שם', username)
-        return email_to_name
+        return get_instructor_directory(fetch_instructors(sheet_name))
+    except QuotaExceededError:
+        raise
     except Exception as e:
-        print(f"Error creating instructors map: {str(e)}")
+        print(f"Error loading instructors: {str(e)}")
         import traceback
         traceback.print_exc()
-        return {}
+        note_degraded('instructors')
+        return InstructorDirectory([])
 
 @app.route('/api/billing')
 def get_billing_data():
@@ -648,179 +678,9 @@ def get_billing_data():
             return jsonify(data)
     print("DEBUG: /api/billing endpoint called")
     try:
-        # Get all valid client names from Google Sheets
-        valid_client_names = get_client_names_from_sheets()
-        print(f"DEBUG: Valid client names: {valid_client_names}")
-        
-        # Create instructor mapping
-        instructors_map = create_instructors_map()
-        
-        # Calculate the date range for the selected month (in local timezone)
-        local_tz = pytz.timezone('Asia/Jerusalem')
-        start_date = local_tz.localize(datetime(year, month, 1))
-        
-        if month == 12:
-            end_date = local_tz.localize(datetime(year + 1, 1, 1))
-        else:
-            end_date = local_tz.localize(datetime(year, month + 1, 1))
-        
-        print(f"DEBUG: Date range (local time): {start_date} to {end_date}")
-        
-        # Fetch events from Google Calendar
-        events = fetch_events_from_calendar(start_date, end_date)
-        print(f"DEBUG: Found {len(events)} events before filtering")
-        
-        # Fetch rates and discounts for this month/year
-        rates_discounts = {}  # {client: {"תמחור שעה": value, "הנחה %": value}}
-        try:
-            gc = get_gspread_client()
-            spreadsheet_id = os.getenv('billing_SPREADSHEET_ID')
-            spreadsheet = gc.open_by_key(spreadsheet_id)
-            worksheet = spreadsheet.worksheet('תעריפים והנחות')
-            records = worksheet.get_all_records()
-            for record in records:
-                if str(record.get('חודש', '')).strip() == str(month) and str(record.get('שנה', '')).strip() == str(year):
-                    client = record['לקוח']
-                    typ = record['סוג']
-                    value = float(record['ערך']) if record['ערך'] else 0
-                    if client not in rates_discounts:
-                        rates_discounts[client] = {}
-                    rates_discounts[client][typ] = value
-        except Exception as e:
-            print(f"Error fetching rates/discounts: {e}")
-        
-        # Process events to group by client and calculate hours
-        client_data = {}
-        filtered_out_count = 0
-        
-        for event in events:
-            try:
-                # Get the event summary/title
-                event_summary = event.get('summary', '').strip()
-                if not event_summary:
-                    print(f"DEBUG: Skipping event with no summary")
-                    filtered_out_count += 1
-                    continue
-                
-                # Find if any client name is present in the event title
-                client_name = None
-                for name in valid_client_names:
-                    if name and name in event_summary:
-                        client_name = name
-                        break
-                
-                # Skip events that don't contain any valid client name
-                if not client_name:
-                    print(f"DEBUG: Skipping event - no matching client name found in: {event_summary}")
-                    filtered_out_count += 1
-                    continue
-                
-                print(f"DEBUG: Matched client '{client_name}' in event: {event_summary}")
-                
-                # Get organizer's email and map to instructor name
-                organizer_email = event.get('organizer', {}).get('email', '')
-                organizer_username = organizer_email.split('@')[0] if '@' in organizer_email else ''
-                instructor_name = instructors_map.get(organizer_username, organizer_username)
-                
-                # Calculate event duration in hours
-                start = parse_iso_datetime(event['start'].get('dateTime', event['start'].get('date')))
-                end = parse_iso_datetime(event['end'].get('dateTime', event['end'].get('date')))
-                
-                if not start or not end:
-                    print(f"DEBUG: Skipping event with invalid dates: {event_summary}")
-                    filtered_out_count += 1
-                    continue
-                
-                # Convert to local timezone for consistent calculation
-                if start.tzinfo is None:
-                    start = local_tz.localize(start)
-                if end.tzinfo is None:
-                    end = local_tz.localize(end)
-                
-                duration_hours = (end - start).total_seconds() / 3600
-                print(f"DEBUG: Processing event: {event_summary}, Duration: {duration_hours:.2f} hours, Instructor: {instructor_name}")
-                
-                # Initialize client data if not exists
-                if client_name not in client_data:
-                    client_data[client_name] = {
-                        'total_hours': 0,
-                        'instructors': {}
-                    }
-                
-                # Update client's total hours
-                client_data[client_name]['total_hours'] += duration_hours
-                
-                # Update instructor hours
-                if instructor_name in client_data[client_name]['instructors']:
-                    client_data[client_name]['instructors'][instructor_name] += duration_hours
-                else:
-                    client_data[client_name]['instructors'][instructor_name] = duration_hours
-                    
-            except Exception as e:
-                print(f"ERROR processing event: {str(e)}")
-                import traceback
-                traceback.print_exc()
-                filtered_out_count += 1
-                continue
-        
-        print(f"DEBUG: Processed {len(events)} events, filtered out {filtered_out_count} events")
-        print(f"DEBUG: Client data: {client_data}")
-        
-        # Convert to the format expected by the frontend
-        billing_data = []
-        for client, data in client_data.items():
-            # Create a dictionary with all required keys in the correct order
-            record = {}
-            
-            # Format instructor hours for display
-            instructor_hours = []
-            instructor_names = []
-            
-            for name, hours in data['instructors'].items():
-                instructor_hours.append(f"{hours:.1f}")
-                instructor_names.append(name)
-            
-            # Map the data to the correct columns
-            # Format values for display
-            record['לקוח'] = client  # Client name
-            record['סהכ שעות'] = round(data['total_hours'], 2)  # Total hours
-            record['לפי מדריך'] = '\n'.join(instructor_hours)  # Hours by instructor
-            record['מדריך'] = '\n'.join(instructor_names)  # Instructor names
-            # Use rates/discounts if available, else default
-            rate = 350
-            discount = 0
-            if client in rates_discounts:
-                if 'תמחור שעה' in rates_discounts[client]:
-                    rate = rates_discounts[client]['תמחור שעה']
-                if 'הנחה %' in rates_discounts[client]:
-                    discount = rates_discounts[client]['הנחה %']
-            record['תמחור שעה'] = rate
-            record['הנחה %'] = discount
-            # Calculate total based on hours * rate * (1 - discount/100)
-            record['סיכום'] = round(data['total_hours'] * rate * (1 - discount / 100), 2)
-            
-            billing_data.append(record)
-            
-            # Debug output
-            print(f"DEBUG: Added record - Client: {client}, Hours: {data['total_hours']}, Instructors: {instructor_names}, Rate: {rate}, Discount: {discount}")
-        
-        # Sort clients alphabetically
-        billing_data.sort(key=lambda x: x['לקוח'])
-        
-        # Prepare response
-        response_data = {
-            'status': 'success',
-            'data': billing_data
-        }
-        # Update cache
-        billing_cache[cache_key] = (now, response_data)
-        # Debug log the response
-        print("DEBUG: Sending response:")
-        print(f"Status: success")
-        print(f"Number of records: {len(billing_data)}")
-        if billing_data:
-            print("First record sample:", {k: billing_data[0][k] for k in billing_data[0].keys()})
-        return jsonify(response_data)
+        return jsonify(get_month_billing(month, year))
+    except QuotaExceededError:
+        raise
     except Exception as e:
         print(f"ERROR in get_billing_data: {str(e)}")
         import traceback
@@ -830,125 +690,168 @@ def get_billing_data():
             'message': str(e)
         }), 500
 
-def parse_iso_datetime(dt_str):
-    """Parse ISO datetime string to datetime object"""
-    if not dt_str:
-        return None
-    try:
-        if 'T' in dt_str:
-            return datetime.fromisoformat(dt_str.replace('Z', '+00:00'))
-        else:
-            return datetime.strptime(dt_str, '%Y-%m-%d')
-    except (ValueError, TypeError) as e:
-        print(f"Error parsing datetime {dt_str}: {str(e)}")
-        return None
+def billing_sources(month, year):
+    """Return the versions of everything a month's billing is computed from.
 
-def get_calendar_service():
-    """Get an authorized Google Calendar API service instance using service account."""
-    from google.oauth2 import service_account
-    
-    SCOPES = ['https://www.googleapis.com/auth/calendar.readonly']
-    SERVICE_ACCOUNT_FILE = os.getenv('SERVICE_ACCOUNT_FILE')
-    
-    if not SERVICE_ACCOUNT_FILE or not os.path.exists(SERVICE_ACCOUNT_FILE):
-        print(f"Error: Service account file not found at {SERVICE_ACCOUNT_FILE}")
-        return None
-    
+    The client and instructor sheets and the rates are versioned by their
+    spreadsheets. The calendar has no version per month, so it is a digest
+    of the event fields billing reads.
+    """
+    events = iter_month_events(get_calendar_service, os.getenv('CALENDAR_ID', 'primary'), year, month)
+    billing_spreadsheet_id = os.getenv('billing_SPREADSHEET_ID')
+    return {
+        'clients_and_instructors': get_source_version(os.getenv('SPREADSHEET_ID')),
+        'rates': get_source_version(billing_spreadsheet_id) if billing_spreadsheet_id else '',
+        'calendar': fingerprint([
+            [
+                event.get('summary'),
+                event.get('start'),
+                event.get('end'),
+                (event.get('organizer') or {}).get('email'),
+                (event.get('creator') or {}).get('email')
+            ]
+            for event in events
+        ])
+    }
+
+def get_month_billing(month, year):
+    """Return a month's billing, recomputing it only when a source changed."""
+    if billing_snapshots is None:
+        return compute_billing_data(month, year)
+    # Probed before computing, so a change made meanwhile shows next time
+    sources = billing_sources(month, year)
+    data = billing_snapshots.get(year, month, sources)
+    if data is not None:
+        print(f"Serving billing data of {month}/{year} from snapshot")
+        billing_cache[(month, year)] = (time(), data)
+        return data
+    _degraded.sources = []
     try:
-        # Create credentials using the service account file
-        creds = service_account.Credentials.from_service_account_file(
-            SERVICE_ACCOUNT_FILE, 
-            scopes=SCOPES
-        )
-        
-        # Create the service
-        service = build('calendar', 'v3', credentials=creds)
-        print("Successfully created Google Calendar service")
-        return service
-        
-    except Exception as e:
-        print(f"Error creating calendar service: {str(e)}")
-        import traceback
-        traceback.print_exc()
-        return None
+        data = compute_billing_data(month, year)
+    finally:
+        degraded, _degraded.sources = _degraded.sources, None
+    if degraded:
+        print(f"Not persisting billing of {month}/{year}, read with fallbacks for: {', '.join(degraded)}")
+        billing_cache.pop((month, year), None)
+    else:
+        billing_snapshots.put(year, month, sources, data)
+    return data
 
-def fetch_events_from_calendar(start_date, end_date):
-    """Fetch events from Google Calendar for the given date range"""
-    print("\n=== Starting fetch_events_from_calendar ===")
-    print(f"Start date: {start_date}, End date: {end_date}")
+def compute_billing_data(month, year):
+    """Aggregate a month of events into billing records and cache them."""
+    # Hours of the month by client and instructor
+    cube = get_hours_cube(month, year)
+    print(f"DEBUG: Aggregated {len(cube)} events of {len(cube.clients)} clients")
     
+    # Fetch rates and discounts for this month/year
+    rates_discounts = {}  # {client: {"תמחור שעה": value, "הנחה %": value}}
     try:
-        # Get the Google Calendar service
-        print("Getting calendar service...")
-        service = get_calendar_service()
-        
-        if not service:
-            print("❌ Failed to get calendar service")
-            return []
-            
-        print("✅ Successfully got calendar service")
-        
-        # Get the calendar ID from environment variables
-        calendar_id = os.getenv('CALENDAR_ID', 'primary')
-        print(f"Using calendar ID: {calendar_id}")
-        
-        # Format dates for the API (in UTC, without timezone offset)
-        time_min = start_date.astimezone(pytz.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
-        time_max = end_date.astimezone(pytz.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
-        
-        print(f"\n🔍 Fetching events from {time_min} to {time_max}")
-        
-        # Prepare the API request
-        request = service.events().list(
-            calendarId=calendar_id,
-            timeMin=time_min,
-            timeMax=time_max,
-            singleEvents=True,
-            orderBy='startTime',
-            maxResults=1000
-        )
-        
-        print("\n📡 Sending API request...")
-        print(f"Request URL: {request.uri}")
-        print(f"Request method: {request.method}")
-        print(f"Request headers: {request.headers}")
-        
-        # Execute the request
-        events_result = request.execute()
-        
-        print("\n✅ API Response received")
-        print(f"Response keys: {list(events_result.keys())}")
-        
-        items = events_result.get('items', [])
-        print(f"\n📅 Found {len(items)} events in calendar {calendar_id}")
-        
-        # Debug: Print event details
-        if not items:
-            print("No events found in the specified date range")
-        else:
-            print("\n=== First 3 events ===")
-            for i, item in enumerate(items[:3]):
-                summary = item.get('summary', 'No title')
-                start = item.get('start', {})
-                end = item.get('end', {})
-                print(f"\nEvent {i+1}:")
-                print(f"  Summary: {summary}")
-                print(f"  Start: {start.get('dateTime', start.get('date', 'No start date'))}")
-                print(f"  End: {end.get('dateTime', end.get('date', 'No end date'))}")
-                print(f"  Status: {item.get('status', 'No status')}")
-        
-        print("\n=== End of fetch_events_from_calendar ===\n")
-        return items
-        
+        rates_discounts = get_month_rates(year, month)
+    except QuotaExceededError:
+        raise
     except Exception as e:
-        print("\n❌ Error in fetch_events_from_calendar:")
-        print(f"Error type: {type(e).__name__}")
-        print(f"Error message: {str(e)}")
-        print("\nStack trace:")
-        import traceback
-        traceback.print_exc()
-        print("\n=== End of error ===\n")
-        return []
+        print(f"Error fetching rates/discounts: {e}")
+        note_degraded('rates')
+    
+    # Convert to the format expected by the frontend
+    billing_data = []
+    for client, total_hours, by_instructor in cube.by_client():
+        # Create a dictionary with all required keys in the correct order
+        record = {}
+        
+        # Format instructor hours for display
+        instructor_hours = [f"{hours:.1f}" for name, hours in by_instructor]
+        instructor_names = [name for name, hours in by_instructor]
+        
+        # Map the data to the correct columns
+        # Format values for display
+        record['לקוח'] = client  # Client name
+        record['סהכ שעות'] = round(total_hours, 2)  # Total hours
+        record['לפי מדריך'] = '\n'.join(instructor_hours)  # Hours by instructor
+        record['מדריך'] = '\n'.join(instructor_names)  # Instructor names
+        # Use rates/discounts if available, else default
+        rate = 350
+        discount = 0
+        if client in rates_discounts:
+            if 'תמחור שעה' in rates_discounts[client]:
+                rate = rates_discounts[client]['תמחור שעה']
+            if 'הנחה %' in rates_discounts[client]:
+                discount = rates_discounts[client]['הנחה %']
+        record['תמחור שעה'] = rate
+        record['הנחה %'] = discount
+        # Calculate total based on hours * rate * (1 - discount/100)
+        record['סיכום'] = round(total_hours * rate * (1 - discount / 100), 2)
+        
+        billing_data.append(record)
+        
+        # Debug output
+        print(f"DEBUG: Added record - Client: {client}, Hours: {total_hours}, Instructors: {instructor_names}, Rate: {rate}, Discount: {discount}")
+    
+    # Sort clients alphabetically
+    billing_data.sort(key=lambda x: x['לקוח'])
+    
+    # Prepare response
+    response_data = {
+        'status': 'success',
+        'data': billing_data
+    }
+    # Update cache
+    billing_cache[(month, year)] = (time(), response_data)
+    # Debug log the response
+    print("DEBUG: Sending response:")
+    print(f"Status: success")
+    print(f"Number of records: {len(billing_data)}")
+    if billing_data:
+        print("First record sample:", {k: billing_data[0][k] for k in billing_data[0].keys()})
+    return response_data
+
+def fetch_events_from_calendar(start_date, end_date, projection='aggregate', use_cache=True):
+    """Stream events from Google Calendar for the given date range.
+
+    Events are read month by month through the shared event cache, so
+    every route reuses the same download of a month and drilling into a
+    client or instructor is a local filter. 'aggregate' events carry only
+    the fields billing and payments use; pass 'display' for the
+    description, location and attendees as well.
+    """
+    calendar_id = os.getenv('CALENDAR_ID', 'primary')
+    return iter_range_events(
+        get_calendar_service, calendar_id, start_date, end_date, use_cache=use_cache, projection=projection
+    )
+
+def prefetch_month_events(months, projection='aggregate', use_cache=True):
+    """Load the events of several (month, year)s concurrently into the event cache."""
+    load_months(
+        get_calendar_service, os.getenv('CALENDAR_ID', 'primary'),
+        [(year, month) for month, year in months], use_cache=use_cache, projection=projection
+    )
+
+def get_event_records(month, year, projection='aggregate'):
+    """Return a month's events as EventRecords.
+
+    Titles are matched to clients and organizers (or creators) to
+    instructors once per download of the month; the records are cached
+    with the month's events and rebuilt when the client or instructor
+    sheets change.
+    """
+    prefetch_reference_sheets()
+    client_matcher = get_client_name_matcher()
+    instructors = get_instructors()
+    return month_records(
+        get_calendar_service, os.getenv('CALENDAR_ID', 'primary'), year, month,
+        lambda events: normalize_events(events, client_matcher, instructors),
+        (client_matcher, instructors), projection=projection
+    )
+
+def get_hours_cube(month, year):
+    """Return the month's HoursCube, rebuilt only when its records change."""
+    event_records = get_event_records(month, year)
+    cached = hours_cubes.get((month, year))
+    if cached is not None and cached[0] is event_records:
+        return cached[1]
+    cube = HoursCube.from_records(event_records)
+    hours_cubes[(month, year)] = (event_records, cube)
+    return cube
 
 @app.route('/calendar')
 def calendar_page():
@@ -957,80 +860,23 @@ def calendar_page():
     month = int(request.args.get('month', now.month))
     year = int(request.args.get('year', now.year))
 
-    # Google Calendar API setup
-    SERVICE_ACCOUNT_FILE = os.getenv('SERVICE_ACCOUNT_FILE')
-    CALENDAR_ID = os.getenv('CALENDAR_ID')
-    SCOPES = ['https://www.googleapis.com/auth/calendar']
-
-    # Get all clients for filtering (both private and institutional)
-    # Get private clients
-    private_clients_sheet = os.getenv("clients_private_SHEET_NAME")
-    _, private_clients = get_sheet_data(private_clients_sheet)
-    private_client_names = [client.get('שם', '').strip() for client in private_clients if client.get('שם')]
-    
-    # Get institutional clients
-    institutional_clients_sheet = os.getenv("clients_institutional_SHEET_NAME")
-    _, institutional_clients = get_sheet_data(institutional_clients_sheet)
-    institutional_client_names = [client.get('גוף', '').strip() for client in institutional_clients if client.get('גוף')]
-    
-    # Combine all client names
-    all_client_names = private_client_names + institutional_client_names
-    
-    # Get instructors data for name mapping
-    instructors_sheet = os.getenv("INSTRUCTORS_SHEET_NAME")
-    _, instructors = get_sheet_data(instructors_sheet)
-    
-    # Create a mapping of instructor emails to their names
-    email_to_name = {}
-    for instructor in instructors:
-        if 'מייל' in instructor and 'שם' in instructor:
-            email = instructor['מייל'].strip().lower()
-            name = instructor['שם'].strip()
-            if email and name:
-                email_to_name[email] = name
-    
-    credentials = Credentials.from_service_account_file(SERVICE_ACCOUNT_FILE, scopes=SCOPES)
-    service = build('calendar', 'v3', credentials=credentials)
-
-    # Get start/end of month
-    start_date = datetime(year, month, 1, tzinfo=pytz.timezone('Asia/Jerusalem'))
-    if month == 12:
-        end_date = datetime(year + 1, 1, 1, tzinfo=pytz.timezone('Asia/Jerusalem'))
-    else:
-        end_date = datetime(year, month + 1, 1, tzinfo=pytz.timezone('Asia/Jerusalem'))
-
-    # Fetch events
-    events_result = service.events().list(
-        calendarId=CALENDAR_ID,
-        timeMin=start_date.isoformat(),
-        timeMax=end_date.isoformat(),
-        singleEvents=True,
-        orderBy='startTime'
-    ).execute()
+    # Events of the month, normalized once and cached with the events
+    event_records = get_event_records(month, year, projection='display')
+    instructor_names = get_instructors().names
 
     # Group events by day
     events_by_day = {}
-    for event in events_result.get('items', []):
-        title = event.get('summary', '')
-        
-        # Find the client name in the title (if any)
-        client_in_title = None
-        for client_name in all_client_names:
-            if client_name and client_name in title:
-                client_in_title = client_name
-                break
-                
+    for record in event_records:
         # Skip events that don't have any client name (private or institutional) in the title
-        if not client_in_title:
+        if not record.client:
             continue
-            
+        
+        event = record.event
+        title = event.get('summary', '')
+        client_in_title = record.client
         start = event['start'].get('dateTime', event['start'].get('date'))
-        try:
-            dt = datetime.fromisoformat(start.replace('Z', '+00:00'))
-        except Exception:
-            dt = datetime.strptime(start, "%Y-%m-%d")
-        day = dt.day
-        time_str = dt.strftime('%H:%M') if 'T' in start else ''
+        day = record.start.day
+        time_str = '' if record.all_day else record.start.strftime('%H:%M')
         
         if day not in events_by_day:
             events_by_day[day] = []
@@ -1038,20 +884,11 @@ def calendar_page():
         # Store both the display title and full event data
         # Ensure all values are JSON serializable
         
-        # Get creator's/organizer's email if available
-        creator_email = ''
-        creator_name = 'לא צוין'
-        
-        # First try to get from organizer (this works for Microsoft accounts)
-        if 'organizer' in event and 'email' in event['organizer']:
-            creator_email = event['organizer']['email']
-            # Get instructor name from email if available
-            creator_name = email_to_name.get(creator_email.lower(), creator_email)
-        # If no organizer or couldn't map to a name, try creator (this works for Gmail)
-        elif 'creator' in event and 'email' in event['creator']:
-            creator_email = event['creator']['email']
-            # Get instructor name from email if available
-            creator_name = email_to_name.get(creator_email.lower(), creator_email)
+        # Organizer's (or else creator's) email, and the instructor it belongs to
+        creator_email = record.email
+        creator_name = creator_email or 'לא צוין'
+        if record.instructor in instructor_names:
+            creator_name = record.instructor
         
         # Get end time for duration calculation
         end = event['end'].get('dateTime', event['end'].get('date'))
@@ -1174,10 +1011,9 @@ def export_billing_to_sheets():
         ]
         worksheet_name = f"{hebrew_months[month-1]} {year}"
         
-        # Get Google Sheets client
-        gc = get_gspread_client()
+        # Get the (pooled) billing spreadsheet
         spreadsheet_id = os.getenv('billing_SPREADSHEET_ID')
-        spreadsheet = gc.open_by_key(spreadsheet_id)
+        spreadsheet = open_spreadsheet(spreadsheet_id)
         
         # Define headers in the specified RTL order (excluding 'מספר' column)
         headers = [
@@ -1187,7 +1023,9 @@ def export_billing_to_sheets():
         
         # Try to get the worksheet, create if it doesn't exist
         try:
-            worksheet = spreadsheet.worksheet(worksheet_name)
+            # Reopened, since the row count is used below and the rows of
+            # this worksheet are deleted and appended on every export
+            worksheet = get_worksheet(worksheet_name, spreadsheet_id, refresh=True)
             worksheet_fresh = False
         except gspread.exceptions.WorksheetNotFound:
             # Create a new worksheet with headers and formatting (only 7 columns A-G)
@@ -1490,6 +1328,8 @@ def export_billing_to_sheets():
                     'backgroundColor': {'red': 1.0, 'green': 1.0, 'blue': 1.0}  # White background
                 })
         
+        invalidate_sheet(worksheet_name, spreadsheet_id)
+        
         return jsonify({
             'success': True,
             'message': f'Data exported successfully to {worksheet_name}'
@@ -1516,41 +1356,18 @@ def get_rates_discounts():
         ]
         month_name = hebrew_months[month - 1]
         
-        # Get Google Sheets client
-        gc = get_gspread_client()
-        spreadsheet_id = os.getenv('billing_SPREADSHEET_ID')
+        # All overrides of the month, from the indexed worksheet
+        filtered_records = [
+            {'לקוח': client, 'חודש': month, 'שנה': year, 'סוג': typ, 'ערך': value}
+            for client, values in get_month_rates(year, month).items()
+            for typ, value in values.items()
+        ]
+        
+        return jsonify({
+            'success': True,
+            'data': filtered_records
+        })
         
-        try:
-            spreadsheet = gc.open_by_key(spreadsheet_id)
-            worksheet = spreadsheet.worksheet('תעריפים והנחות')
-            records = worksheet.get_all_records()
-            
-            # Filter records for the requested month and year (compare numeric months)
-            filtered_records = [
-                {
-                    'לקוח': record['לקוח'],
-                    'חודש': record['חודש'],
-                    'שנה': record['שנה'],
-                    'סוג': record['סוג'],
-                    'ערך': float(record['ערך']) if record['ערך'] else 0
-                }
-                for record in records
-                if str(record.get('חודש', '')).strip() == str(month) 
-                and str(record.get('שנה', '')).strip() == str(year)
-            ]
-            
-            return jsonify({
-                'success': True,
-                'data': filtered_records
-            })
-            
-        except gspread.exceptions.WorksheetNotFound:
-            # If worksheet doesn't exist, return empty list
-            return jsonify({
-                'success': True,
-                'data': []
-            })
-            
     except Exception as e:
         print(f"Error fetching rates and discounts: {str(e)}")
         return jsonify({
@@ -1562,104 +1379,49 @@ def get_rates_discounts():
 def save_rate_discount():
     try:
         data = request.json
-        client_name = data.get('client_name')
-        change_type = data.get('change_type')  # 'תמחור שעה' or 'הנחה %'
-        new_value = float(data.get('new_value', 0))
-        month = int(data.get('month'))
-        year = int(data.get('year'))
-        
-        if not client_name or not change_type:
-            return jsonify({'success': False, 'error': 'חסרים פרטים נדרשים'}), 400
+        # One change, or {'changes': [...]} to save several in one request
+        changes = []
+        for change in data.get('changes') or [data]:
+            client_name = change.get('client_name')
+            change_type = change.get('change_type')  # 'תמחור שעה' or 'הנחה %'
+            if not client_name or not change_type:
+                return jsonify({'success': False, 'error': 'חסרים פרטים נדרשים'}), 400
+            changes.append((
+                int(change.get('year')),
+                int(change.get('month')),
+                client_name,
+                change_type,
+                float(change.get('new_value', 0))
+            ))
         
         # Get Hebrew month name
         hebrew_months = [
             'ינואר', 'פברואר', 'מרץ', 'אפריל', 'מאי', 'יוני',
             'יולי', 'אוגוסט', 'ספטמבר', 'אוקטובר', 'נובמבר', 'דצמבר'
         ]
-        month_name = hebrew_months[month - 1]
-        
-        # Get Google Sheets client
-        gc = get_gspread_client()
-        spreadsheet_id = os.getenv('billing_SPREADSHEET_ID')
-        spreadsheet = gc.open_by_key(spreadsheet_id)
-        
-        # Get or create the "תעריפים והנחות" worksheet
-        try:
-            worksheet = spreadsheet.worksheet('תעריפים והנחות')
-        except gspread.exceptions.WorksheetNotFound:
-            # Create the worksheet if it doesn't exist
-            worksheet = spreadsheet.add_worksheet(title='תעריפים והנחות', rows=1000, cols=5)
-            # Add headers
-            headers = ['לקוח', 'חודש', 'שנה', 'סוג', 'ערך']
-            worksheet.append_row(headers)
-            
-            # Format headers
-            header_format = {
-                'textFormat': {'bold': True},
-                'backgroundColor': {'red': 0.9, 'green': 0.9, 'blue': 0.9},
-                'horizontalAlignment': 'CENTER',
-                'verticalAlignment': 'MIDDLE'
-            }
-            worksheet.format('A1:E1', header_format)
-        
-        # Get all records
-        records = worksheet.get_all_records()
-        existing_row = None
-        
-        # Find if a matching record already exists
-        for i, record in enumerate(records, start=2):  # Start from row 2 (1-based)
-            try:
-                if (record['לקוח'] == client_name and 
-                    str(record['חודש']) == str(month) and 
-                    str(record['שנה']) == str(year) and 
-                    record['סוג'] == change_type):
-                    
-                    existing_row = i
-                    break
-            except Exception as e:
-                print(f"Error checking row {i}: {str(e)}")
-                continue
         
-        # Determine the default value based on change_type
-        default_value = 0.0  # Default for הנחה %
-        if change_type == 'תמחור שעה':
-            default_value = 350.0  # Default for תמחור שעה
-        
-        # If the new value is the same as default, we'll remove the row if it exists
-        if abs(new_value - default_value) < 0.01:  # Using a small epsilon for float comparison
-            if existing_row:
-                # Delete the row
-                worksheet.delete_rows(existing_row)
-                return jsonify({
-                    'success': True,
-                    'message': f'{change_type} הוסר עבור {client_name} ({month_name} {year}) (הוחזר לערך ברירת מחדל)'
-                })
+        # Upsert by key in one round trip; a default value removes the row
+        results = save_rates(changes)
+        
+        messages = []
+        for (year, month, client_name, change_type, new_value), result in zip(changes, results):
+            month_name = hebrew_months[month - 1]
+            if result != 'unchanged':
+                drop_billing_snapshot(month, year)
+            if result == 'removed':
+                messages.append(f'{change_type} הוסר עבור {client_name} ({month_name} {year}) (הוחזר לערך ברירת מחדל)')
+            elif result == 'unchanged':
+                messages.append(f'לא נדרש עדכון - {change_type} כבר בערך ברירת המחדל עבור {client_name} ({month_name} {year})')
             else:
-                # No row to delete and no action needed as it's already default
-                return jsonify({
-                    'success': True,
-                    'message': f'לא נדרש עדכון - {change_type} כבר בערך ברירת המחדל עבור {client_name} ({month_name} {year})'
-                })
-        
-        # If we have a non-default value, update or insert the row
-        if existing_row:
-            # Update existing row
-            worksheet.update_cell(existing_row, 5, new_value)  # Column 5 is 'ערך'
-        else:
-            # Insert new row
-            worksheet.append_row([
-                client_name,  # לקוח
-                str(month),   # חודש (numeric)
-                str(year),    # שנה
-                change_type,  # סוג (תמחור שעה / הנחה %)
-                new_value     # ערך
-            ])
-        
+                messages.append(f'{change_type} עודכן ל-{new_value} עבור {client_name} ({month_name} {year})')
         return jsonify({
             'success': True,
-            'message': f'{change_type} עודכן ל-{new_value} עבור {client_name} ({month_name} {year})'
+            'message': '\n'.join(messages),
+            'results': results
         })
         
+    except QuotaExceededError:
+        raise
     except Exception as e:
         print(f"Error saving rate and discount: {str(e)}")
         return jsonify({
@@ -1680,53 +1442,28 @@ def get_client_events():
         if not client_name:
             return jsonify({'status': 'error', 'message': 'Client name is required'}), 400
         
-        # Calculate the date range for the selected month (in local timezone)
-        local_tz = pytz.timezone('Asia/Jerusalem')
-        start_date = local_tz.localize(datetime(year, month, 1))
-        
-        if month == 12:
-            end_date = local_tz.localize(datetime(year + 1, 1, 1))
-        else:
-            end_date = local_tz.localize(datetime(year, month + 1, 1))
-        
-        # Fetch events from Google Calendar
-        events = fetch_events_from_calendar(start_date, end_date)
-        
-        # Create instructor mapping
-        instructors_map = create_instructors_map()
+        # Events of the month, normalized once and cached with the events
+        event_records = get_event_records(month, year)
         
         # Filter and process events for this client
         client_events = []
         
-        for event in events:
-            event_summary = event.get('summary', '').strip()
-            if client_name in event_summary:
-                # Get organizer's email and map to instructor name
-                organizer_email = event.get('organizer', {}).get('email', '')
-                organizer_username = organizer_email.split('@')[0] if '@' in organizer_email else ''
-                instructor_name = instructors_map.get(organizer_username, organizer_username)
-                
-                # Get event times
-                start = parse_iso_datetime(event['start'].get('dateTime', event['start'].get('date')))
-                end = parse_iso_datetime(event['end'].get('dateTime', event['end'].get('date')))
-                
-                if not start or not end:
-                    continue
-                
-                # Convert to local timezone for consistent display
-                if start.tzinfo is None:
-                    start = local_tz.localize(start)
-                if end.tzinfo is None:
-                    end = local_tz.localize(end)
-                
-                duration_hours = (end - start).total_seconds() / 3600
-                
+        # Attribute events the way billing does, so 'לקוח 1' does not
+        # pick up the events of 'לקוח 12'
+        known_client = client_name in get_client_name_matcher().names
+        
+        for record in event_records:
+            if known_client:
+                matches = record.client == client_name
+            else:
+                matches = client_name in record.summary
+            if matches:
                 client_events.append({
-                    'summary': event_summary,
-                    'instructor': instructor_name,
-                    'start': start.isoformat(),
-                    'end': end.isoformat(),
-                    'duration_hours': duration_hours
+                    'summary': record.summary,
+                    'instructor': record.instructor,
+                    'start': record.start.isoformat(),
+                    'end': record.end.isoformat(),
+                    'duration_hours': record.hours
                 })
         
         return jsonify({
@@ -1754,85 +1491,24 @@ def get_instructor_events():
         if not instructor_name:
             return jsonify({'error': 'Instructor name is required'}), 400
         
-        # Calculate date range for the month
-        start_date = datetime(year, month, 1).isoformat() + 'Z'
-        if month == 12:
-            end_date = datetime(year + 1, 1, 1).isoformat() + 'Z'
-        else:
-            end_date = datetime(year, month + 1, 1).isoformat() + 'Z'
+        # Events of the month, normalized once and cached with the events
+        event_records = get_event_records(month, year)
         
-        # Fetch events from calendar
-        service = get_calendar_service()
-        if not service:
-            return jsonify({'error': 'Failed to connect to Google Calendar'}), 500
-            
-        events_result = service.events().list(
-            calendarId=os.getenv('CALENDAR_ID'),
-            timeMin=start_date,
-            timeMax=end_date,
-            singleEvents=True,
-            orderBy='startTime'
-        ).execute()
-        
-        events = events_result.get('items', [])
-        
-        # Get valid client names from sheets
-        valid_client_names = get_client_names_from_sheets()
-        print(f"DEBUG: Found {len(valid_client_names)} valid client names")
+        # The instructor may be given by name, email or username
+        instructor_name = get_instructors().lookup(instructor_name) or instructor_name
         
-        # Filter events for this instructor with valid client names
+        # Events of this instructor with a valid client name in the title
         instructor_events = []
-        instructors_map = create_instructors_map()
-        
-        for event in events:
-            # Skip events without an organizer
-            if 'organizer' not in event or 'email' not in event['organizer']:
+        for record in event_records:
+            if record.instructor != instructor_name or not record.client:
                 continue
-                
-            # Get instructor name from email
-            organizer_email = event['organizer']['email']
-            username = organizer_email.split('@')[0]
-            event_instructor = instructors_map.get(username, username)
-            
-            if event_instructor == instructor_name:
-                event_title = event.get('summary', '').strip()
-                
-                # Check if event title contains any valid client name
-                client_in_title = any(
-                    client_name in event_title
-                    for client_name in valid_client_names
-                    if client_name  # Skip empty client names
-                )
-                
-                if not client_in_title:
-                    print(f"DEBUG: Skipping event - no valid client in title: {event_title}")
-                    continue
-                    
-                # Format event data
-                start = event.get('start', {}).get('dateTime', event.get('start', {}).get('date'))
-                end = event.get('end', {}).get('dateTime', event.get('end', {}).get('date'))
-                
-                try:
-                    start_dt = datetime.fromisoformat(start.replace('Z', '+00:00'))
-                    end_dt = datetime.fromisoformat(end.replace('Z', '+00:00'))
-                    duration_hours = (end_dt - start_dt).total_seconds() / 3600
-                    
-                    # Find the client name that matches the event title
-                    client_name = next(
-                        (name for name in valid_client_names if name in event_title),
-                        event_title  # Fallback to event title if no exact match found
-                    )
-                    
-                    instructor_events.append({
-                        'title': event_title,
-                        'date': start_dt.strftime('%d/%m/%Y'),
-                        'time': f"{start_dt.strftime('%H:%M')} - {end_dt.strftime('%H:%M')}",
-                        'duration': f"{duration_hours:.1f}",
-                        'client': client_name
-                    })
-                except (ValueError, AttributeError) as e:
-                    print(f"Error processing event time: {e}")
-                    continue
+            instructor_events.append({
+                'title': record.summary,
+                'date': record.start.strftime('%d/%m/%Y'),
+                'time': f"{record.start.strftime('%H:%M')} - {record.end.strftime('%H:%M')}",
+                'duration': f"{record.hours:.1f}",
+                'client': record.client
+            })
         
         return jsonify({
             'success': True,
@@ -1846,6 +1522,43 @@ def get_instructor_events():
             'error': str(e)
         }), 500
 
+@app.route('/api/hours_summary')
+def get_hours_summary():
+    """Hours by client and by instructor for a month, or a whole year."""
+    try:
+        year = int(request.args.get('year', datetime.now().year))
+        month = request.args.get('month')
+        if month:
+            cube = get_hours_cube(int(month), year)
+        else:
+            # Year rollup of the monthly cubes; the months' events are
+            # downloaded concurrently first
+            months = [(m, year) for m in range(1, 13)]
+            prefetch_month_events(months)
+            cube = HoursCube.combine(get_hours_cube(m, y) for m, y in months)
+        
+        return jsonify({
+            'status': 'success',
+            'data': {
+                'total_hours': round(cube.total_hours, 2),
+                'clients': [
+                    {'client': client, 'hours': round(hours, 2), 'by_instructor': dict(by_instructor)}
+                    for client, hours, by_instructor in cube.by_client()
+                ],
+                'instructors': [
+                    {'instructor': instructor, 'hours': round(hours, 2), 'by_client': dict(by_client)}
+                    for instructor, hours, by_client in cube.by_instructor()
+                ]
+            }
+        })
+        
+    except Exception as e:
+        print(f"ERROR in get_hours_summary: {str(e)}")
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
+
 @app.route('/api/export_payments', methods=['POST'])
 def export_payments_to_sheets():
     try:
@@ -1864,13 +1577,11 @@ def export_payments_to_sheets():
         ]
         worksheet_name = f"{hebrew_months[month-1]} {year}"
         
-        # Get Google Sheets client
-        gc = get_gspread_client()
         spreadsheet_id = os.getenv('payment_SPREADSHEET_ID')
         if not spreadsheet_id:
             return jsonify({'success': False, 'error': 'Payment spreadsheet ID not configured'}), 500
             
-        spreadsheet = gc.open_by_key(spreadsheet_id)
+        spreadsheet = open_spreadsheet(spreadsheet_id)
         
         # Define headers in the specified RTL order
         headers = [
@@ -1879,7 +1590,7 @@ def export_payments_to_sheets():
         
         # Try to get the worksheet, create if it doesn't exist
         try:
-            worksheet = spreadsheet.worksheet(worksheet_name)
+            worksheet = get_worksheet(worksheet_name, spreadsheet_id, refresh=True)
             # Clear existing content while preserving the worksheet
             if worksheet.row_count > 0:
                 worksheet.clear()
@@ -2036,6 +1747,8 @@ def export_payments_to_sheets():
         worksheet.freeze(1, 0)  # Freeze header row
         worksheet.set_basic_filter()  # Add filter to header row
         
+        invalidate_sheet(worksheet_name, spreadsheet_id)
+        
         return jsonify({
             'success': True,
             'message': f'Data exported successfully to {worksheet_name}'
@@ -2049,61 +1762,13 @@ def export_payments_to_sheets():
         }), 500
 
 def save_hourly_wage(instructor_name, month, year, hourly_wage):
-    """Save the hourly wage to Google Sheets."""
+    """Save the hourly wage to Google Sheets (the default wage removes it)."""
     try:
-        # Get Google Sheets client
-        gc = get_gspread_client()
-        spreadsheet_id = os.getenv('payment_SPREADSHEET_ID')
-        
-        if not spreadsheet_id:
-            raise Exception('payment_SPREADSHEET_ID not found in environment variables')
-        
-        # Open the spreadsheet
-        spreadsheet = gc.open_by_key(spreadsheet_id)
-        
-        # Try to open the 'שכר שעה' worksheet, create if it doesn't exist
-        try:
-            worksheet = spreadsheet.worksheet('שכר שעה')
-        except gspread.WorksheetNotFound:
-            # Create the worksheet with headers if it doesn't exist
-            worksheet = spreadsheet.add_worksheet(title='שכר שעה', rows=1000, cols=5)
-            # Add headers
-            worksheet.append_row(['מדריך', 'חודש', 'שנה', 'שכר שעה', 'תאריך עדכון'])
-            return True  # No need to do anything else if the worksheet was just created
-        
-        # Get all records
-        records = worksheet.get_all_records()
-        
-        # Check if there's an existing record for this instructor, month, and year
-        row_num = None
-        for i, record in enumerate(records, start=2):  # Start from row 2 (1-based)
-            if (str(record.get('מדריך', '')).strip() == instructor_name and 
-                int(record.get('חודש', 0)) == month and 
-                int(record.get('שנה', 0)) == year):
-                row_num = i
-                break
-        
-        DEFAULT_HOURLY_WAGE = 200  # Default hourly wage
-        
-        # If the wage is the default value, remove the record if it exists
-        if abs(float(hourly_wage) - DEFAULT_HOURLY_WAGE) < 0.01:  # Using a small epsilon for float comparison
-            if row_num:
-                worksheet.delete_rows(row_num)
-                return True
-            return True  # No action needed if it doesn't exist and we're setting to default
-        
-        # Prepare the row data
-        row_data = [instructor_name, month, year, hourly_wage, datetime.now().strftime('%Y-%m-%d %H:%M:%S')]
-        
-        if row_num:
-            # Update existing record
-            for i, value in enumerate(row_data, start=1):
-                worksheet.update_cell(row_num, i, value)
-        else:
-            # Add new record
-            worksheet.append_row(row_data)
-        
+        save_wages([(instructor_name, month, year, hourly_wage)])
+        drop_payment_data(month, year)
         return True
+    except QuotaExceededError:
+        raise
     except Exception as e:
         print(f"Error saving hourly wage: {e}")
         return False
@@ -2111,38 +1776,17 @@ def save_hourly_wage(instructor_name, month, year, hourly_wage):
 def get_hourly_wage(instructor_name, month, year):
     """Get the hourly wage for an instructor for a specific month and year.
     
+    Looks the wage up in the cached index of the 'שכר שעה' worksheet, so
+    calling this for every instructor of a month reads the sheet once.
+    
     Returns:
         float: The hourly wage, or 200 (default) if no specific wage is set
     """
     try:
-        DEFAULT_HOURLY_WAGE = 200  # Default hourly wage
-        
-        # Get Google Sheets client
-        gc = get_gspread_client()
-        spreadsheet_id = os.getenv('payment_SPREADSHEET_ID')
-        
-        if not spreadsheet_id:
-            return DEFAULT_HOURLY_WAGE
-            
-        # Open the spreadsheet and worksheet
-        spreadsheet = gc.open_by_key(spreadsheet_id)
-        
-        try:
-            worksheet = spreadsheet.worksheet('שכר שעה')
-            records = worksheet.get_all_records()
-            
-            # Find the most recent record for this instructor, month, and year
-            for record in reversed(records):
-                if (str(record.get('מדריך', '')).strip() == instructor_name and 
-                    int(record.get('חודש', 0)) == month and 
-                    int(record.get('שנה', 0)) == year):
-                    return float(record.get('שכר שעה', DEFAULT_HOURLY_WAGE))
-            
-            return DEFAULT_HOURLY_WAGE  # Return default if no record found
-            
-        except gspread.WorksheetNotFound:
-            return DEFAULT_HOURLY_WAGE  # Return default if worksheet doesn't exist
-            
+        wage = get_wage_index().get(instructor_name, month, year)
+        return DEFAULT_HOURLY_WAGE if wage is None else wage
+    except QuotaExceededError:
+        raise
     except Exception as e:
         print(f"Error getting hourly wage: {e}")
         return None
@@ -2152,6 +1796,8 @@ def update_hourly_rate():
     """Update the hourly rate for an instructor."""
     try:
         data = request.get_json()
+        if data.get('changes'):
+            return update_hourly_rates(data['changes'])
         instructor_name = data.get('instructor')
         month = int(data.get('month'))
         year = int(data.get('year'))
@@ -2165,7 +1811,7 @@ def update_hourly_rate():
             return jsonify({'success': False, 'error': 'Failed to save hourly wage'}), 500
         
         # Get the billing data
-        billing_data = get_payment_data(month, year)
+        billing_data = get_payment_data(month, year, use_cache=False)
         
         # Find the instructor in the records and update their hourly rate
         for record in billing_data.get('records', []):
@@ -2186,6 +1832,8 @@ def update_hourly_rate():
             'hourly_rate': f"{hourly_rate:,.0f}"  # Return the rounded hourly rate
         })
         
+    except QuotaExceededError:
+        raise
     except Exception as e:
         print(f"Error updating hourly rate: {e}")
         return jsonify({
@@ -2193,10 +1841,192 @@ def update_hourly_rate():
             'error': str(e)
         }), 500
 
+def update_hourly_rates(changes):
+    """Save several hourly rates in one round trip and return the new totals."""
+    parsed = []
+    for change in changes:
+        if not change.get('instructor'):
+            return jsonify({'success': False, 'error': 'Instructor name is required'}), 400
+        parsed.append((
+            change['instructor'],
+            int(change.get('month')),
+            int(change.get('year')),
+            int(round(float(change.get('hourly_rate', 0))))  # Round to nearest integer
+        ))
+    
+    results = save_wages(parsed)
+    for month, year in {(month, year) for _, month, year, _ in parsed}:
+        drop_payment_data(month, year)
+    
+    # Recompute each affected month once
+    months = {}
+    for instructor_name, month, year, hourly_rate in parsed:
+        if (month, year) not in months:
+            months[(month, year)] = {
+                record['instructor']: record
+                for record in get_payment_data(month, year, use_cache=False).get('records', [])
+            }
+    
+    updated = []
+    for (instructor_name, month, year, hourly_rate), result in zip(parsed, results):
+        record = months[(month, year)].get(instructor_name)
+        total_payment = '0.00'
+        if record:
+            total_hours = float(record['total_hours'].replace(',', ''))
+            total_payment = f"{total_hours * hourly_rate:,.2f}"
+        updated.append({
+            'instructor': instructor_name,
+            'month': month,
+            'year': year,
+            'result': result,
+            'hourly_rate': f"{hourly_rate:,.0f}",
+            'total_payment': total_payment
+        })
+    
+    return jsonify({
+        'success': True,
+        'message': 'Hourly rates updated successfully',
+        'updated': updated
+    })
+
+@app.route('/api/cache_stats')
+def cache_stats():
+    """Expose cache counters for tuning TTLs and sizes."""
+    return jsonify({
+        'sheets': get_sheet_cache_stats(),
+        'calendar': get_event_cache_stats(),
+        'storage': get_storage_status(),
+        'rate_limits': get_rate_limit_stats(),
+        'billing_snapshots': billing_snapshots.status() if billing_snapshots else None
+    })
+
+@app.route('/api/write_queue', methods=['GET', 'POST'])
+def write_queue_status():
+    """Report the write-behind queue; POST flushes it immediately."""
+    try:
+        if request.method == 'POST':
+            flushed = flush_pending_writes()
+            return jsonify({'success': True, 'flushed_rows': flushed, 'status': get_write_queue_status()})
+        return jsonify(get_write_queue_status())
+    except Exception as e:
+        print(f"Error flushing write queue: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+def warm_months():
+    """Return (month, year) of the current and the previous month."""
+    now = datetime.now(pytz.timezone('Asia/Jerusalem'))
+    previous = (12, now.year - 1) if now.month == 1 else (now.month - 1, now.year)
+    return [(now.month, now.year), previous]
+
+def warm_events():
+    # Through the event cache: an expired month is caught up by an
+    # incremental sync rather than listed again
+    prefetch_month_events(warm_months(), projection='display')
+
+def warm_billing():
+    for month, year in warm_months():
+        get_month_billing(month, year)
+
+def warm_payments():
+    for month, year in warm_months():
+        get_payment_data(month, year)
+
+# Keep events and billing/payment aggregates of the current and previous
+# month hot, so interactive requests are served from cache.
+cache_warmer = CacheWarmer(
+    {'events': warm_events, 'billing': warm_billing, 'payments': warm_payments},
+    interval=float(os.getenv("CACHE_WARMER_INTERVAL", 45)),
+    jitter=float(os.getenv("CACHE_WARMER_JITTER", 0.2))
+)
+
+@app.route('/api/cache_warmer', methods=['GET', 'POST'])
+def cache_warmer_status():
+    """Report the cache warmer; POST starts a warm-up round right away."""
+    if request.method == 'POST':
+        cache_warmer.trigger()
+    return jsonify(cache_warmer.status())
+
+# Calendar push notifications. Google must reach CALENDAR_WEBHOOK_URL
+# (the public HTTPS address of /api/calendar/notifications); without it the
+# event cache relies on TTL expiry.
+CALENDAR_WEBHOOK_URL = os.getenv("CALENDAR_WEBHOOK_URL")
+
+def drop_month_aggregates(changed_months):
+    """Forget billing/payment totals of months whose events changed."""
+    if changed_months is None:
+        billing_cache.clear()
+        payment_cache.clear()
+        return
+    for year, month in changed_months:
+        billing_cache.pop((month, year), None)
+        payment_cache.pop((month, year), None)
+
+# Every worker must share CALENDAR_WEBHOOK_TOKEN: Google delivers each
+# notification to whichever worker receives the request.
+CALENDAR_WEBHOOK_TOKEN = os.getenv("CALENDAR_WEBHOOK_TOKEN")
+
+calendar_watch = None
+if CALENDAR_WEBHOOK_URL and not CALENDAR_WEBHOOK_TOKEN:
+    print("CALENDAR_WEBHOOK_URL is set without CALENDAR_WEBHOOK_TOKEN; push notifications are disabled")
+elif CALENDAR_WEBHOOK_URL:
+    calendar_watch = CalendarWatch(
+        get_calendar_service,
+        os.getenv('CALENDAR_ID', 'primary'),
+        CALENDAR_WEBHOOK_URL,
+        CALENDAR_WEBHOOK_TOKEN,
+        ttl=int(os.getenv("CALENDAR_WATCH_TTL", 604800)),
+        renew_margin=int(os.getenv("CALENDAR_WATCH_RENEW_MARGIN", 3600)),
+        on_change=drop_month_aggregates,
+        lock_path=os.getenv("CALENDAR_WATCH_LOCK", "calendar_watch.lock")
+    )
+
+def start_calendar_watch():
+    try:
+        calendar_watch.start()
+    except Exception as e:
+        print(f"Error opening calendar notification channel: {e}")
+
+@app.route('/api/calendar/notifications', methods=['POST'])
+def calendar_notification():
+    """Receive an events.watch notification from Google Calendar."""
+    if calendar_watch is None:
+        return '', 404
+    try:
+        result = calendar_watch.handle(request.headers)
+    except PermissionError as e:
+        print(f"Rejected calendar notification: {e}")
+        return '', 403
+    return jsonify({'result': result})
+
+@app.route('/api/calendar/watch', methods=['GET', 'POST', 'DELETE'])
+def calendar_watch_status():
+    """Report the notification channel; POST (re)opens it, DELETE stops it."""
+    if calendar_watch is None:
+        return jsonify({'enabled': False, 'error': 'CALENDAR_WEBHOOK_URL is not set'}), 404
+    try:
+        if request.method == 'POST':
+            calendar_watch.start()
+        elif request.method == 'DELETE':
+            calendar_watch.stop()
+        return jsonify(dict(calendar_watch.status(), enabled=True))
+    except Exception as e:
+        print(f"Error managing calendar notification channel: {e}")
+        return jsonify({'enabled': True, 'error': str(e)}), 500
+
 @app.route('/favicon.ico')
 def favicon():
     return send_from_directory(os.path.join(app.root_path, 'static'),
                                'favicon.ico', mimetype='image/vnd.microsoft.icon')
 
+# Under the debug reloader only the serving child process runs background work
+if __name__ != '__main__' or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+    start_write_queue()
+    # Off by default: every process that imports the app would otherwise
+    # poll Google on its own, once per worker
+    if os.getenv("CACHE_WARMER_ENABLED", "0") == "1":
+        cache_warmer.start()
+    if calendar_watch is not None:
+        threading.Thread(target=start_calendar_watch, name='calendar-watch-start', daemon=True).start()
+
 if __name__ == '__main__':
     app.run(debug=True)
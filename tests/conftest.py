@@ -0,0 +1,46 @@
+import os
+
+# Before utils is imported: the suite runs on the fakes and never queues
+# writes in a journal
+os.environ.setdefault('GOOGLE_BACKEND', 'fake')
+os.environ.setdefault('WRITE_BEHIND_ENABLED', '0')
+os.environ.setdefault('BILLING_SNAPSHOTS_ENABLED', '0')
+
+import pytest
+
+from utils import fakes, google_calendar, google_sheets, rate_limit
+from utils.snapshots import SnapshotStore
+
+
+@pytest.fixture
+def fake_google(monkeypatch):
+    """Serve utils.google_sheets from freshly seeded in-process fakes."""
+    for key, value in fakes.FAKE_SETTINGS_DEFAULTS.items():
+        monkeypatch.setenv(key, value)
+    monkeypatch.setenv('FAKE_MONTHS', '1')
+    monkeypatch.setenv('FAKE_EVENTS_PER_MONTH', '1')
+    monkeypatch.setattr(fakes, '_fake_google', None)
+    monkeypatch.setattr(google_sheets, 'USE_FAKE_GOOGLE', True)
+    monkeypatch.setattr(google_calendar, 'USE_FAKE_GOOGLE', True)
+    monkeypatch.setattr(google_calendar, '_event_stores', {})
+    google_calendar.event_cache.clear()
+    # Fresh quotas, so tests never wait on each other's calls
+    for api in list(rate_limit.buckets):
+        monkeypatch.setitem(rate_limit.buckets, api, rate_limit.TokenBucket(6000))
+    google_sheets.reset_client_pool()
+    google_sheets.sheet_cache.clear()
+    google_sheets.values_cache.clear()
+    google_sheets._spreadsheet_versions.clear()
+    google_sheets._sheet_indexes.clear()
+    yield google_sheets.get_gspread_client()
+    google_sheets.reset_client_pool()
+
+
+@pytest.fixture
+def app_module(fake_google, monkeypatch, tmp_path):
+    """The Flask app module with empty aggregate caches and snapshots in tmp_path."""
+    import app
+    monkeypatch.setattr(app, 'billing_snapshots', SnapshotStore(str(tmp_path / 'snapshots'), 'billing'))
+    for cache in (app.billing_cache, app.payment_cache, app.hours_cubes):
+        cache.clear()
+    yield app
@@ -0,0 +1,63 @@
+import os
+from datetime import datetime
+
+from utils import google_calendar
+
+
+def _this_month():
+    now = datetime.now()
+    return now.month, now.year
+
+
+def test_wage_change_drops_the_month_payments(app_module):
+    month, year = _this_month()
+    before = app_module.get_payment_data(month, year)
+    instructor = before['records'][0]['instructor']
+    assert (month, year) in app_module.payment_cache
+
+    assert app_module.save_hourly_wage(instructor, month, year, 321)
+
+    assert (month, year) not in app_module.payment_cache
+    record = next(r for r in app_module.get_payment_data(month, year)['records'] if r['instructor'] == instructor)
+    assert record['hourly_rate'] == '321.00'
+
+
+def test_wage_change_keeps_the_billing_snapshot(app_module):
+    month, year = _this_month()
+    app_module.get_month_billing(month, year)
+    assert app_module.billing_snapshots.writes == 1
+    instructor = app_module.get_payment_data(month, year)['records'][0]['instructor']
+
+    app_module.save_hourly_wage(instructor, month, year, 250)
+
+    app_module.get_month_billing(month, year)
+    assert app_module.billing_snapshots.hits == 1
+
+
+def test_routes_share_the_month_of_events(app_module, monkeypatch):
+    # Every month that is not cached is listed from the calendar
+    monkeypatch.setattr(google_calendar, 'CALENDAR_SYNC_ENABLED', False)
+    month, year = _this_month()
+    client = app_module.app.test_client()
+    calendar = app_module.get_calendar_service()
+    instructor = app_module.get_payment_data(month, year)['records'][0]['instructor']
+    calls = calendar.faults.calls.get('calendar', 0)
+
+    events = client.get(f'/api/get_instructor_events?instructor={instructor}&month={month}&year={year}').get_json()
+    assert events['success'] and events['events']
+    client_name = events['events'][0]['client']
+    client_events = client.get(f'/api/client_events?client_name={client_name}&month={month}&year={year}').get_json()
+    assert client_events['data']
+
+    # Payroll already downloaded the month
+    assert calendar.faults.calls.get('calendar', 0) == calls
+
+
+def test_warmer_round_fills_the_current_and_previous_month(app_module):
+    app_module.cache_warmer.run_once()
+
+    assert all(status['failures'] == 0 for status in app_module.cache_warmer.status()['jobs'].values())
+    for month, year in app_module.warm_months():
+        assert (month, year) in app_module.billing_cache
+        assert (month, year) in app_module.payment_cache
+        assert google_calendar.event_cache.peek((os.environ['CALENDAR_ID'], (year, month))) is not None
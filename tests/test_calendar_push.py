@@ -0,0 +1,32 @@
+import pytest
+
+from utils import calendar_push, fakes, google_calendar
+from utils.calendar_push import CalendarWatch
+
+
+def _watch(service, lock_path, **kwargs):
+    return CalendarWatch(lambda: service, 'fake-calendar', 'https://example.test/notify', 'shared',
+                         lock_path=str(lock_path), **kwargs)
+
+
+def test_one_worker_owns_the_channel_and_all_accept_its_notifications(tmp_path, monkeypatch):
+    delivered = []
+    service = fakes.FakeCalendarService(deliver=lambda address, headers: delivered.append(headers))
+    refreshed = []
+    monkeypatch.setattr(calendar_push, 'refresh_calendar',
+                        lambda get_service, calendar_id: refreshed.append(calendar_id) or set())
+    monkeypatch.setattr(google_calendar, '_event_stores', {})
+    leader = _watch(service, tmp_path / 'watch.lock')
+    follower = _watch(service, tmp_path / 'watch.lock')
+    assert leader._acquire_leadership()
+    assert not follower._acquire_leadership()
+    leader.open_channel()
+    assert len(service.channels_by_id) == 1
+    assert google_calendar.get_event_store('fake-calendar').watched
+
+    headers = {'X-Goog-Channel-ID': leader.channel['id'], 'X-Goog-Channel-Token': 'shared',
+               'X-Goog-Resource-State': 'exists'}
+    assert follower.handle(headers) == 'refreshed'
+    assert refreshed == ['fake-calendar']
+    with pytest.raises(PermissionError):
+        follower.handle(dict(headers, **{'X-Goog-Channel-Token': 'other'}))
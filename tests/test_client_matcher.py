@@ -0,0 +1,29 @@
+from utils.client_matcher import ClientMatcher, get_client_matcher
+
+
+def test_longest_name_wins_then_leftmost():
+    matcher = ClientMatcher(['לקוח 1', 'לקוח 12', 'Dana', 'Noam', 'Al'])
+
+    assert matcher.match('שיעור לקוח 12') == 'לקוח 12'
+    assert matcher.match('שיעור לקוח 1') == 'לקוח 1'
+    assert matcher.match('Noam and Dana') == 'Noam'
+    assert matcher.match('Dana and Noam') == 'Dana'
+    assert matcher.match('Al with Noam') == 'Noam'
+
+
+def test_names_found_through_failure_links():
+    matcher = ClientMatcher(['abcd', 'bc', 'cde'])
+
+    assert matcher.match('xabce') == 'bc'
+    assert matcher.match('abcde') == 'abcd'
+    assert matcher.match('xbcde') == 'cde'
+    assert matcher.match('xyz') is None
+    assert matcher.match(None) is None
+
+
+def test_matcher_is_rebuilt_only_when_names_change():
+    matcher = get_client_matcher([' Dana ', 'Noam', ''])
+
+    assert matcher.names == ['Dana', 'Noam']
+    assert get_client_matcher(['Noam', 'Dana']) is matcher
+    assert get_client_matcher(['Noam', 'Dana', 'Al']) is not matcher
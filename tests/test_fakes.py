@@ -0,0 +1,34 @@
+import inspect
+
+import gspread
+import pytest
+
+from utils import fakes
+
+
+@pytest.mark.parametrize('fake, real', [
+    (fakes.FakeClient, gspread.Client),
+    (fakes.FakeSpreadsheet, gspread.Spreadsheet),
+    (fakes.FakeWorksheet, gspread.Worksheet),
+])
+def test_fake_methods_match_gspread_signatures(fake, real):
+    for name, method in vars(fake).items():
+        if name.startswith('_') or not callable(method) or not hasattr(real, name):
+            continue
+        assert inspect.signature(method) == inspect.signature(getattr(real, name)), name
+
+
+def test_fake_client_is_built_through_authorize(monkeypatch):
+    calls = []
+
+    def authorize(credentials, client_class):
+        calls.append(credentials)
+        return gspread.authorize(credentials, client_class=client_class)
+
+    monkeypatch.setattr(fakes, '_fake_google', None)
+    monkeypatch.setenv('FAKE_MONTHS', '1')
+    monkeypatch.setenv('FAKE_EVENTS_PER_MONTH', '1')
+    client, _ = fakes.fake_google_from_env(authorize=authorize)
+
+    assert calls == [None]
+    assert isinstance(client, fakes.FakeClient)
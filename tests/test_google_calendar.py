@@ -0,0 +1,204 @@
+import threading
+import time
+from datetime import datetime, timedelta
+
+from google.oauth2.credentials import Credentials
+
+from utils import fakes, google_calendar, rate_limit
+
+
+def _event(day, month):
+    return {
+        'summary': f'Lesson {day}/{month}',
+        'start': {'dateTime': f'2026-{month:02d}-{day:02d}T10:00:00+02:00'},
+        'end': {'dateTime': f'2026-{month:02d}-{day:02d}T11:00:00+02:00'}
+    }
+
+
+def test_load_months_fills_the_event_cache(monkeypatch):
+    service = fakes.FakeCalendarService(deliver=lambda address, headers: None)
+    for month in (1, 2, 3):
+        service.add_event('fake-calendar', _event(10, month))
+    monkeypatch.setattr(google_calendar, '_event_stores', {})
+    google_calendar.event_cache.clear()
+
+    months = google_calendar.load_months(lambda: service, 'fake-calendar', [(2026, 1), (2026, 2), (2026, 3)])
+    assert [[event['summary'] for event in events] for events in months] == [
+        ['Lesson 10/1'], ['Lesson 10/2'], ['Lesson 10/3']
+    ]
+
+    # Later single-month reads are served from the cache
+    def no_service():
+        raise AssertionError("month was fetched again")
+    events = list(google_calendar.iter_month_events(no_service, 'fake-calendar', 2026, 2))
+    assert [event['summary'] for event in events] == ['Lesson 10/2']
+    google_calendar.event_cache.clear()
+
+
+def test_event_store_keeps_only_its_window(monkeypatch):
+    service = fakes.FakeCalendarService(deliver=lambda address, headers: None)
+    now = datetime.now(google_calendar.LOCAL_TZ)
+    old = service.add_event('fake-calendar', {
+        'summary': 'Old lesson',
+        'start': {'dateTime': (now - timedelta(days=150)).isoformat()},
+        'end': {'dateTime': (now - timedelta(days=150) + timedelta(hours=1)).isoformat()}
+    })
+    service.add_event('fake-calendar', {
+        'summary': 'Next lesson',
+        'start': {'dateTime': (now + timedelta(days=3)).isoformat()},
+        'end': {'dateTime': (now + timedelta(days=3, hours=1)).isoformat()}
+    })
+    store = google_calendar.CalendarEventStore('fake-calendar', min_interval=0, window_months=1)
+    monkeypatch.setattr(google_calendar, '_event_stores', {'fake-calendar': store})
+    google_calendar.event_cache.clear()
+
+    store.sync(service)
+    assert store.status()['events'] == 1
+    old_start = google_calendar.event_time(old['start']).astimezone(google_calendar.LOCAL_TZ)
+    assert not store.covers(google_calendar.month_bounds(old_start.year, old_start.month)[0])
+
+    # Months before the window are listed from the calendar
+    events = list(google_calendar.iter_month_events(lambda: service, 'fake-calendar', old_start.year, old_start.month))
+    assert [event['summary'] for event in events] == ['Old lesson']
+
+    # An edit before the window drops the cached month without entering the store
+    service.update_event('fake-calendar', old['id'], {'summary': 'Old lesson, moved'})
+    assert store.sync(service) == {(old_start.year, old_start.month)}
+    assert store.status()['events'] == 1
+
+    # As the window moves on, events that ended before it are dropped
+    later = now + timedelta(days=40)
+    monkeypatch.setattr(store, 'window_start', lambda: google_calendar.month_bounds(later.year, later.month)[0])
+    store.sync(service, force=True)
+    assert store.status()['events'] == 0
+    assert store.evicted == 1
+    google_calendar.event_cache.clear()
+
+
+def test_month_records_are_built_once_per_download(monkeypatch):
+    service = fakes.FakeCalendarService(deliver=lambda address, headers: None)
+    service.add_event('fake-calendar', _event(10, 1))
+    monkeypatch.setattr(google_calendar, '_event_stores', {})
+    google_calendar.event_cache.clear()
+    built = []
+
+    def normalize(events):
+        built.append(events)
+        return [event['summary'] for event in events]
+
+    for _ in range(3):
+        records = google_calendar.month_records(lambda: service, 'fake-calendar', 2026, 1, normalize, 'refs')
+        assert records == ['Lesson 10/1']
+    assert len(built) == 1
+    # The records hang off the very tuple the cache serves
+    assert built[0] is google_calendar.event_cache.peek(('fake-calendar', (2026, 1)))[0][1]
+    google_calendar.event_cache.clear()
+
+
+def test_calendar_pages_are_prefetched_on_the_shared_pool():
+    service = fakes.FakeCalendarService(deliver=lambda address, headers: None)
+    for day in range(1, 6):
+        service.add_event('fake-calendar', _event(day, 1))
+    threads = []
+    list_events = service.list_events
+
+    def recording_list(params):
+        threads.append(threading.current_thread())
+        return list_events(params)
+    service.list_events = recording_list
+
+    for _ in range(2):
+        pages = list(google_calendar.iter_calendar_pages(
+            service, page_size=2, calendarId='fake-calendar', orderBy='startTime', singleEvents=True
+        ))
+        assert [[event['summary'] for event in page['items']] for page in pages] == [
+            ['Lesson 1/1', 'Lesson 2/1'], ['Lesson 3/1', 'Lesson 4/1'], ['Lesson 5/1']
+        ]
+    # Both listings ran on the module's pool instead of threads of their own
+    assert len(threads) == 6
+    assert set(threads) <= set(google_calendar._page_pool._threads)
+
+
+def test_calendar_service_is_built_once_and_connects_per_thread(monkeypatch, tmp_path):
+    service_account = tmp_path / 'service-account.json'
+    service_account.write_text('{}')
+    monkeypatch.setattr(google_calendar, 'USE_FAKE_GOOGLE', False)
+    monkeypatch.setattr(google_calendar, 'SERVICE_ACCOUNT_FILE', str(service_account))
+    monkeypatch.setattr(google_calendar, 'get_credentials', lambda scopes: Credentials(token='token'))
+    monkeypatch.setattr(google_calendar, '_calendar_service', None)
+
+    service = google_calendar.get_calendar_service()
+    assert service is not None
+    assert google_calendar.get_calendar_service() is service
+
+    def connection():
+        return service.events().list(calendarId='fake-calendar').http.http
+    here = connection()
+    assert connection() is here
+    elsewhere = []
+    thread = threading.Thread(target=lambda: elsewhere.append(connection()))
+    thread.start()
+    thread.join()
+    assert elsewhere[0] is not here
+
+
+def test_months_are_listed_with_the_fields_of_their_projection(monkeypatch):
+    monkeypatch.setattr(google_calendar, 'CALENDAR_SYNC_ENABLED', False)
+    monkeypatch.setattr(google_calendar, 'CALENDAR_FIELD_PROJECTIONS', True)
+    service = fakes.FakeCalendarService(deliver=lambda address, headers: None)
+    service.add_event('fake-calendar', dict(_event(10, 1), description='Room 4', location='Hall'))
+    google_calendar.event_cache.clear()
+
+    def month(projection):
+        return list(google_calendar.iter_month_events(
+            lambda: service, 'fake-calendar', 2026, 1, projection=projection
+        ))
+    [event] = month('aggregate')
+    assert event['summary'] == 'Lesson 10/1'
+    assert 'description' not in event and 'location' not in event
+
+    # The cached aggregate copy lacks fields the calendar view needs
+    [event] = month('display')
+    assert event['description'] == 'Room 4'
+    calls = service.faults.calls['calendar']
+    # ...while the display copy serves aggregations as well
+    assert month('aggregate') == [event]
+    assert service.faults.calls['calendar'] == calls
+    google_calendar.event_cache.clear()
+
+
+def test_range_months_are_listed_concurrently_at_the_request_priority(monkeypatch):
+    monkeypatch.setattr(google_calendar, 'CALENDAR_SYNC_ENABLED', False)
+    service = fakes.FakeCalendarService(deliver=lambda address, headers: None)
+    for month in (1, 2, 3, 4):
+        service.add_event('fake-calendar', _event(10, month))
+        service.add_event('fake-calendar', _event(20, month))
+    google_calendar.event_cache.clear()
+    lock = threading.Lock()
+    in_flight, overlap, priorities = [0], [0], []
+    list_events = service.list_events
+
+    def slow_list(params):
+        with lock:
+            in_flight[0] += 1
+            overlap[0] = max(overlap[0], in_flight[0])
+            priorities.append(rate_limit.get_request_priority())
+        time.sleep(0.05)
+        try:
+            return list_events(params)
+        finally:
+            with lock:
+                in_flight[0] -= 1
+    service.list_events = slow_list
+
+    with rate_limit.priority_scope(rate_limit.PRIORITY_INTERACTIVE):
+        events = list(google_calendar.iter_range_events(
+            lambda: service, 'fake-calendar', datetime(2026, 1, 1), datetime(2026, 5, 1)
+        ))
+
+    assert [event['summary'] for event in events] == [
+        f'Lesson {day}/{month}' for month in (1, 2, 3, 4) for day in (10, 20)
+    ]
+    assert 1 < overlap[0] <= google_calendar.CALENDAR_FETCH_WORKERS
+    assert priorities == [rate_limit.PRIORITY_INTERACTIVE] * 4
+    google_calendar.event_cache.clear()
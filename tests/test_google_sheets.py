@@ -0,0 +1,172 @@
+import os
+import threading
+import time
+from unittest import mock
+
+import gspread
+import pytest
+from google.oauth2.credentials import Credentials
+
+from utils import fakes, google_sheets
+from utils.google_sheets import RateLimitedClient
+
+
+def test_gspread_client_is_authorized_with_rate_limited_client(monkeypatch):
+    monkeypatch.setattr(google_sheets, 'USE_FAKE_GOOGLE', False)
+    monkeypatch.setattr(google_sheets, '_gspread_client', None)
+    monkeypatch.setattr(google_sheets, 'get_credentials', lambda scopes: Credentials(token='token'))
+
+    client = google_sheets.get_gspread_client()
+
+    assert isinstance(client, RateLimitedClient)
+    assert google_sheets.get_gspread_client() is client
+
+    response = mock.Mock(ok=True)
+    with mock.patch.object(client.session, 'get', return_value=response) as get:
+        assert client.request('get', 'https://sheets.googleapis.com/v4/spreadsheets/abc') is response
+    get.assert_called_once()
+
+
+def _real_spreadsheet(monkeypatch):
+    """A real gspread Spreadsheet whose HTTP session is mocked."""
+    monkeypatch.setattr(google_sheets, 'USE_FAKE_GOOGLE', False)
+    monkeypatch.setattr(google_sheets, '_gspread_client', None)
+    monkeypatch.setattr(google_sheets, 'get_credentials', lambda scopes: Credentials(token='token'))
+    client = google_sheets.get_gspread_client()
+    metadata = mock.Mock(ok=True)
+    metadata.json.return_value = {'properties': {'title': 'Test'}, 'sheets': []}
+    client.session = mock.Mock()
+    client.session.get.return_value = metadata
+    client.session.post.return_value = mock.Mock(ok=True, **{'json.return_value': {}})
+    spreadsheet = gspread.Spreadsheet(client, {'id': 'spreadsheet-id'})
+    monkeypatch.setattr(google_sheets, 'open_spreadsheet', lambda spreadsheet_id=None: spreadsheet)
+    return client
+
+
+def test_flushed_row_updates_are_sent_as_json_body(monkeypatch):
+    client = _real_spreadsheet(monkeypatch)
+
+    google_sheets._flush_row_updates('spreadsheet-id', {('Sheet', 2): {1: 'a', 2: 'b', 4: 'd'}})
+
+    kwargs = client.session.post.call_args.kwargs
+    assert kwargs['params'] is None
+    assert kwargs['json'] == {
+        'valueInputOption': 'RAW',
+        'data': [
+            {'range': "'Sheet'!A2:B2", 'values': [['a', 'b']]},
+            {'range': "'Sheet'!D2:D2", 'values': [['d']]}
+        ]
+    }
+
+
+def test_mirrored_sheet_is_reread_after_the_mirror_syncs(fake_google, monkeypatch, tmp_path):
+    mirror = google_sheets.SQLiteBackend(
+        google_sheets.GoogleSheetsBackend(),
+        db_path=str(tmp_path / 'mirror.db'),
+        mirrored=[('fake-main', os.environ['INSTRUCTORS_SHEET_NAME'])],
+        interval=3600
+    )
+    # The first sync runs in the background
+    deadline = time.monotonic() + 10
+    while mirror.last_sync is None and time.monotonic() < deadline:
+        time.sleep(0.01)
+    monkeypatch.setattr(google_sheets, 'storage_backend', mirror)
+    monkeypatch.setattr(google_sheets, 'CHANGE_PROBE_INTERVAL', 0)
+    monkeypatch.setattr(google_sheets.sheet_cache, 'ttl', 0)
+
+    _, records = google_sheets.get_sheet_data(os.environ['INSTRUCTORS_SHEET_NAME'], spreadsheet_id='fake-main')
+    name = records[0]['שם']
+    # Edited outside the app: Drive's version moves before the mirror syncs
+    fake_google.spreadsheets['fake-main']._worksheet_local(os.environ['INSTRUCTORS_SHEET_NAME']).update_cell(2, 1, 'Renamed')
+    _, records = google_sheets.get_sheet_data(os.environ['INSTRUCTORS_SHEET_NAME'], spreadsheet_id='fake-main')
+    assert records[0]['שם'] == name
+
+    mirror.sync_all()
+    _, records = google_sheets.get_sheet_data(os.environ['INSTRUCTORS_SHEET_NAME'], spreadsheet_id='fake-main')
+    assert records[0]['שם'] == 'Renamed'
+
+
+def test_pooled_handles_open_outside_the_pool_lock():
+    opened = []
+    release = threading.Event()
+
+    def slow_open():
+        opened.append('slow')
+        release.wait(5)
+        return 'slow handle'
+
+    pool = {}
+    slow = threading.Thread(target=google_sheets._pooled, args=(pool, 'slow', slow_open))
+    slow.start()
+    while not opened:
+        time.sleep(0.01)
+    # Another key opens while the first is still in flight
+    assert google_sheets._pooled(pool, 'fast', lambda: 'fast handle') == 'fast handle'
+    waiter = threading.Thread(target=lambda: opened.append(google_sheets._pooled(pool, 'slow', slow_open)))
+    waiter.start()
+    release.set()
+    slow.join()
+    waiter.join()
+    assert opened == ['slow', 'slow handle']
+
+
+def test_rejected_calls_evict_the_pooled_worksheet(fake_google):
+    sheet = os.environ['INSTRUCTORS_SHEET_NAME']
+    key = ('fake-main', sheet)
+    google_sheets.get_worksheet(sheet, 'fake-main')
+    with pytest.raises(fakes.FakeAPIError):
+        with google_sheets.pooled_worksheet(sheet, 'fake-main'):
+            raise fakes.FakeAPIError(429)
+    assert key in google_sheets._worksheets
+    with pytest.raises(fakes.FakeAPIError):
+        with google_sheets.pooled_worksheet(sheet, 'fake-main'):
+            raise fakes.FakeAPIError(400)
+    assert key not in google_sheets._worksheets
+
+
+def test_sheet_cache_expires_and_evicts_the_least_recently_used():
+    cache = google_sheets.SheetCache(ttl=60, max_entries=2)
+    cache.set(('s', 'a'), 'A', version='v1')
+    cache.set(('s', 'b'), 'B')
+    assert cache.get(('s', 'a')) == 'A'
+    cache.set(('s', 'c'), 'C')
+    # 'b' was used least recently
+    assert cache.get(('s', 'b')) is None
+    assert cache.get(('s', 'a')) == 'A'
+
+    cache.ttl = 0
+    assert cache.get(('s', 'a')) is None
+    # Expired entries stay around to be revalidated
+    assert cache.peek(('s', 'a')) == ('A', 'v1')
+    cache.ttl = 60
+    cache.touch(('s', 'a'))
+    assert cache.get(('s', 'a')) == 'A'
+
+
+def test_writes_invalidate_the_cached_worksheet(fake_google):
+    sheet = os.environ['INSTRUCTORS_SHEET_NAME']
+    headers, records = google_sheets.get_sheet_data(sheet, spreadsheet_id='fake-main')
+    reads = fake_google.faults.calls['sheets_read']
+    assert google_sheets.get_sheet_data(sheet, spreadsheet_id='fake-main')[1] == records
+    assert fake_google.faults.calls['sheets_read'] == reads
+
+    google_sheets.append_row(sheet, ['New instructor'] + [''] * (len(headers) - 1))
+
+    _, records = google_sheets.get_sheet_data(sheet, spreadsheet_id='fake-main')
+    assert records[-1][headers[0]] == 'New instructor'
+
+
+def test_many_sheets_are_read_in_one_request(fake_google):
+    names = [os.environ['clients_private_SHEET_NAME'], os.environ['INSTRUCTORS_SHEET_NAME']]
+    google_sheets.open_spreadsheet('fake-main')
+    reads = fake_google.faults.calls.get('sheets_read', 0)
+
+    sheets = google_sheets.get_many_sheets(names, spreadsheet_id='fake-main')
+
+    assert fake_google.faults.calls['sheets_read'] == reads + 1
+    for name, data in zip(names, sheets):
+        assert data == google_sheets.get_sheet_data(name, use_cache=False, spreadsheet_id='fake-main')
+    # Both are cached now
+    reads = fake_google.faults.calls['sheets_read']
+    assert google_sheets.get_many_sheets(names[::-1], spreadsheet_id='fake-main') == sheets[::-1]
+    assert fake_google.faults.calls['sheets_read'] == reads
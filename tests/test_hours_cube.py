@@ -0,0 +1,54 @@
+from types import SimpleNamespace
+
+import pytest
+
+from utils import hours_cube
+from utils.hours_cube import HoursCube
+
+
+@pytest.fixture(params=['numpy', 'lists'])
+def backend(request, monkeypatch):
+    """Run a test once with NumPy (when installed) and once without."""
+    if request.param == 'numpy':
+        monkeypatch.setattr(hours_cube, 'np', pytest.importorskip('numpy'))
+    else:
+        monkeypatch.setattr(hours_cube, 'np', None)
+    return request.param
+
+
+def _records(*rows):
+    return [SimpleNamespace(client=client, instructor=instructor, hours=hours) for client, instructor, hours in rows]
+
+
+def test_billing_and_payroll_read_from_one_cube(backend):
+    cube = HoursCube.from_records(_records(
+        ('Dana', 'Yael', 1.5),
+        ('Noam', 'Avi', 2.0),
+        (None, 'Avi', 4.0),
+        ('Dana', 'Avi', 1.0),
+        ('Dana', 'Yael', 0.5)
+    ))
+
+    assert len(cube) == 4
+    assert cube.total_hours == 5.0
+    # Rows and cells come in order of their first event
+    assert list(cube.by_client()) == [
+        ('Dana', 3.0, [('Yael', 2.0), ('Avi', 1.0)]),
+        ('Noam', 2.0, [('Avi', 2.0)])
+    ]
+    assert list(cube.by_instructor()) == [
+        ('Yael', 2.0, [('Dana', 2.0)]),
+        ('Avi', 3.0, [('Noam', 2.0), ('Dana', 1.0)])
+    ]
+    assert cube.client_hours('Unknown') == (0.0, [])
+
+
+def test_months_roll_up_into_a_year(backend):
+    january = HoursCube.from_records(_records(('Dana', 'Yael', 1.0), ('Noam', 'Avi', 2.0)))
+    february = HoursCube.from_records(_records(('Noam', 'Yael', 1.5), ('Dana', 'Yael', 1.0)))
+
+    year = HoursCube.combine([january, february, HoursCube.from_records([])])
+
+    assert year.total_hours == 5.5
+    assert year.client_hours('Dana') == (2.0, [('Yael', 2.0)])
+    assert year.instructor_hours('Yael') == (3.5, [('Dana', 2.0), ('Noam', 1.5)])
@@ -0,0 +1,47 @@
+from utils.instructor_directory import InstructorDirectory, get_instructor_directory
+
+INSTRUCTORS = [
+    {'שם': 'Dana Levi', 'מייל': 'Dana.Levi@gmail.com'},
+    {'שם': '', 'מייל': 'avi@outlook.com'},
+    {'שם': 'Yael', 'מייל': ''}
+]
+
+
+def test_instructors_are_found_by_email_username_or_name():
+    directory = InstructorDirectory(INSTRUCTORS)
+
+    assert directory.lookup('dana.levi@GMAIL.com') == 'Dana Levi'
+    # Another domain still matches by username
+    assert directory.lookup('dana.levi@outlook.com') == 'Dana Levi'
+    assert directory.lookup('Dana.Levi') == 'Dana Levi'
+    assert directory.lookup('Yael') == 'Yael'
+    # Shown by username when the sheet has no name
+    assert directory.lookup('avi@outlook.com') == 'avi'
+    assert directory.lookup('nobody@gmail.com') is None
+    assert directory.lookup('') is None
+    assert directory.names == {'Dana Levi', 'avi', 'Yael'}
+    assert directory.get('Dana Levi') is INSTRUCTORS[0]
+
+
+def test_events_fall_back_from_organizer_to_creator():
+    directory = InstructorDirectory(INSTRUCTORS)
+
+    # A calendar organizer that is not an instructor, created from Gmail
+    event = {'organizer': {'email': 'studio@group.calendar.google.com'}, 'creator': {'email': 'dana.levi@gmail.com'}}
+    assert directory.resolve(event) == ('dana.levi@gmail.com', 'Dana Levi')
+    # The organizer wins when both are instructors
+    event = {'organizer': {'email': 'avi@outlook.com'}, 'creator': {'email': 'dana.levi@gmail.com'}}
+    assert directory.resolve(event) == ('avi@outlook.com', 'avi')
+    # Unknown: the organizer's email is kept
+    event = {'organizer': {'email': 'guest@example.com'}, 'creator': {'email': 'other@example.com'}}
+    assert directory.resolve(event) == ('guest@example.com', None)
+    assert directory.resolve({'creator': {'email': 'other@example.com'}}) == ('other@example.com', None)
+    assert directory.resolve({}) == ('', None)
+
+
+def test_directory_is_rebuilt_only_when_the_sheet_changes():
+    directory = get_instructor_directory(INSTRUCTORS)
+
+    assert get_instructor_directory([dict(row) for row in INSTRUCTORS]) is directory
+    renamed = [dict(INSTRUCTORS[0], שם='Dana L.')] + INSTRUCTORS[1:]
+    assert get_instructor_directory(renamed).lookup('dana.levi@gmail.com') == 'Dana L.'
@@ -0,0 +1,48 @@
+import threading
+
+from utils.keyed_sheet import KeyedSheet
+
+
+def _rows(client):
+    return client.spreadsheets['fake-billing']._worksheet_local('Overrides')._values()
+
+
+def test_apply_adds_updates_and_blanks_rows(fake_google):
+    sheet = KeyedSheet('Overrides', ['client', 'month', 'value'], ['client', 'month'], 'billing_SPREADSHEET_ID')
+
+    assert sheet.apply(upserts=[
+        {'client': 'a', 'month': '1', 'value': 10},
+        {'client': 'b', 'month': '1', 'value': 20}
+    ]) == {('a', '1'): 'added', ('b', '1'): 'added'}
+    assert sheet.apply(upserts=[{'client': 'a', 'month': '1', 'value': 11}],
+                       deletes=[{'client': 'b', 'month': '1'}]) == {('a', '1'): 'updated', ('b', '1'): 'removed'}
+    assert _rows(fake_google) == [['client', 'month', 'value'], ['a', '1', '11'], ['', '', '']]
+
+    # The blanked row is reused before anything is appended
+    assert sheet.apply(upserts=[{'client': 'c', 'month': '2', 'value': 5}]) == {('c', '2'): 'added'}
+    assert _rows(fake_google)[2] == ['c', '2', '5']
+    assert sheet.get({'client': 'c', 'month': '2'})['value'] == 5
+
+
+def test_concurrent_batches_do_not_claim_the_same_blank_row(fake_google):
+    sheet = KeyedSheet('Overrides', ['client', 'month', 'value'], ['client', 'month'], 'billing_SPREADSHEET_ID')
+    sheet.apply(upserts=[{'client': name, 'month': '1', 'value': 1} for name in 'abcd'])
+    sheet.apply(deletes=[{'client': name, 'month': '1'} for name in 'abcd'])
+    # Slow calls, so the batches overlap
+    fake_google.faults.latency = 0.01
+
+    errors = []
+
+    def add(name):
+        try:
+            sheet.apply(upserts=[{'client': name, 'month': '2', 'value': 2}])
+        except Exception as e:
+            errors.append(e)
+    threads = [threading.Thread(target=add, args=(name,)) for name in 'wxyz']
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert sorted(row[0] for row in _rows(fake_google)[1:]) == ['w', 'x', 'y', 'z']
@@ -0,0 +1,57 @@
+import time
+
+import pytest
+
+from utils import fakes, rate_limit
+from utils.rate_limit import PRIORITY_BACKGROUND, PRIORITY_EXPORT, PRIORITY_INTERACTIVE, TokenBucket
+
+
+def test_lower_priorities_leave_their_reserve():
+    bucket = TokenBucket(600, capacity=4)
+    for _ in range(3):
+        bucket.acquire(PRIORITY_BACKGROUND)
+    # A quarter of the bucket is left for page loads, which take it at once
+    started = time.monotonic()
+    bucket.acquire(PRIORITY_INTERACTIVE)
+    assert time.monotonic() - started < 0.05
+
+    # Background work waits until the reserve has refilled
+    started = time.monotonic()
+    bucket.acquire(PRIORITY_BACKGROUND)
+    assert time.monotonic() - started >= 0.15
+
+
+def test_exports_leave_half_the_bucket():
+    bucket = TokenBucket(600, capacity=4)
+    bucket.acquire(PRIORITY_EXPORT)
+    bucket.acquire(PRIORITY_EXPORT)
+    started = time.monotonic()
+    bucket.acquire(PRIORITY_EXPORT)
+    assert time.monotonic() - started >= 0.05
+
+
+def test_rate_limited_calls_are_retried_at_the_request_priority(monkeypatch):
+    priorities = []
+
+    class RecordingBucket(TokenBucket):
+        def acquire(self, priority=PRIORITY_INTERACTIVE):
+            priorities.append(priority)
+            super().acquire(priority)
+
+    monkeypatch.setitem(rate_limit.buckets, 'calendar', RecordingBucket(6000))
+    monkeypatch.setattr(rate_limit, 'BACKOFF_BASE', 0.0)
+    responses = [fakes.FakeAPIError(429), fakes.FakeAPIError(503)]
+
+    def call():
+        if responses:
+            raise responses.pop(0)
+        return 'ok'
+
+    with rate_limit.priority_scope(PRIORITY_INTERACTIVE):
+        assert rate_limit.call_with_backoff(call, api='calendar') == 'ok'
+    assert priorities == [PRIORITY_INTERACTIVE] * 3
+
+    monkeypatch.setattr(rate_limit, 'MAX_RETRIES', 1)
+    responses[:] = [fakes.FakeAPIError(429)] * 2
+    with pytest.raises(rate_limit.QuotaExceededError):
+        rate_limit.call_with_backoff(call, api='calendar')
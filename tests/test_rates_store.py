@@ -0,0 +1,36 @@
+from utils import rates_store
+from utils.rates_store import RatesIndex
+
+
+def test_index_keys_rows_by_year_month_client_and_type():
+    index = RatesIndex(rates_store.RATES_HEADERS, [
+        {'לקוח': 'Dana', 'חודש': '3', 'שנה': '2026', 'סוג': 'תמחור שעה', 'ערך': '400'},
+        {'לקוח': 'Dana', 'חודש': '3', 'שנה': '2026', 'סוג': 'הנחה %', 'ערך': '10'},
+        {'לקוח': 'Dana ', 'חודש': ' 3', 'שנה': '2026', 'סוג': 'תמחור שעה', 'ערך': '420'},
+        {'לקוח': 'Noam', 'חודש': '4', 'שנה': '2026', 'סוג': 'הנחה %', 'ערך': '5'},
+        {'לקוח': 'Bad', 'חודש': 'March', 'שנה': '2026', 'סוג': 'הנחה %', 'ערך': '5'},
+        {'לקוח': 'Bad', 'חודש': '3', 'שנה': '2026', 'סוג': 'הנחה %', 'ערך': 'ten'}
+    ])
+
+    # The last row of a key wins
+    assert index.get(2026, 3, 'Dana', 'תמחור שעה') == 420.0
+    assert index.get('2026', '03', 'Dana', 'הנחה %') == 10.0
+    assert index.get(2026, 3, 'Noam', 'הנחה %') is None
+    assert index.for_month(2026, 3) == {'Dana': {'תמחור שעה': 420.0, 'הנחה %': 10.0}}
+    assert index.for_month(2026, 5) == {}
+    assert len(index) == 3
+
+
+def test_saved_rates_are_served_from_the_rebuilt_index(fake_google):
+    assert rates_store.save_rate(2031, 1, 'Test client', 'תמחור שעה', 400) == 'added'
+    assert rates_store.get_month_rates(2031, 1) == {'Test client': {'תמחור שעה': 400.0}}
+    index = rates_store.get_rates_index()
+    assert rates_store.get_rates_index() is index
+
+    assert rates_store.save_rates([
+        (2031, 1, 'Test client', 'תמחור שעה', 350),
+        (2031, 1, 'Test client', 'הנחה %', 15)
+    ]) == ['removed', 'added']
+    assert rates_store.get_month_rates(2031, 1) == {'Test client': {'הנחה %': 15.0}}
+    # A default that was never overridden needs no row
+    assert rates_store.save_rate(2031, 2, 'Test client', 'הנחה %', 0) == 'unchanged'
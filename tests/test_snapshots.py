@@ -0,0 +1,31 @@
+import json
+
+from utils.snapshots import SnapshotStore
+
+
+def test_snapshot_is_served_only_while_sources_match(tmp_path):
+    store = SnapshotStore(str(tmp_path), 'billing')
+    sources = {'rates': '3', 'calendar': 'abc'}
+    data = {'status': 'success', 'data': [{'לקוח': 'a', 'סיכום': 350.0}]}
+
+    store.put(2026, 8, sources, data)
+
+    assert store.get(2026, 8, sources) == data
+    assert store.get(2026, 8, dict(sources, rates='4')) is None
+    assert store.get(2026, 8, dict(sources, rates=None)) is None
+
+    store.drop(2026, 8)
+    assert store.get(2026, 8, sources) is None
+
+
+def test_edited_snapshot_is_not_served(tmp_path):
+    store = SnapshotStore(str(tmp_path), 'billing')
+    sources = {'rates': '3'}
+    store.put(2026, 8, sources, {'data': [1]})
+    path = tmp_path / 'billing-2026-08.json'
+    snapshot = json.loads(path.read_text(encoding='utf-8'))
+    snapshot['data'] = {'data': [2]}
+    path.write_text(json.dumps(snapshot), encoding='utf-8')
+
+    assert store.get(2026, 8, sources) is None
+    assert store.status()['corrupt'] == 1
@@ -0,0 +1,39 @@
+from utils import google_sheets, wage_store
+from utils.wage_store import WageIndex
+
+
+def test_index_keys_wages_by_instructor_month_and_year():
+    index = WageIndex(wage_store.WAGES_HEADERS, [
+        {'מדריך': 'Dana', 'חודש': '3', 'שנה': '2026', 'שכר שעה': '220'},
+        {'מדריך': 'Dana ', 'חודש': '03', 'שנה': '2026', 'שכר שעה': '240'},
+        {'מדריך': 'Avi', 'חודש': '3', 'שנה': '2026', 'שכר שעה': ''},
+        {'מדריך': 'Avi', 'חודש': 'March', 'שנה': '2026', 'שכר שעה': '250'}
+    ])
+
+    # The last row of a key wins
+    assert index.get('Dana', 3, 2026) == 240.0
+    assert index.get('Avi', 3, 2026) is None
+    assert len(index) == 1
+
+
+def test_payroll_reads_the_wages_sheet_once(fake_google, monkeypatch):
+    reads = []
+    get_values = google_sheets.storage_backend.get_values
+
+    def counting_get_values(spreadsheet_id, sheet_name):
+        reads.append(sheet_name)
+        return get_values(spreadsheet_id, sheet_name)
+    monkeypatch.setattr(google_sheets.storage_backend, 'get_values', counting_get_values)
+    instructors = [f'Instructor {number}' for number in range(30)]
+
+    assert wage_store.save_wages([(name, 5, 2031, 210 + number) for number, name in enumerate(instructors)]) == ['added'] * 30
+    reads.clear()
+    wages = [wage_store.get_wage_index().get(name, 5, 2031) for name in instructors]
+    assert wages == [210.0 + number for number in range(30)]
+    assert reads == [wage_store.WAGES_SHEET_NAME]
+
+    # A save invalidates the index; the next payroll reads the sheet again
+    wage_store.save_wages([('Instructor 0', 5, 2031, 200)])
+    assert wage_store.get_wage_index().get('Instructor 0', 5, 2031) is None
+    assert wage_store.get_wage_index().get('Instructor 1', 5, 2031) == 211.0
+    assert reads == [wage_store.WAGES_SHEET_NAME] * 2
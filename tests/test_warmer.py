@@ -0,0 +1,33 @@
+import threading
+
+from utils.warmer import CacheWarmer
+
+
+def test_a_failing_job_does_not_stop_the_round():
+    ran = []
+
+    def broken():
+        raise RuntimeError('sheet missing')
+
+    warmer = CacheWarmer({'broken': broken, 'events': lambda: ran.append('events')})
+    warmer.run_once()
+
+    assert ran == ['events']
+    status = warmer.status()
+    assert status['runs'] == 1
+    assert status['jobs']['broken']['failures'] == 1
+    assert status['jobs']['broken']['last_error'] == 'RuntimeError: sheet missing'
+    assert status['jobs']['events']['last_success'] is not None
+
+
+def test_warmer_runs_on_start_and_when_triggered():
+    rounds = threading.Semaphore(0)
+    warmer = CacheWarmer({'job': rounds.release}, interval=3600, jitter=0)
+
+    warmer.start()
+    assert rounds.acquire(timeout=5)
+    # The next round is an hour away unless triggered
+    assert not rounds.acquire(timeout=0.05)
+    warmer.trigger()
+    assert rounds.acquire(timeout=5)
+    assert warmer.status()['running']
@@ -0,0 +1,64 @@
+import pytest
+
+from utils.fakes import FakeAPIError
+from utils.write_queue import JournalLockedError, WriteBehindQueue
+
+
+def test_rejected_row_is_dead_lettered_without_blocking_the_others():
+    written = []
+
+    def flush(spreadsheet_id, row_updates):
+        if ('Deleted', 2) in row_updates:
+            raise FakeAPIError(400)
+        written.extend(row_updates)
+
+    queue = WriteBehindQueue(flush, interval=3600)
+    queue.enqueue('s', 'Deleted', 2, {1: 'a'})
+    queue.enqueue('s', 'Sheet', 3, {1: 'b'})
+
+    assert queue.flush() == 1
+    assert written == [('Sheet', 3)]
+    status = queue.status()
+    assert status['pending_rows'] == 0
+    assert [(letter['sheet_name'], letter['row'], letter['attempts']) for letter in status['dead_letters']] == [
+        ('Deleted', 2, 1)
+    ]
+
+
+def test_retryable_failures_are_retried_up_to_max_attempts():
+    def flush(spreadsheet_id, row_updates):
+        raise FakeAPIError(503)
+
+    queue = WriteBehindQueue(flush, interval=3600, max_attempts=3)
+    queue.enqueue('s', 'Sheet', 2, {1: 'a'})
+
+    queue.flush()
+    queue.flush()
+    assert queue.status()['pending_rows'] == 1
+    assert queue.status()['dead_letters'] == []
+
+    queue.flush()
+    assert queue.status()['pending_rows'] == 0
+    assert queue.status()['dead_letters'][0]['attempts'] == 3
+
+
+def test_one_queue_owns_a_journal(tmp_path):
+    journal = str(tmp_path / 'write_queue.journal')
+    written = []
+    owner = WriteBehindQueue(lambda spreadsheet_id, row_updates: written.extend(row_updates),
+                             journal_path=journal, interval=3600)
+    owner.enqueue('s', 'Sheet', 2, {1: 'a'})
+
+    # A second worker must neither replay nor rewrite the owner's edits
+    with pytest.raises(JournalLockedError):
+        WriteBehindQueue(lambda spreadsheet_id, row_updates: None, journal_path=journal, interval=3600)
+    with open(journal, encoding='utf-8') as f:
+        assert len(f.readlines()) == 1
+
+    # Once the owner is gone, the next queue replays what it left
+    owner.close()
+    successor = WriteBehindQueue(lambda spreadsheet_id, row_updates: written.extend(row_updates),
+                                 journal_path=journal, interval=3600)
+    assert successor.flush() == 1
+    assert written == [('Sheet', 2)]
+    successor.close()
@@ -0,0 +1,217 @@
+import threading
+import time
+import traceback
+import uuid
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:  # Windows: a single process is assumed
+    fcntl = None
+
+from utils.google_calendar import get_event_store, refresh_calendar
+from utils.rate_limit import call_with_backoff
+
+
+class CalendarWatch:
+    """Push-notification channel (events.watch) for one calendar.
+
+    Google POSTs to ``address`` whenever an event of the calendar changes.
+    Notifications do not say what changed, so each one runs an incremental
+    sync and only the months it touches are dropped from the event cache.
+    A background thread opens a new channel ``renew_margin`` seconds before
+    the current one expires and then stops the old one. ``on_change`` is
+    called with the changed (year, month) keys (None: all) after each
+    refresh, for caches derived from the events.
+
+    With several worker processes, only the one holding the lock file at
+    ``lock_path`` opens and renews the channel; the others keep polling and
+    take over when it exits. Every process accepts notifications carrying
+    the shared ``token``, whichever channel they come from, since Google
+    delivers each one to a single worker.
+    """
+
+    def __init__(self, get_service, calendar_id, address, token, ttl=604800, renew_margin=3600,
+                 on_change=None, lock_path=None, leader_retry=300):
+        if not token:
+            raise ValueError("A calendar channel needs a token shared by all workers")
+        self.get_service = get_service
+        self.on_change = on_change
+        self.calendar_id = calendar_id
+        self.address = address
+        self.token = token
+        self.ttl = ttl
+        self.renew_margin = renew_margin
+        self.lock_path = lock_path
+        self.leader_retry = leader_retry
+        self.leader = False
+        self._lock_file = None
+        self.channel = None  # {'id', 'resource_id', 'expiration'}
+        self._retired = {}   # channel_id: resource_id, still valid until stopped
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self.notifications = 0
+        self.refreshes = 0
+        self.renewals = 0
+        self.last_notification = None
+        self.last_error = None
+
+    def start(self):
+        """Open a channel now if this process leads, and keep it renewed."""
+        if self._acquire_leadership():
+            self.open_channel()
+        else:
+            print(f"Another process owns the channel of calendar {self.calendar_id}")
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='calendar-watch', daemon=True)
+                self._thread.start()
+
+    def _acquire_leadership(self):
+        """Take the lock file without blocking; held until the process exits."""
+        if self.leader:
+            return True
+        if self.lock_path and fcntl is not None:
+            lock_file = open(self.lock_path, 'a')
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                lock_file.close()
+                return False
+            self._lock_file = lock_file
+        self.leader = True
+        return True
+
+    def open_channel(self):
+        """Create a new channel, then stop the one it replaces."""
+        if not self.leader:
+            raise RuntimeError("Another process owns the calendar channel")
+        service = self.get_service()
+        if not service:
+            raise RuntimeError("Calendar service is not available")
+        body = {
+            'id': uuid.uuid4().hex,
+            'type': 'web_hook',
+            'address': self.address,
+            'token': self.token,
+            'params': {'ttl': str(int(self.ttl))}
+        }
+        response = call_with_backoff(
+            service.events().watch(calendarId=self.calendar_id, body=body).execute, api='calendar'
+        )
+        expiration = response.get('expiration')
+        channel = {
+            'id': response.get('id', body['id']),
+            'resource_id': response.get('resourceId'),
+            # Milliseconds since the epoch, as a string
+            'expiration': int(expiration) / 1000 if expiration else time.time() + self.ttl
+        }
+        with self._lock:
+            previous, self.channel = self.channel, channel
+            if previous is not None:
+                self._retired[previous['id']] = previous['resource_id']
+        get_event_store(self.calendar_id).watched = True
+        print(f"Watching calendar {self.calendar_id} through channel {channel['id']}")
+        self._stop_retired(service)
+        self._wakeup.set()
+        return channel
+
+    def stop(self):
+        """Stop all channels; the event cache falls back to TTL polling."""
+        with self._lock:
+            if self.channel is not None:
+                self._retired[self.channel['id']] = self.channel['resource_id']
+            self.channel = None
+        get_event_store(self.calendar_id).watched = False
+        service = self.get_service()
+        if service:
+            self._stop_retired(service)
+        self._wakeup.set()
+
+    def _stop_retired(self, service):
+        with self._lock:
+            retired = list(self._retired.items())
+        for channel_id, resource_id in retired:
+            try:
+                call_with_backoff(
+                    service.channels().stop(body={'id': channel_id, 'resourceId': resource_id}).execute,
+                    api='calendar'
+                )
+            except Exception as e:
+                # Unstopped channels simply expire
+                print(f"Error stopping calendar channel {channel_id}: {e}")
+            with self._lock:
+                self._retired.pop(channel_id, None)
+
+    def handle(self, headers):
+        """Process one notification. Returns 'refreshed' or 'sync'.
+
+        Raises PermissionError if the channel token does not match.
+        """
+        if headers.get('X-Goog-Channel-Token') != self.token:
+            raise PermissionError("Invalid calendar channel token")
+        if headers.get('X-Goog-Resource-State') == 'sync':
+            # Handshake sent when a channel opens
+            return 'sync'
+        # Any channel with our token counts: one opened by another worker,
+        # or by this one before a restart
+        self.notifications += 1
+        self.last_notification = datetime.now().isoformat(timespec='seconds')
+        affected = refresh_calendar(self.get_service, self.calendar_id)
+        self.refreshes += 1
+        if self.on_change is not None:
+            self.on_change(affected)
+        return 'refreshed'
+
+    def _run(self):
+        while True:
+            if not self.leader:
+                self._wakeup.wait(self.leader_retry)
+                self._wakeup.clear()
+                if self._acquire_leadership():
+                    print(f"Taking over the channel of calendar {self.calendar_id}")
+                    try:
+                        self.open_channel()
+                    except Exception as e:
+                        self.last_error = f"{type(e).__name__}: {e}"
+                        print(f"Error opening calendar channel: {e}")
+                continue
+            with self._lock:
+                channel = self.channel
+            if channel is None:
+                self._wakeup.wait()
+                self._wakeup.clear()
+                continue
+            delay = channel['expiration'] - self.renew_margin - time.time()
+            if delay > 0 and self._wakeup.wait(delay):
+                self._wakeup.clear()
+                continue
+            try:
+                self.open_channel()
+                self.renewals += 1
+            except Exception as e:
+                self.last_error = f"{type(e).__name__}: {e}"
+                print(f"Error renewing calendar channel: {e}")
+                traceback.print_exc()
+                if channel['expiration'] <= time.time():
+                    # No live channel: fall back to polling until renewed
+                    get_event_store(self.calendar_id).watched = False
+                time.sleep(60)
+
+    def status(self):
+        with self._lock:
+            channel = dict(self.channel) if self.channel else None
+        if channel:
+            channel['expiration'] = datetime.fromtimestamp(channel['expiration']).isoformat(timespec='seconds')
+        return {
+            'calendar_id': self.calendar_id,
+            'address': self.address,
+            'leader': self.leader,
+            'channel': channel,
+            'notifications': self.notifications,
+            'refreshes': self.refreshes,
+            'renewals': self.renewals,
+            'last_notification': self.last_notification,
+            'last_error': self.last_error
+        }
@@ -0,0 +1,84 @@
+import threading
+from collections import deque
+
+
+class ClientMatcher:
+    """Aho-Corasick automaton that finds client names inside event titles.
+
+    All names are matched in a single pass over a title. When several names
+    occur (e.g. 'לקוח 1' inside 'לקוח 12') the longest one wins, then the
+    leftmost, so the result no longer depends on the order of the names.
+    """
+
+    def __init__(self, names):
+        self.names = sorted({name.strip() for name in names if name and name.strip()})
+        self._goto = [{}]      # node: {char: node}
+        self._fail = [0]
+        self._longest = [None]  # node: longest name ending at this node
+        for name in self.names:
+            self._add(name)
+        self._link()
+
+    def _add(self, name):
+        node = 0
+        for char in name:
+            next_node = self._goto[node].get(char)
+            if next_node is None:
+                next_node = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._longest.append(None)
+                self._goto[node][char] = next_node
+            node = next_node
+        self._longest[node] = name
+
+    def _link(self):
+        # Breadth-first, so a node's failure target is linked before it
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(char, 0)
+                if self._longest[child] is None:
+                    # A node's own name is longer than any suffix match
+                    self._longest[child] = self._longest[self._fail[child]]
+                queue.append(child)
+
+    def match(self, text):
+        """Return the client name found in text, or None."""
+        best = None
+        best_start = None
+        node = 0
+        for position, char in enumerate(text or ''):
+            while node and char not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(char, 0)
+            name = self._longest[node]
+            if name is None:
+                continue
+            start = position - len(name) + 1
+            if best is None or len(name) > len(best) or (len(name) == len(best) and start < best_start):
+                best, best_start = name, start
+        return best
+
+    def __len__(self):
+        return len(self.names)
+
+
+_matcher_lock = threading.Lock()
+_matcher = None
+_matcher_key = None
+
+
+def get_client_matcher(names):
+    """Return a matcher for names, rebuilt only when the names change."""
+    global _matcher, _matcher_key
+    key = frozenset(name.strip() for name in names if name and name.strip())
+    with _matcher_lock:
+        if _matcher is None or key != _matcher_key:
+            _matcher = ClientMatcher(key)
+            _matcher_key = key
+        return _matcher
@@ -0,0 +1,67 @@
+from utils.google_calendar import LOCAL_TZ, event_time
+
+
+class EventRecord:
+    """One Calendar event, parsed once for billing, payments and the views.
+
+    ``start`` and ``end`` are aware local datetimes, ``client`` is the
+    client matched in the title (None if there is none). ``email`` is the
+    organizer's or creator's email (see InstructorDirectory.resolve()) and
+    ``instructor`` the instructor it belongs to, or its username when it is
+    not a known instructor ('' without an email). ``event`` is the raw
+    Calendar item, which is shared with the event cache and must not be
+    modified.
+    """
+
+    __slots__ = ('id', 'summary', 'client', 'instructor', 'email', 'start', 'end', 'hours',
+                 'all_day', 'event')
+
+    def __init__(self, event, client, instructor, email, start, end):
+        self.id = event.get('id')
+        self.summary = event.get('summary', '').strip()
+        self.client = client
+        self.instructor = instructor
+        self.email = email
+        self.start = start
+        self.end = end
+        self.hours = (end - start).total_seconds() / 3600
+        self.all_day = not event['start'].get('dateTime')
+        self.event = event
+
+    def __repr__(self):
+        return f"EventRecord({self.id!r}, {self.summary!r}, {self.start.isoformat()})"
+
+
+def normalize_event(event, client_matcher, directory):
+    """Return the EventRecord of a raw event, or None if it has no valid times."""
+    try:
+        start = event_time(event['start']).astimezone(LOCAL_TZ)
+        end = event_time(event['end']).astimezone(LOCAL_TZ)
+    except (KeyError, TypeError, ValueError):
+        return None
+    email, instructor = directory.resolve(event)
+    if instructor is None:
+        instructor = email.split('@')[0] if '@' in email else ''
+    return EventRecord(
+        event,
+        client_matcher.match(event.get('summary', '').strip()),
+        instructor,
+        email,
+        start,
+        end
+    )
+
+
+def normalize_events(events, client_matcher, directory):
+    """Turn raw Calendar items into a tuple of EventRecords, in order."""
+    records = []
+    skipped = 0
+    for event in events:
+        record = normalize_event(event, client_matcher, directory)
+        if record is None:
+            skipped += 1
+            continue
+        records.append(record)
+    if skipped:
+        print(f"Skipped {skipped} events with invalid dates")
+    return tuple(records)
@@ -0,0 +1,784 @@
+"""In-process stand-ins for the Google Sheets and Calendar APIs.
+
+They implement the parts of the gspread Client/Spreadsheet/Worksheet surface
+and the Calendar ``events()`` surface this app uses, keep all data in memory
+and can be seeded with synthetic instructors, clients and events. Every call
+can be slowed down (``latency``) or made to fail (``error_rate``) so the
+billing, payments and calendar paths can be load-tested offline.
+
+Enable them with GOOGLE_BACKEND=fake (see fake_google_from_env()).
+"""
+import functools
+import os
+import random
+import re
+import threading
+import time
+import urllib.request
+import uuid
+from datetime import datetime, timedelta
+
+import gspread
+import pytz
+from gspread.exceptions import WorksheetNotFound
+from gspread.utils import numericise_all
+
+LOCAL_TZ = pytz.timezone('Asia/Jerusalem')
+
+
+class FakeHTTPResponse:
+    """Just enough of a requests.Response for error and JSON handling."""
+
+    def __init__(self, status_code=200, payload=None):
+        self.status_code = status_code
+        self.status = status_code
+        self._payload = payload or {}
+
+    def json(self):
+        return self._payload
+
+
+class FakeAPIError(Exception):
+    """Injected failure; carries the status the way gspread/googleapiclient do."""
+
+    def __init__(self, status):
+        super().__init__(f"Fake Google API error {status}")
+        self.response = FakeHTTPResponse(status)  # gspread.exceptions.APIError
+        self.resp = self.response                  # googleapiclient HttpError
+
+
+class FaultInjector:
+    """Adds latency and random errors to every fake API call.
+
+    ``wrap(kind, fn)`` lets the caller put its own policy (e.g. the shared
+    rate limiter) around each call; kind is 'sheets_read', 'sheets_write',
+    'drive' or 'calendar'.
+    """
+
+    def __init__(self, latency=0.0, error_rate=0.0, error_status=429, seed=None, wrap=None):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.wrap = wrap
+        self.calls = {}
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def call(self, kind, fn):
+        def attempt():
+            with self._lock:
+                self.calls[kind] = self.calls.get(kind, 0) + 1
+                fail = self._random.random() < self.error_rate
+            if self.latency:
+                time.sleep(self.latency)
+            if fail:
+                raise FakeAPIError(self.error_status)
+            return fn()
+        if self.wrap is not None:
+            return self.wrap(kind, attempt)
+        return attempt()
+
+
+def _cell_text(value):
+    """Render a written value the way Sheets returns it from get_all_values()."""
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def _col_number(letters):
+    number = 0
+    for char in letters.upper():
+        number = number * 26 + ord(char) - ord('A') + 1
+    return number
+
+
+def _parse_range(a1):
+    """Parse "'Sheet'!A2:C5", "A2", "1:1000" or "'Sheet'".
+
+    Returns (sheet_name, first_row, first_col, last_row, last_col); missing
+    bounds are None.
+    """
+    sheet_name = None
+    if '!' in a1:
+        sheet_name, a1 = a1.rsplit('!', 1)
+    elif a1.startswith("'"):
+        sheet_name, a1 = a1, ''
+    if sheet_name is not None:
+        sheet_name = sheet_name.strip("'").replace("''", "'")
+    if not a1:
+        return sheet_name, None, None, None, None
+
+    def cell(part):
+        match = re.match(r'^([A-Za-z]*)(\d*)$', part)
+        letters, digits = match.groups()
+        return (int(digits) if digits else None), (_col_number(letters) if letters else None)
+
+    first, _, last = a1.partition(':')
+    first_row, first_col = cell(first)
+    last_row, last_col = cell(last) if last else (first_row, first_col)
+    return sheet_name, first_row, first_col, last_row, last_col
+
+
+class FakeWorksheet:
+    def __init__(self, spreadsheet, title, sheet_id, rows=None):
+        self.spreadsheet = spreadsheet
+        self.title = title
+        self.id = sheet_id
+        self._rows = [list(map(_cell_text, row)) for row in (rows or [])]
+
+    @property
+    def row_count(self):
+        return max(1000, len(self._rows))
+
+    @property
+    def col_count(self):
+        return max([26] + [len(row) for row in self._rows])
+
+    def _read(self, fn):
+        return self.spreadsheet.client.faults.call('sheets_read', fn)
+
+    def _write(self, fn):
+        def write():
+            result = fn()
+            self.spreadsheet.touch()
+            return result
+        return self.spreadsheet.client.faults.call('sheets_write', write)
+
+    # Reads
+
+    def _values(self):
+        width = max([len(row) for row in self._rows] or [0])
+        return [row + [''] * (width - len(row)) for row in self._rows]
+
+    def get_all_values(self, **kwargs):
+        return self._read(self._values)
+
+    def get_all_records(self, empty2zero=False, head=1, default_blank='',
+                        allow_underscores_in_numeric_literals=False, numericise_ignore=None,
+                        value_render_option=None, expected_headers=None):
+        def records():
+            values = self._values()[head - 1:]
+            if not values:
+                return []
+            return [
+                dict(zip(values[0], numericise_all(row, empty2zero=empty2zero, default_blank=default_blank)))
+                for row in values[1:]
+            ]
+        return self._read(records)
+
+    def row_values(self, row, **kwargs):
+        def values():
+            data = list(self._rows[row - 1]) if row <= len(self._rows) else []
+            while data and data[-1] == '':
+                data.pop()
+            return data
+        return self._read(values)
+
+    def _get_range(self, a1):
+        _, first_row, first_col, last_row, last_col = _parse_range(a1)
+        first_row = first_row or 1
+        last_row = min(last_row or len(self._rows), len(self._rows))
+        rows = []
+        for row in self._rows[first_row - 1:last_row]:
+            start = (first_col or 1) - 1
+            row = row[start:last_col] if last_col else row[start:]
+            while row and row[-1] == '':
+                row = row[:-1]
+            rows.append(list(row))
+        while rows and not rows[-1]:
+            rows.pop()
+        return rows
+
+    def get(self, range_name=None, **kwargs):
+        return self._read(lambda: self._get_range(range_name or 'A1:ZZ'))
+
+    # Writes
+
+    def _set_range(self, a1, values):
+        _, first_row, first_col, _, _ = _parse_range(a1)
+        first_row, first_col = first_row or 1, first_col or 1
+        for r, row_values in enumerate(values):
+            row_index = first_row - 1 + r
+            while len(self._rows) <= row_index:
+                self._rows.append([])
+            row = self._rows[row_index]
+            for c, value in enumerate(row_values):
+                col_index = first_col - 1 + c
+                while len(row) <= col_index:
+                    row.append('')
+                row[col_index] = _cell_text(value)
+
+    def update(self, range_name, values=None, **kwargs):
+        if values is None:
+            values, range_name = range_name, 'A1'
+        return self._write(lambda: self._set_range(range_name, values))
+
+    def update_cell(self, row, col, value):
+        return self._write(lambda: self._set_range(_a1(row, col), [[value]]))
+
+    def batch_update(self, data, **kwargs):
+        def apply():
+            for item in data:
+                self._set_range(item['range'], item['values'])
+        return self._write(apply)
+
+    def append_row(self, values, value_input_option='RAW', insert_data_option=None, table_range=None,
+                   include_values_in_response=False):
+        return self.append_rows([values], value_input_option=value_input_option)
+
+    def append_rows(self, values, value_input_option='RAW', insert_data_option=None, table_range=None,
+                    include_values_in_response=False):
+        def append():
+            # Like the API, append after the last non-empty row
+            while self._rows and not any(self._rows[-1]):
+                self._rows.pop()
+            self._rows.extend([list(map(_cell_text, row)) for row in values])
+            return {'updates': {'updatedRows': len(values)}}
+        return self._write(append)
+
+    def delete_rows(self, start_index, end_index=None):
+        end_index = end_index or start_index
+
+        def delete():
+            del self._rows[start_index - 1:end_index]
+        return self._write(delete)
+
+    def clear(self):
+        return self._write(self._rows.clear)
+
+    # Formatting calls only cost a request
+
+    def format(self, ranges, format):
+        return self._write(lambda: None)
+
+    def freeze(self, rows=None, cols=None):
+        return self._write(lambda: None)
+
+    def set_basic_filter(self, name=None):
+        return self._write(lambda: None)
+
+
+def _a1(row, col):
+    letters = ''
+    while col:
+        col, rem = divmod(col - 1, 26)
+        letters = chr(ord('A') + rem) + letters
+    return f"{letters}{row}"
+
+
+class FakeSpreadsheet:
+    def __init__(self, client, spreadsheet_id):
+        self.client = client
+        self.id = spreadsheet_id
+        self.version = 1
+        self.modified = datetime.utcnow()
+        self._worksheets = []
+        self._next_sheet_id = 0
+
+    def touch(self):
+        self.version += 1
+        self.modified = datetime.utcnow()
+
+    @property
+    def sheet1(self):
+        return self._worksheets[0]
+
+    def worksheets(self):
+        return self.client.faults.call('sheets_read', lambda: list(self._worksheets))
+
+    def worksheet(self, title):
+        def find():
+            for worksheet in self._worksheets:
+                if worksheet.title == title:
+                    return worksheet
+            raise WorksheetNotFound(title)
+        return self.client.faults.call('sheets_read', find)
+
+    def _worksheet_local(self, title):
+        for worksheet in self._worksheets:
+            if worksheet.title == title:
+                return worksheet
+        raise WorksheetNotFound(title)
+
+    def add_worksheet(self, title, rows, cols, index=None):
+        return self.client.faults.call('sheets_write', lambda: self.seed_worksheet(title))
+
+    def seed_worksheet(self, title, rows_data=None):
+        """Create a worksheet directly, without latency or injected errors."""
+        worksheet = FakeWorksheet(self, title, self._next_sheet_id, rows_data)
+        self._next_sheet_id += 1
+        self._worksheets.append(worksheet)
+        self.touch()
+        return worksheet
+
+    def batch_update(self, body):
+        return self.client.faults.call('sheets_write', lambda: {'replies': []})
+
+    def values_batch_get(self, ranges, params=None):
+        def batch_get():
+            value_ranges = []
+            for a1 in ranges:
+                sheet_name, *_ = _parse_range(a1)
+                worksheet = self._worksheet_local(sheet_name)
+                inner = a1.rsplit('!', 1)[1] if '!' in a1 else 'A1:ZZ'
+                value_ranges.append({'range': a1, 'values': worksheet._get_range(inner)})
+            return {'spreadsheetId': self.id, 'valueRanges': value_ranges}
+        return self.client.faults.call('sheets_read', batch_get)
+
+    def values_batch_update(self, params=None, body=None):
+        data = (body or {}).get('data', [])
+
+        def batch_update():
+            for item in data:
+                sheet_name, *_ = _parse_range(item['range'])
+                self._worksheet_local(sheet_name)._set_range(item['range'], item['values'])
+            self.touch()
+            return {'totalUpdatedRanges': len(data)}
+        return self.client.faults.call('sheets_write', batch_update)
+
+
+class FakeClient:
+    """Stand-in for gspread.Client, built through gspread.authorize() like it."""
+
+    def __init__(self, auth, session=None, faults=None):
+        self.auth = auth
+        self.session = session
+        self.faults = faults or FaultInjector()
+        self.spreadsheets = {}
+
+    def create_spreadsheet(self, spreadsheet_id):
+        spreadsheet = self.spreadsheets.get(spreadsheet_id)
+        if spreadsheet is None:
+            spreadsheet = FakeSpreadsheet(self, spreadsheet_id)
+            self.spreadsheets[spreadsheet_id] = spreadsheet
+        return spreadsheet
+
+    def open_by_key(self, key):
+        def open_spreadsheet():
+            if key not in self.spreadsheets:
+                raise FakeAPIError(404)
+            return self.spreadsheets[key]
+        return self.faults.call('sheets_read', open_spreadsheet)
+
+    def request(self, method, endpoint, params=None, data=None, json=None, files=None, headers=None):
+        """Serve the Drive files.get metadata probe."""
+        def drive_get():
+            file_id = endpoint.rstrip('/').rsplit('/', 1)[-1]
+            spreadsheet = self.spreadsheets.get(file_id)
+            if spreadsheet is None:
+                raise FakeAPIError(404)
+            return FakeHTTPResponse(200, {
+                'version': str(spreadsheet.version),
+                'modifiedTime': spreadsheet.modified.strftime('%Y-%m-%dT%H:%M:%S.000Z')
+            })
+        return self.faults.call('drive', drive_get)
+
+
+def _parse_event_time(value):
+    if value.get('dateTime'):
+        return datetime.fromisoformat(value['dateTime'].replace('Z', '+00:00'))
+    return LOCAL_TZ.localize(datetime.strptime(value['date'], '%Y-%m-%d'))
+
+
+def _parse_fields(fields):
+    """Parse a partial-response selector like 'items(id,start(date))'.
+
+    Returns {name: sub-selector or None}; None keeps the whole value.
+    """
+    selector = {}
+    pos = 0
+
+    def parse(pos):
+        current = {}
+        name = ''
+        while pos < len(fields):
+            char = fields[pos]
+            if char == '(':
+                current[name.strip()], pos = parse(pos + 1)
+                name = ''
+            elif char == ')':
+                if name.strip():
+                    current[name.strip()] = None
+                return current, pos
+            elif char == ',':
+                if name.strip():
+                    current[name.strip()] = None
+                name = ''
+            else:
+                name += char
+            pos += 1
+        if name.strip():
+            current[name.strip()] = None
+        return current, pos
+
+    selector, pos = parse(pos)
+    return selector
+
+
+def _project(value, selector):
+    if selector is None:
+        return value
+    if isinstance(value, list):
+        return [_project(item, selector) for item in value]
+    if isinstance(value, dict):
+        return {key: _project(value[key], sub) for key, sub in selector.items() if key in value}
+    return value
+
+
+class FakeCalendarRequest:
+    """Mimics googleapiclient's HttpRequest: inspectable and executable."""
+
+    def __init__(self, calendar, method, params, handler):
+        self.method = 'GET'
+        self.uri = f"fake://calendar/v3/calendars/{params.get('calendarId')}/events?{method}"
+        self.headers = {}
+        self._calendar = calendar
+        self._handler = handler
+        self._params = params
+
+    def execute(self, num_retries=0):
+        def run():
+            response = self._handler(self._params)
+            if self._params.get('fields'):
+                response = _project(response, _parse_fields(self._params['fields']))
+            return response
+        return self._calendar.faults.call('calendar', run)
+
+
+class FakeEvents:
+    def __init__(self, calendar):
+        self._calendar = calendar
+
+    def list(self, **params):
+        return FakeCalendarRequest(self._calendar, 'list', params, self._calendar.list_events)
+
+    def watch(self, **params):
+        return FakeCalendarRequest(self._calendar, 'watch', params, self._calendar.watch_events)
+
+
+class FakeChannels:
+    def __init__(self, calendar):
+        self._calendar = calendar
+
+    def stop(self, **params):
+        return FakeCalendarRequest(self._calendar, 'stop', params, self._calendar.stop_channel)
+
+
+def _post_notification(address, headers):
+    """Deliver a push notification the way Google does: an empty POST."""
+    request = urllib.request.Request(address, data=b'', headers=headers, method='POST')
+    try:
+        urllib.request.urlopen(request, timeout=10).close()
+    except Exception as e:
+        print(f"Fake calendar notification to {address} failed: {e}")
+
+
+class FakeCalendarService:
+    """Stand-in for the resource returned by build('calendar', 'v3').
+
+    Every change gets a sequence number; sync tokens are sequence numbers,
+    so incremental listings return whatever changed after the token.
+    expire_sync_tokens() makes outstanding tokens fail with 410 Gone.
+
+    Watch channels get a notification on every change, delivered on a
+    background thread through ``deliver(address, headers)``, which POSTs to
+    the channel address by default. Tests can replace it, e.g. with a Flask
+    test client.
+    """
+
+    def __init__(self, faults=None, deliver=None):
+        self.faults = faults or FaultInjector()
+        self.deliver = deliver or _post_notification
+        self.calendars = {}  # calendar_id: {event_id: event}
+        self.channels_by_id = {}  # channel_id: channel
+        self._lock = threading.Lock()
+        self._seq = 0
+        self._changed_at = {}  # (calendar_id, event_id): seq of last change
+        self._token_floor = 0
+
+    def events(self):
+        return FakeEvents(self)
+
+    def channels(self):
+        return FakeChannels(self)
+
+    def watch_events(self, params):
+        body = params['body']
+        channel = {
+            'id': body['id'],
+            'calendar_id': params['calendarId'],
+            'address': body['address'],
+            'token': body.get('token'),
+            'resource_id': uuid.uuid4().hex,
+            'expiration': int((time.time() + int(body.get('params', {}).get('ttl', 604800))) * 1000),
+            'message_number': 0
+        }
+        with self._lock:
+            self.channels_by_id[channel['id']] = channel
+        self._send(channel, 'sync')
+        return {
+            'kind': 'api#channel',
+            'id': channel['id'],
+            'resourceId': channel['resource_id'],
+            'resourceUri': f"fake://calendar/v3/calendars/{channel['calendar_id']}/events",
+            'token': channel['token'],
+            'expiration': str(channel['expiration'])
+        }
+
+    def stop_channel(self, params):
+        body = params['body']
+        with self._lock:
+            channel = self.channels_by_id.get(body['id'])
+            if channel is None or channel['resource_id'] != body.get('resourceId'):
+                raise FakeAPIError(404)
+            del self.channels_by_id[body['id']]
+        return ''
+
+    def _send(self, channel, state):
+        with self._lock:
+            channel['message_number'] += 1
+            headers = {
+                'X-Goog-Channel-ID': channel['id'],
+                'X-Goog-Channel-Token': channel['token'] or '',
+                'X-Goog-Channel-Expiration': str(channel['expiration']),
+                'X-Goog-Resource-ID': channel['resource_id'],
+                'X-Goog-Resource-State': state,
+                'X-Goog-Message-Number': str(channel['message_number'])
+            }
+        threading.Thread(target=self.deliver, args=(channel['address'], headers), daemon=True).start()
+
+    def _notify(self, calendar_id):
+        with self._lock:
+            channels = [c for c in self.channels_by_id.values() if c['calendar_id'] == calendar_id]
+        for channel in channels:
+            self._send(channel, 'exists')
+
+    def _store(self, calendar_id, event):
+        event['updated'] = datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%S.000Z')
+        self._seq += 1
+        self._changed_at[(calendar_id, event['id'])] = self._seq
+        self.calendars.setdefault(calendar_id, {})[event['id']] = event
+
+    def add_event(self, calendar_id, event):
+        event = dict(event)
+        event.setdefault('id', uuid.uuid4().hex)
+        event.setdefault('status', 'confirmed')
+        with self._lock:
+            self._store(calendar_id, event)
+        self._notify(calendar_id)
+        return event
+
+    def update_event(self, calendar_id, event_id, changes):
+        with self._lock:
+            event = dict(self.calendars[calendar_id][event_id], **changes)
+            self._store(calendar_id, event)
+        self._notify(calendar_id)
+        return event
+
+    def delete_event(self, calendar_id, event_id):
+        with self._lock:
+            event = dict(self.calendars[calendar_id][event_id], status='cancelled')
+            self._store(calendar_id, event)
+        self._notify(calendar_id)
+
+    def expire_sync_tokens(self):
+        with self._lock:
+            self._token_floor = self._seq
+
+    def list_events(self, params):
+        calendar_id = params.get('calendarId')
+        if params.get('syncToken'):
+            token = int(params['syncToken'])
+            with self._lock:
+                if token < self._token_floor:
+                    raise FakeAPIError(410)
+                seq = self._seq
+                changed = sorted(
+                    (changed_at, event_id)
+                    for (cal_id, event_id), changed_at in self._changed_at.items()
+                    if cal_id == calendar_id and changed_at > token
+                )
+                items = [self.calendars[calendar_id][event_id] for _, event_id in changed]
+            return self._page(params, items, seq)
+
+        time_min = params.get('timeMin')
+        time_max = params.get('timeMax')
+        time_min = datetime.fromisoformat(time_min.replace('Z', '+00:00')) if time_min else None
+        time_max = datetime.fromisoformat(time_max.replace('Z', '+00:00')) if time_max else None
+        with self._lock:
+            seq = self._seq
+            events = list(self.calendars.get(calendar_id, {}).values())
+        items = []
+        for event in events:
+            if event.get('status') == 'cancelled':
+                continue
+            start, end = _parse_event_time(event['start']), _parse_event_time(event['end'])
+            if time_min and end <= time_min:
+                continue
+            if time_max and start >= time_max:
+                continue
+            items.append((start, event))
+        if params.get('orderBy') == 'startTime':
+            items.sort(key=lambda item: item[0])
+        items = [event for _, event in items]
+        # Like Google, a listing bounded only by timeMin can start a sync
+        syncable = not (time_max or params.get('orderBy'))
+        return self._page(params, items, seq if syncable else None)
+
+    def _page(self, params, items, sync_seq):
+        offset = int(params.get('pageToken') or 0)
+        page_size = min(int(params.get('maxResults') or 250), 2500)
+        response = {'kind': 'calendar#events', 'items': items[offset:offset + page_size]}
+        if offset + page_size < len(items):
+            response['nextPageToken'] = str(offset + page_size)
+        elif sync_seq is not None:
+            response['nextSyncToken'] = str(sync_seq)
+        return response
+
+
+INSTRUCTOR_HEADERS = ['שם', 'טלפון', 'מייל', 'התמחויות', 'הערות', 'פעיל']
+PRIVATE_CLIENT_HEADERS = ['שם', 'טלפון', 'מייל', 'צורך מיוחד', 'הערות', 'פעיל']
+INSTITUTIONAL_CLIENT_HEADERS = ['גוף', 'איש קשר', 'טלפון', 'מייל', 'הערות', 'פעיל']
+RATES_HEADERS = ['לקוח', 'חודש', 'שנה', 'סוג', 'ערך']
+WAGES_HEADERS = ['מדריך', 'חודש', 'שנה', 'שכר שעה', 'תאריך עדכון']
+
+
+def seed_fake_data(client, calendar, settings, instructors=10, private_clients=40,
+                   institutional_clients=10, events_per_month=300, months=3, seed=0):
+    """Fill the fakes with synthetic, reproducible data.
+
+    ``settings`` holds the spreadsheet ids, worksheet names and calendar id
+    the app is configured with (see fake_google_from_env()). Events are
+    generated for the current month and the ``months - 1`` before it.
+    """
+    rng = random.Random(seed)
+    instructor_rows = [
+        [f"מדריך {i}", f"050-{i:07d}", f"instructor{i}@example.com", 'רכיבה', '', '']
+        for i in range(1, instructors + 1)
+    ]
+    private_rows = [
+        [f"לקוח {i}", f"052-{i:07d}", f"client{i}@example.com", '', '', '']
+        for i in range(1, private_clients + 1)
+    ]
+    institutional_rows = [
+        [f"מוסד {i}", f"איש קשר {i}", f"03-{i:07d}", f"org{i}@example.com", '', '']
+        for i in range(1, institutional_clients + 1)
+    ]
+
+    main = client.create_spreadsheet(settings['SPREADSHEET_ID'])
+    main.seed_worksheet(settings['INSTRUCTORS_SHEET_NAME'], rows_data=[INSTRUCTOR_HEADERS] + instructor_rows)
+    main.seed_worksheet(settings['clients_private_SHEET_NAME'], rows_data=[PRIVATE_CLIENT_HEADERS] + private_rows)
+    main.seed_worksheet(
+        settings['clients_institutional_SHEET_NAME'],
+        rows_data=[INSTITUTIONAL_CLIENT_HEADERS] + institutional_rows
+    )
+
+    client_names = [row[0] for row in private_rows + institutional_rows]
+    instructor_names = [row[0] for row in instructor_rows]
+    now = datetime.now(LOCAL_TZ)
+    month_starts = []
+    year, month = now.year, now.month
+    for _ in range(months):
+        month_starts.append((year, month))
+        year, month = (year - 1, 12) if month == 1 else (year, month - 1)
+
+    rates_rows = []
+    wages_rows = []
+    for year, month in month_starts:
+        for name in rng.sample(client_names, min(5, len(client_names))):
+            rates_rows.append([name, month, year, 'תמחור שעה', rng.choice([300, 320, 380, 400])])
+        for name in rng.sample(client_names, min(3, len(client_names))):
+            rates_rows.append([name, month, year, 'הנחה %', rng.choice([5, 10, 15])])
+        for name in rng.sample(instructor_names, min(3, len(instructor_names))):
+            wages_rows.append([name, month, year, rng.choice([180, 220, 250]), now.strftime('%Y-%m-%d %H:%M:%S')])
+
+    billing = client.create_spreadsheet(settings['billing_SPREADSHEET_ID'])
+    billing.seed_worksheet('תעריפים והנחות', rows_data=[RATES_HEADERS] + rates_rows)
+    payments = client.create_spreadsheet(settings['payment_SPREADSHEET_ID'])
+    payments.seed_worksheet('שכר שעה', rows_data=[WAGES_HEADERS] + wages_rows)
+
+    for year, month in month_starts:
+        days = (datetime(year + (month == 12), month % 12 + 1, 1) - datetime(year, month, 1)).days
+        for _ in range(events_per_month):
+            start = LOCAL_TZ.localize(datetime(year, month, rng.randint(1, days), rng.randint(8, 18), rng.choice([0, 30])))
+            end = start + timedelta(minutes=rng.choice([45, 60, 90, 120]))
+            instructor = rng.randrange(instructors) + 1
+            email = f"instructor{instructor}@example.com"
+            calendar.add_event(settings['CALENDAR_ID'], {
+                'summary': f"שיעור {rng.choice(client_names)}",
+                'start': {'dateTime': start.isoformat()},
+                'end': {'dateTime': end.isoformat()},
+                'organizer': {'email': email},
+                'creator': {'email': email},
+                'description': '',
+                'location': ''
+            })
+
+
+FAKE_SETTINGS_DEFAULTS = {
+    'SPREADSHEET_ID': 'fake-main',
+    'billing_SPREADSHEET_ID': 'fake-billing',
+    'payment_SPREADSHEET_ID': 'fake-payments',
+    'INSTRUCTORS_SHEET_NAME': 'מדריכים',
+    'clients_private_SHEET_NAME': 'לקוחות פרטיים',
+    'clients_institutional_SHEET_NAME': 'לקוחות מוסדיים',
+    'CALENDAR_ID': 'fake-calendar'
+}
+
+_fake_lock = threading.Lock()
+_fake_google = None
+
+
+def use_fake_google():
+    return os.getenv("GOOGLE_BACKEND", "google") == "fake"
+
+
+def apply_fake_settings():
+    """Fill in ids/worksheet names the app reads from the environment."""
+    for key, value in FAKE_SETTINGS_DEFAULTS.items():
+        os.environ.setdefault(key, value)
+    # Both spellings of the payments spreadsheet are used by the app
+    os.environ.setdefault('payments_SPREADSHEET_ID', os.environ['payment_SPREADSHEET_ID'])
+    return {key: os.environ[key] for key in FAKE_SETTINGS_DEFAULTS}
+
+
+def fake_google_from_env(wrap=None, authorize=gspread.authorize):
+    """Return the process-wide (FakeClient, FakeCalendarService) pair.
+
+    The client is built with ``authorize(None, client_class=...)``, so the
+    fakes go through the same gspread.authorize() call as real clients.
+
+    Configured by FAKE_SEED, FAKE_INSTRUCTORS, FAKE_PRIVATE_CLIENTS,
+    FAKE_INSTITUTIONAL_CLIENTS, FAKE_EVENTS_PER_MONTH, FAKE_MONTHS,
+    FAKE_LATENCY_MS, FAKE_ERROR_RATE and FAKE_ERROR_STATUS.
+    """
+    global _fake_google
+    with _fake_lock:
+        if _fake_google is None:
+            settings = apply_fake_settings()
+            seed = int(os.getenv("FAKE_SEED", 0))
+            faults = FaultInjector(
+                latency=float(os.getenv("FAKE_LATENCY_MS", 0)) / 1000,
+                error_rate=float(os.getenv("FAKE_ERROR_RATE", 0)),
+                error_status=int(os.getenv("FAKE_ERROR_STATUS", 429)),
+                seed=seed,
+                wrap=wrap
+            )
+            client = authorize(None, client_class=functools.partial(FakeClient, faults=faults))
+            calendar = FakeCalendarService(faults)
+            seed_fake_data(
+                client,
+                calendar,
+                settings,
+                instructors=int(os.getenv("FAKE_INSTRUCTORS", 10)),
+                private_clients=int(os.getenv("FAKE_PRIVATE_CLIENTS", 40)),
+                institutional_clients=int(os.getenv("FAKE_INSTITUTIONAL_CLIENTS", 10)),
+                events_per_month=int(os.getenv("FAKE_EVENTS_PER_MONTH", 300)),
+                months=int(os.getenv("FAKE_MONTHS", 3)),
+                seed=seed
+            )
+            _fake_google = (client, calendar)
+        return _fake_google
@@ -0,0 +1,590 @@
+import contextvars
+import os
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import google_auth_httplib2
+import httplib2
+import pytz
+from googleapiclient.discovery import build_from_document
+from googleapiclient.discovery_cache import get_static_doc
+from googleapiclient.http import HttpRequest
+
+from utils.google_sheets import (
+    SERVICE_ACCOUNT_FILE,
+    USE_FAKE_GOOGLE,
+    SheetCache,
+    get_credentials,
+    get_fake_calendar_service
+)
+from utils.rate_limit import call_with_backoff, error_status
+
+LOCAL_TZ = pytz.timezone('Asia/Jerusalem')
+
+CALENDAR_SCOPES = ['https://www.googleapis.com/auth/calendar.readonly']
+
+# Events per Calendar API page (the API caps this at 2500)
+CALENDAR_PAGE_SIZE = min(int(os.getenv("CALENDAR_PAGE_SIZE", 500)), 2500)
+
+# Event fields each use case reads, passed as events().list(fields=...).
+# Every projection includes the ones before it, so a cached 'display'
+# listing also serves aggregation.
+CALENDAR_FIELD_PROJECTIONS = os.getenv("CALENDAR_FIELD_PROJECTIONS", "1") == "1"
+EVENT_PROJECTIONS = {
+    'aggregate': 'id,status,summary,start(date,dateTime),end(date,dateTime),organizer(email),creator(email)'
+}
+EVENT_PROJECTIONS['display'] = EVENT_PROJECTIONS['aggregate'] + ',description,location,attendees(email)'
+PROJECTION_ORDER = ['aggregate', 'display']
+
+# Keep a local copy of each calendar current through incremental syncs
+# instead of re-listing a month on every cache miss.
+CALENDAR_SYNC_ENABLED = os.getenv("CALENDAR_SYNC_ENABLED", "1") == "1"
+CALENDAR_SYNC_MIN_INTERVAL = float(os.getenv("CALENDAR_SYNC_MIN_INTERVAL", 5))
+# While push notifications are on, still sync this often in case one is lost
+CALENDAR_WATCH_SYNC_INTERVAL = float(os.getenv("CALENDAR_WATCH_SYNC_INTERVAL", 300))
+# The local copy holds events from this many months before the current one
+# onwards; older months are listed from Google on demand.
+CALENDAR_SYNC_WINDOW_MONTHS = int(os.getenv("CALENDAR_SYNC_WINDOW_MONTHS", 12))
+
+# Months of a multi-month range are loaded concurrently on one shared,
+# bounded pool; every call still goes through the rate limiter.
+CALENDAR_FETCH_WORKERS = int(os.getenv("CALENDAR_FETCH_WORKERS", 4))
+_range_pool = ThreadPoolExecutor(max_workers=CALENDAR_FETCH_WORKERS, thread_name_prefix='calendar-range')
+# Next-page prefetches of iter_calendar_pages(). Kept apart from _range_pool,
+# whose month loaders list pages themselves and would otherwise wait on it.
+_page_pool = ThreadPoolExecutor(max_workers=CALENDAR_FETCH_WORKERS, thread_name_prefix='calendar-prefetch')
+
+# Whole months of events, keyed by (calendar_id, (year, month)); values are
+# (projection, events, derived). ``derived`` holds data computed from the
+# events (see month_records()) and is dropped together with them.
+event_cache = SheetCache(
+    ttl=int(os.getenv("EVENT_CACHE_TTL", 300)),
+    max_entries=int(os.getenv("EVENT_CACHE_MAX_MONTHS", 12))
+)
+
+
+# One Calendar service per process, built from the discovery document that
+# ships with google-api-python-client instead of fetching it per request.
+_service_lock = threading.Lock()
+_calendar_service = None
+_thread_http = threading.local()
+
+
+def _build_request(http, *args, **kwargs):
+    # httplib2.Http is not thread-safe, so every thread gets its own
+    # connection, authorized with the pooled (auto-refreshed) credentials.
+    connection = getattr(_thread_http, 'http', None)
+    if connection is None:
+        connection = _thread_http.http = httplib2.Http()
+    authorized = google_auth_httplib2.AuthorizedHttp(get_credentials(CALENDAR_SCOPES), http=connection)
+    return HttpRequest(authorized, *args, **kwargs)
+
+
+def get_calendar_service():
+    """Return the shared, thread-safe Google Calendar service, or None."""
+    global _calendar_service
+    if USE_FAKE_GOOGLE:
+        return get_fake_calendar_service()
+    with _service_lock:
+        if _calendar_service is not None:
+            return _calendar_service
+        if not SERVICE_ACCOUNT_FILE or not os.path.exists(SERVICE_ACCOUNT_FILE):
+            print(f"Error: Service account file not found at {SERVICE_ACCOUNT_FILE}")
+            return None
+        try:
+            _calendar_service = build_from_document(
+                get_static_doc('calendar', 'v3'),
+                credentials=get_credentials(CALENDAR_SCOPES),
+                requestBuilder=_build_request
+            )
+            print("Successfully created Google Calendar service")
+            return _calendar_service
+        except Exception as e:
+            print(f"Error creating calendar service: {str(e)}")
+            traceback.print_exc()
+            return None
+
+
+def iter_calendar_pages(service, page_size=None, prefetch=True, **params):
+    """Yield the raw events().list() responses of a listing, page by page.
+
+    Pages are fetched lazily, so callers can start on the first page right
+    away. With ``prefetch`` the next page is requested in the background
+    while the caller works through the current one. The last page carries
+    nextSyncToken when the listing can start an incremental sync.
+    """
+    page_size = page_size or CALENDAR_PAGE_SIZE
+
+    def fetch_page(page_token):
+        page_params = dict(params, maxResults=page_size)
+        if page_token:
+            page_params['pageToken'] = page_token
+        return call_with_backoff(service.events().list(**page_params).execute, api='calendar')
+
+    if not prefetch:
+        page_token = None
+        while True:
+            page = fetch_page(page_token)
+            yield page
+            page_token = page.get('nextPageToken')
+            if not page_token:
+                return
+
+    # The prefetch runs in a copy of our context so the request's API
+    # priority carries over.
+    future = _page_pool.submit(contextvars.copy_context().run, fetch_page, None)
+    while future is not None:
+        page = future.result()
+        page_token = page.get('nextPageToken')
+        future = (
+            _page_pool.submit(contextvars.copy_context().run, fetch_page, page_token)
+            if page_token else None
+        )
+        yield page
+
+def list_fields(projection):
+    """Return the events().list() ``fields`` value for a projection, or None."""
+    if not CALENDAR_FIELD_PROJECTIONS or projection is None:
+        return None
+    return f"nextPageToken,nextSyncToken,items({EVENT_PROJECTIONS[projection]})"
+
+
+def _covers(cached, wanted):
+    if not CALENDAR_FIELD_PROJECTIONS:
+        return True
+    return PROJECTION_ORDER.index(cached) >= PROJECTION_ORDER.index(wanted)
+
+
+def iter_calendar_events(service, calendar_id, time_min, time_max, page_size=None, prefetch=True, **params):
+    """Yield the events between time_min and time_max, following nextPageToken.
+
+    Extra keyword arguments are passed on to events().list(); a ``fields``
+    of None is dropped.
+    """
+    if params.get('fields') is None:
+        params.pop('fields', None)
+    params.setdefault('singleEvents', True)
+    params.setdefault('orderBy', 'startTime')
+    for page in iter_calendar_pages(
+        service, page_size, prefetch,
+        calendarId=calendar_id, timeMin=time_min, timeMax=time_max, **params
+    ):
+        yield from page.get('items', [])
+
+
+def month_bounds(year, month):
+    """Return the local (Asia/Jerusalem) start and end of a month."""
+    start = LOCAL_TZ.localize(datetime(year, month, 1))
+    if month == 12:
+        end = LOCAL_TZ.localize(datetime(year + 1, 1, 1))
+    else:
+        end = LOCAL_TZ.localize(datetime(year, month + 1, 1))
+    return start, end
+
+
+def _event_months(event):
+    """Return the (year, month) keys an event falls in."""
+    try:
+        start = event_time(event['start']).astimezone(LOCAL_TZ)
+        end = event_time(event['end']).astimezone(LOCAL_TZ)
+    except (KeyError, ValueError):
+        return set()
+    return set(_months_between(start, max(end, start + timedelta(seconds=1))))
+
+
+class CalendarEventStore:
+    """Local copy of one calendar, kept current with sync tokens.
+
+    The store holds the 'display' projection, so it serves every route.
+    It keeps the events of the last ``window_months`` months and the
+    future: the first sync lists them (timeMin) and keeps the
+    nextSyncToken, and events that end before the window are dropped as
+    it moves forward. covers() tells whether a month is in the window.
+    Later syncs fetch only events created, changed or cancelled since then.
+    When Google expires the token (410 Gone) the store falls back to a
+    full resync. While ``watched`` (a push-notification channel is open)
+    notifications force syncs, and other syncs run only every
+    ``watched_interval`` seconds as a safety net for lost notifications.
+    """
+
+    def __init__(self, calendar_id, min_interval=5.0, watched_interval=300.0, window_months=12):
+        self.calendar_id = calendar_id
+        self.min_interval = min_interval
+        self.watched_interval = watched_interval
+        self.window_months = window_months
+        self.watched = False
+        self._events = {}  # event_id: event
+        self._window_start = None  # start of the oldest month held
+        self._sync_token = None
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._synced_at = None
+        self.full_syncs = 0
+        self.incremental_syncs = 0
+        self.resyncs = 0
+        self.changes_applied = 0
+        self.evicted = 0
+        self.last_sync = None
+
+    def window_start(self):
+        """Start of the oldest month the store keeps, as of now."""
+        now = datetime.now(LOCAL_TZ)
+        months = now.year * 12 + now.month - 1 - self.window_months
+        return month_bounds(months // 12, months % 12 + 1)[0]
+
+    def covers(self, start):
+        """True if the store holds every event ending after ``start``."""
+        with self._lock:
+            return self._window_start is not None and start >= self._window_start
+
+    def sync(self, service, force=False):
+        """Bring the store up to date.
+
+        Returns the set of (year, month) keys whose events changed, or None
+        after a full sync (every month may have changed). Calls within
+        ``min_interval`` (``watched_interval`` while watched) of the previous
+        sync are skipped.
+        """
+        interval = self.watched_interval if self.watched else self.min_interval
+        with self._sync_lock:
+            if not force and self._synced_at is not None and time.monotonic() - self._synced_at < interval:
+                return set()
+            if self._sync_token is None:
+                return self._full_sync(service)
+            try:
+                return self._incremental_sync(service)
+            except Exception as e:
+                if error_status(e) != 410:
+                    raise
+                print(f"Calendar sync token for {self.calendar_id} expired, running a full resync")
+                self.resyncs += 1
+                return self._full_sync(service)
+
+    def _list_params(self, **params):
+        fields = list_fields('display')
+        if fields:
+            params['fields'] = fields
+        return dict(params, calendarId=self.calendar_id, singleEvents=True)
+
+    def _full_sync(self, service):
+        events = {}
+        sync_token = None
+        window_start = self.window_start()
+        time_min = window_start.astimezone(pytz.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+        for page in iter_calendar_pages(service, **self._list_params(timeMin=time_min)):
+            for event in page.get('items', []):
+                if event.get('status') != 'cancelled':
+                    events[event['id']] = event
+            sync_token = page.get('nextSyncToken') or sync_token
+        with self._lock:
+            self._events = events
+            self._window_start = window_start
+            self._sync_token = sync_token
+        self._synced(full=True)
+        return None
+
+    def _in_window(self, event):
+        try:
+            return event_time(event['end']) > self._window_start
+        except (KeyError, ValueError):
+            return True
+
+    def _evict(self):
+        """Move the window to the current month, dropping older events."""
+        window_start = self.window_start()
+        with self._lock:
+            if self._window_start is None or window_start <= self._window_start:
+                return
+            self._window_start = window_start
+            expired = [event_id for event_id, event in self._events.items() if not self._in_window(event)]
+            for event_id in expired:
+                del self._events[event_id]
+        self.evicted += len(expired)
+
+    def _incremental_sync(self, service):
+        changes = []
+        sync_token = None
+        for page in iter_calendar_pages(service, **self._list_params(syncToken=self._sync_token)):
+            changes.extend(page.get('items', []))
+            sync_token = page.get('nextSyncToken') or sync_token
+
+        # Apply only complete listings, so a failed page leaves the old
+        # token in place and the changes are fetched again next time.
+        affected = set()
+        with self._lock:
+            for event in changes:
+                previous = self._events.pop(event['id'], None)
+                if previous is not None:
+                    affected |= _event_months(previous)
+                if event.get('status') != 'cancelled':
+                    # Changes before the window still drop cached months
+                    affected |= _event_months(event)
+                    if self._in_window(event):
+                        self._events[event['id']] = event
+            self._sync_token = sync_token or self._sync_token
+        self.changes_applied += len(changes)
+        self._evict()
+        self._synced(full=False)
+        return affected
+
+    def _synced(self, full):
+        self._synced_at = time.monotonic()
+        self.last_sync = datetime.now().isoformat(timespec='seconds')
+        if full:
+            self.full_syncs += 1
+        else:
+            self.incremental_syncs += 1
+
+    def events_between(self, start, end):
+        """Return the stored events overlapping [start, end), by start time."""
+        matches = []
+        with self._lock:
+            events = list(self._events.values())
+        for event in events:
+            try:
+                event_start, event_end = event_time(event['start']), event_time(event['end'])
+            except (KeyError, ValueError):
+                continue
+            if event_end <= start or event_start >= end:
+                continue
+            matches.append((event_start, event))
+        matches.sort(key=lambda match: match[0])
+        return [event for _, event in matches]
+
+    def status(self):
+        with self._lock:
+            events = len(self._events)
+            window_start = self._window_start
+        return {
+            'events': events,
+            'window_start': window_start.date().isoformat() if window_start else None,
+            'has_sync_token': self._sync_token is not None,
+            'watched': self.watched,
+            'last_sync': self.last_sync,
+            'full_syncs': self.full_syncs,
+            'incremental_syncs': self.incremental_syncs,
+            'resyncs': self.resyncs,
+            'changes_applied': self.changes_applied,
+            'evicted': self.evicted
+        }
+
+
+_stores_lock = threading.Lock()
+_event_stores = {}  # calendar_id: CalendarEventStore
+
+
+def get_event_store(calendar_id):
+    with _stores_lock:
+        store = _event_stores.get(calendar_id)
+        if store is None:
+            store = _event_stores[calendar_id] = CalendarEventStore(
+                calendar_id, min_interval=CALENDAR_SYNC_MIN_INTERVAL, watched_interval=CALENDAR_WATCH_SYNC_INTERVAL,
+                window_months=CALENDAR_SYNC_WINDOW_MONTHS
+            )
+        return store
+
+
+def _invalidate_changed(calendar_id, affected):
+    """Drop the cached months a sync reported as changed (None: all)."""
+    if affected is None:
+        event_cache.invalidate(calendar_id)
+        return
+    for changed in affected:
+        event_cache.invalidate(calendar_id, changed)
+
+
+def refresh_calendar(get_service, calendar_id):
+    """Pull a calendar's changes now, dropping only the months they touch.
+
+    Returns the changed (year, month) keys, or None when every cached month
+    of the calendar was dropped.
+    """
+    if not CALENDAR_SYNC_ENABLED:
+        event_cache.invalidate(calendar_id)
+        return None
+    service = get_service()
+    if not service:
+        return set()
+    affected = get_event_store(calendar_id).sync(service, force=True)
+    _invalidate_changed(calendar_id, affected)
+    return affected
+
+
+def _utc_bounds(year, month):
+    start, end = month_bounds(year, month)
+    return tuple(bound.astimezone(pytz.utc).strftime('%Y-%m-%dT%H:%M:%SZ') for bound in (start, end))
+
+
+def _synced_month(service, calendar_id, year, month):
+    """Cut a month out of the synced local copy into event_cache.
+
+    Returns the new cache entry, or None for a month before the store's
+    window.
+    """
+    start, end = month_bounds(year, month)
+    # Catch up on edits first
+    store = get_event_store(calendar_id)
+    _invalidate_changed(calendar_id, store.sync(service))
+    if not store.covers(start):
+        return None
+    entry = ('display', tuple(store.events_between(start, end)), {})
+    event_cache.set((calendar_id, (year, month)), entry)
+    return entry
+
+
+def iter_month_events(get_service, calendar_id, year, month, use_cache=True, projection='aggregate'):
+    """Yield every event of a month, served from event_cache when possible.
+
+    ``get_service`` is only called on a cache miss. A miss streams the
+    month from Google and caches it once the last page has been read, so
+    all routes share one download per month. ``projection`` names the
+    event fields the caller needs (see EVENT_PROJECTIONS). Cached events
+    are shared between requests and must be treated as read-only.
+    """
+    key = (calendar_id, (year, month))
+    if use_cache:
+        cached = event_cache.get(key)
+        if cached is not None and _covers(cached[0], projection):
+            yield from cached[1]
+            return
+
+    service = get_service()
+    if not service:
+        return
+    if CALENDAR_SYNC_ENABLED:
+        entry = _synced_month(service, calendar_id, year, month)
+        if entry is not None:
+            yield from entry[1]
+            return
+
+    events = []
+    for event in iter_calendar_events(
+        service, calendar_id, *_utc_bounds(year, month), fields=list_fields(projection)
+    ):
+        events.append(event)
+        yield event
+    event_cache.set(key, (projection, tuple(events), {}))
+
+
+def month_records(get_service, calendar_id, year, month, normalize, refs, use_cache=True,
+                  projection='aggregate'):
+    """Return normalize(events) for a month, cached with the month's events.
+
+    The result is kept in the month's event_cache entry, so it is rebuilt
+    only when the month is downloaded again or ``refs`` changes. ``refs`` is
+    the reference data normalize() depends on (compared with ==).
+    """
+    key = (calendar_id, (year, month))
+    if use_cache:
+        cached = event_cache.get(key)
+        if cached is not None and _covers(cached[0], projection):
+            derived = cached[2]
+            built = derived.get('records')
+            if built is not None and built[0] == refs:
+                return built[1]
+            records = normalize(cached[1])
+            derived['records'] = (refs, records)
+            return records
+
+    service = get_service()
+    if not service:
+        return normalize(())
+    entry = _synced_month(service, calendar_id, year, month) if CALENDAR_SYNC_ENABLED else None
+    if entry is None:
+        entry = (projection, tuple(iter_calendar_events(
+            service, calendar_id, *_utc_bounds(year, month), fields=list_fields(projection)
+        )), {})
+        event_cache.set(key, entry)
+    # Stored on the entry the events were read into
+    records = normalize(entry[1])
+    entry[2]['records'] = (refs, records)
+    return records
+
+
+def event_time(value):
+    """Parse an event's start or end; all-day dates are local midnight."""
+    if value.get('dateTime'):
+        return datetime.fromisoformat(value['dateTime'].replace('Z', '+00:00'))
+    return LOCAL_TZ.localize(datetime.strptime(value['date'], '%Y-%m-%d'))
+
+
+def _months_between(start, end):
+    year, month = start.year, start.month
+    while LOCAL_TZ.localize(datetime(year, month, 1)) < end:
+        yield year, month
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+
+
+def load_months(get_service, calendar_id, months, use_cache=True, projection='aggregate'):
+    """Return the event lists of several (year, month)s, fetched concurrently.
+
+    Every month goes through iter_month_events(), so the months end up in
+    the event cache for later single-month reads.
+    """
+    def load(year_month):
+        return list(iter_month_events(
+            get_service, calendar_id, *year_month, use_cache=use_cache, projection=projection
+        ))
+    # Each task runs in a copy of our context so the request's API
+    # priority carries over to the pool threads.
+    futures = [_range_pool.submit(contextvars.copy_context().run, load, year_month) for year_month in months]
+    return [future.result() for future in futures]
+
+
+def iter_range_events(get_service, calendar_id, start, end, use_cache=True, projection='aggregate'):
+    """Yield the events overlapping [start, end), in time order.
+
+    Every month is served through iter_month_events(), so a range shares
+    the cached months with every other route. A single month is streamed;
+    the months of a longer range are loaded concurrently on a bounded pool
+    and yielded in order. Naive datetimes are taken as local time.
+    """
+    if start.tzinfo is None:
+        start = LOCAL_TZ.localize(start)
+    if end.tzinfo is None:
+        end = LOCAL_TZ.localize(end)
+    start, end = start.astimezone(LOCAL_TZ), end.astimezone(LOCAL_TZ)
+    months = list(_months_between(start, end))
+    if len(months) > 1:
+        month_events = load_months(get_service, calendar_id, months, use_cache, projection)
+    else:
+        month_events = [
+            iter_month_events(get_service, calendar_id, year, month, use_cache=use_cache, projection=projection)
+            for year, month in months
+        ]
+    seen = set()
+    for (year, month), events in zip(months, month_events):
+        month_start, month_end = month_bounds(year, month)
+        whole_month = start <= month_start and month_end <= end
+        for event in events:
+            if len(months) > 1:
+                # Events crossing a month boundary are listed in both months
+                if event.get('id') in seen:
+                    continue
+                seen.add(event.get('id'))
+            if not whole_month:
+                try:
+                    if event_time(event['end']) <= start or event_time(event['start']) >= end:
+                        continue
+                except (KeyError, ValueError):
+                    continue
+            yield event
+
+
+def invalidate_month_events(calendar_id=None, year=None, month=None):
+    """Drop cached months; with no arguments the whole cache is cleared."""
+    if year is not None and month is not None:
+        event_cache.invalidate(calendar_id, (year, month))
+    else:
+        event_cache.invalidate(calendar_id)
+
+
+def get_event_cache_stats():
+    stats = event_cache.stats()
+    with _stores_lock:
+        stores = dict(_event_stores)
+    stats['sync'] = {calendar_id: store.status() for calendar_id, store in stores.items()}
+    return stats
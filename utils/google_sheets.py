@@ -1,37 +1,614 @@
 from googleapiclient.discovery import build
 from google.oauth2.service_account import Credentials
+from google.auth.transport.requests import Request
 from dotenv import load_dotenv
 import gspread
+from gspread.utils import a1_to_rowcol, absolute_range_name, numericise_all, rowcol_to_a1
 import os
-from datetime import datetime
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from utils.fakes import apply_fake_settings, fake_google_from_env, use_fake_google
+from utils.rate_limit import RETRY_STATUSES, QuotaExceededError, call_with_backoff, error_status
+from utils.storage import SQLiteBackend, StorageBackend
+from utils.write_queue import JournalLockedError, WriteBehindQueue
 
 load_dotenv()
 
+# GOOGLE_BACKEND=fake swaps Google for the in-process fakes in utils.fakes
+USE_FAKE_GOOGLE = use_fake_google()
+if USE_FAKE_GOOGLE:
+    apply_fake_settings()
+
 SPREADSHEET_ID = os.getenv("SPREADSHEET_ID")
 SERVICE_ACCOUNT_FILE = os.getenv("SERVICE_ACCOUNT_FILE")
 
 SCOPES = ["https://www.googleapis.com/auth/spreadsheets", "https://www.googleapis.com/auth/drive"]
 
+# Refresh access tokens this many seconds before they expire
+TOKEN_REFRESH_MARGIN = int(os.getenv("TOKEN_REFRESH_MARGIN", 300))
+
+# Process-wide client pool: credentials are loaded once per scope set, the
+# gspread client is authorized once, and spreadsheet/worksheet handles are
+# kept by id so open_by_key() does not refetch metadata on every call.
+# Handles are opened outside the lock; concurrent callers of the same key
+# wait on one Future.
+_pool_lock = threading.RLock()
+_credentials = {}   # tuple(scopes): Credentials
+_gspread_client = None
+_spreadsheets = {}  # spreadsheet_id: Future of gspread.Spreadsheet
+_worksheets = {}    # (spreadsheet_id, worksheet title): Future of gspread.Worksheet
+
+def _needs_refresh(creds):
+    """Return True if the token is missing or about to expire."""
+    if not creds.token or creds.expiry is None:
+        return True
+    return creds.expiry - datetime.utcnow() < timedelta(seconds=TOKEN_REFRESH_MARGIN)
+
+def get_credentials(scopes=SCOPES):
+    """Return pooled service-account credentials for the given scopes.
+
+    The service-account file is read once per scope set and the token is
+    refreshed ahead of expiry, so callers always get a usable credential.
+    """
+    key = tuple(scopes)
+    with _pool_lock:
+        creds = _credentials.get(key)
+        if creds is None:
+            creds = Credentials.from_service_account_file(
+                SERVICE_ACCOUNT_FILE,
+                scopes=list(scopes)
+            )
+            _credentials[key] = creds
+        if _needs_refresh(creds):
+            creds.refresh(Request())
+        return creds
+
+class RateLimitedClient(gspread.Client):
+    """gspread client whose every HTTP call goes through the rate limiter.
+
+    All Spreadsheet/Worksheet methods end up in Client.request(), so this
+    covers reads, writes, formatting and Drive metadata probes alike.
+    """
+
+    def request(self, method, endpoint, *args, **kwargs):
+        if 'googleapis.com/drive' in endpoint:
+            api = 'drive'
+        elif method.lower() == 'get':
+            api = 'sheets_read'
+        else:
+            api = 'sheets_write'
+        return call_with_backoff(
+            lambda: gspread.Client.request(self, method, endpoint, *args, **kwargs),
+            api=api
+        )
+
+def authorize_client(credentials, client_class=RateLimitedClient):
+    """Build a gspread client; the fakes are built through this call too."""
+    return gspread.authorize(credentials, client_class=client_class)
+
+def _fake_api_wrap(kind, fn):
+    # Calendar call sites apply the limiter themselves
+    if kind == 'calendar':
+        return fn()
+    return call_with_backoff(fn, api=kind)
+
+def _fake_google():
+    return fake_google_from_env(wrap=_fake_api_wrap, authorize=authorize_client)
+
+def get_fake_calendar_service():
+    """Return the in-process Calendar fake used when GOOGLE_BACKEND=fake."""
+    return _fake_google()[1]
+
 def get_gspread_client():
-    creds = Credentials.from_service_account_file(
-        SERVICE_ACCOUNT_FILE,
-        scopes=SCOPES
+    """Return the shared, authorized gspread client."""
+    global _gspread_client
+    if USE_FAKE_GOOGLE:
+        return _fake_google()[0]
+    with _pool_lock:
+        creds = get_credentials(SCOPES)
+        if _gspread_client is None:
+            _gspread_client = authorize_client(creds)
+        return _gspread_client
+
+def _pooled(pool, key, open_handle):
+    """Return pool[key], calling open_handle() once if it is not pooled yet.
+
+    The call runs outside _pool_lock; a failed open is not pooled, so the
+    next caller tries again.
+    """
+    with _pool_lock:
+        future = pool.get(key)
+        opening = future is None
+        if opening:
+            future = pool[key] = Future()
+    if opening:
+        try:
+            future.set_result(open_handle())
+        except BaseException as e:
+            with _pool_lock:
+                if pool.get(key) is future:
+                    del pool[key]
+            future.set_exception(e)
+    return future.result()
+
+def open_spreadsheet(spreadsheet_id=None):
+    """Return a cached Spreadsheet handle (defaults to SPREADSHEET_ID)."""
+    spreadsheet_id = spreadsheet_id or SPREADSHEET_ID
+    return _pooled(_spreadsheets, spreadsheet_id, lambda: get_gspread_client().open_by_key(spreadsheet_id))
+
+def get_worksheet(sheet_name, spreadsheet_id=None, refresh=False):
+    """Return a cached Worksheet handle.
+
+    Raises gspread.exceptions.WorksheetNotFound like Spreadsheet.worksheet();
+    missing worksheets are never cached so they can be created later.
+    gspread does not update a handle's row_count/col_count after row
+    inserts or deletes; pass refresh=True to reopen the handle before
+    relying on them.
+    """
+    spreadsheet_id = spreadsheet_id or SPREADSHEET_ID
+    if refresh:
+        evict_worksheet(sheet_name, spreadsheet_id)
+    return _pooled(
+        _worksheets, (spreadsheet_id, sheet_name),
+        lambda: open_spreadsheet(spreadsheet_id).worksheet(sheet_name)
     )
-    return gspread.authorize(creds)
 
-def get_sheet_data(sheet_name):
-    """Fetch both headers and data from a specific worksheet."""
-    gc = get_gspread_client()
-    worksheet = gc.open_by_key(SPREADSHEET_ID).worksheet(sheet_name)
+def evict_worksheet(sheet_name, spreadsheet_id=None):
+    """Drop a pooled Worksheet handle, e.g. after resizing the worksheet."""
+    with _pool_lock:
+        _worksheets.pop((spreadsheet_id or SPREADSHEET_ID, sheet_name), None)
+
+@contextmanager
+def pooled_worksheet(sheet_name, spreadsheet_id=None):
+    """Yield the pooled Worksheet handle, evicting it if Google rejects a call.
+
+    A worksheet renamed, deleted or resized outside the app makes requests
+    through the old handle fail; the next caller then reopens it.
+    Rate-limit and server errors leave the handle pooled.
+    """
+    worksheet = get_worksheet(sheet_name, spreadsheet_id)
+    try:
+        yield worksheet
+    except Exception as e:
+        status = error_status(e)
+        if status is not None and status not in RETRY_STATUSES:
+            evict_worksheet(sheet_name, spreadsheet_id)
+        raise
+
+def reset_client_pool(spreadsheet_id=None):
+    """Drop cached handles (all, or those of one spreadsheet).
+
+    Use after renaming or deleting worksheets outside the app.
+    """
+    global _gspread_client
+    with _pool_lock:
+        if spreadsheet_id is None:
+            _credentials.clear()
+            _gspread_client = None
+            _spreadsheets.clear()
+            _worksheets.clear()
+            return
+        _spreadsheets.pop(spreadsheet_id, None)
+        for key in [k for k in _worksheets if k[0] == spreadsheet_id]:
+            del _worksheets[key]
+
+class SheetCache:
+    """Thread-safe read-through cache for worksheet reads.
+
+    Entries are keyed by (spreadsheet_id, worksheet title), expire after
+    ``ttl`` seconds and the least recently used entry is evicted once
+    ``max_entries`` is reached. Expired entries are kept, together with the
+    spreadsheet version they were read at, so they can be revalidated
+    instead of downloaded again.
+    """
+
+    def __init__(self, ttl=300, max_entries=32):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key: (stored_at, value, version)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key):
+        """Return the cached value for key, or None on a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.monotonic() - entry[0] >= self.ttl:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def peek(self, key):
+        """Return (value, version) even if expired, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            return (entry[1], entry[2]) if entry is not None else None
+
+    def touch(self, key):
+        """Mark an expired entry as fresh again after revalidation."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries[key] = (time.monotonic(), entry[1], entry[2])
+                self._entries.move_to_end(key)
+                self.revalidations += 1
+
+    def set(self, key, value, version=None):
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value, version)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, spreadsheet_id=None, sheet_name=None):
+        """Drop entries matching the given spreadsheet and/or worksheet."""
+        with self._lock:
+            for key in list(self._entries):
+                if spreadsheet_id is not None and key[0] != spreadsheet_id:
+                    continue
+                if sheet_name is not None and key[1] != sheet_name:
+                    continue
+                del self._entries[key]
+                self.invalidations += 1
+
+    def clear(self):
+        self.invalidate()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+                'revalidations': self.revalidations,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations
+            }
+
+sheet_cache = SheetCache(
+    ttl=int(os.getenv("SHEET_CACHE_TTL", 300)),
+    max_entries=int(os.getenv("SHEET_CACHE_MAX_ENTRIES", 32))
+)
+
+# Raw values of the billing/payments month worksheets
+values_cache = SheetCache(
+    ttl=int(os.getenv("SHEET_CACHE_TTL", 300)),
+    max_entries=int(os.getenv("SHEET_CACHE_MAX_ENTRIES", 32))
+)
+
+def get_sheet_cache_stats():
+    """Return hit/miss counters of the worksheet caches."""
+    stats = sheet_cache.stats()
+    stats['values'] = values_cache.stats()
+    return stats
+
+# Change detection: before re-downloading an expired worksheet, ask Drive
+# whether the spreadsheet changed at all. The probe result is shared for
+# CHANGE_PROBE_INTERVAL seconds so one page load probes each file once.
+CHANGE_DETECTION_ENABLED = os.getenv("CHANGE_DETECTION_ENABLED", "1") == "1"
+CHANGE_PROBE_INTERVAL = float(os.getenv("CHANGE_PROBE_INTERVAL", 10))
+DRIVE_FILES_URL = "https://www.googleapis.com/drive/v3/files/"
+
+_versions_lock = threading.Lock()
+_spreadsheet_versions = {}  # spreadsheet_id: (checked_at, version)
+
+def get_spreadsheet_version(spreadsheet_id):
+    """Return Drive's version number of a spreadsheet, or None if unknown.
+
+    The version changes on every edit, so an unchanged version means any
+    cached worksheet of that spreadsheet is still current.
+    """
+    if not CHANGE_DETECTION_ENABLED or not spreadsheet_id:
+        return None
+    now = time.monotonic()
+    with _versions_lock:
+        entry = _spreadsheet_versions.get(spreadsheet_id)
+        if entry is not None and now - entry[0] < CHANGE_PROBE_INTERVAL:
+            return entry[1]
+    try:
+        response = get_gspread_client().request(
+            'get',
+            DRIVE_FILES_URL + spreadsheet_id,
+            params={'fields': 'version,modifiedTime', 'supportsAllDrives': True}
+        )
+        metadata = response.json()
+        version = metadata.get('version') or metadata.get('modifiedTime')
+    except Exception as e:
+        print(f"Error probing spreadsheet version for {spreadsheet_id}: {e}")
+        return None
+    with _versions_lock:
+        _spreadsheet_versions[spreadsheet_id] = (now, version)
+    return version
+
+def get_source_version(spreadsheet_id):
+    """Return a version of what reads of a spreadsheet return, or None if unknown.
+
+    This is the Drive version, qualified by the SQLite mirror's last sync
+    when the mirror serves the reads.
+    """
+    version = get_spreadsheet_version(spreadsheet_id)
+    mirror = storage_backend.data_version(spreadsheet_id)
+    if version is None or mirror is None:
+        return None
+    return f"{version}@{mirror}" if mirror else str(version)
+
+def _read_through(cache, spreadsheet_id, sheet_name, loader, use_cache=True):
+    """Return loader() through cache, revalidating expired entries.
+
+    Entries are stamped with get_source_version(), so a SQLite mirror that
+    lagged behind an edit is read again once it has synced. The version is
+    probed before loading so an edit made during the download is picked up
+    by the next probe.
+    """
+    key = (spreadsheet_id, sheet_name)
+    if use_cache:
+        value = cache.get(key)
+        if value is not None:
+            return value
+    version = get_source_version(spreadsheet_id)
+    if use_cache and version is not None:
+        stale = cache.peek(key)
+        if stale is not None and stale[1] == version:
+            cache.touch(key)
+            return stale[0]
+    value = loader()
+    cache.set(key, value, version)
+    return value
+
+class GoogleSheetsBackend(StorageBackend):
+    """Reads worksheets straight from Google through the client pool."""
+
+    name = 'sheets'
+
+    def get_values(self, spreadsheet_id, sheet_name):
+        with pooled_worksheet(sheet_name, spreadsheet_id) as worksheet:
+            return worksheet.get_all_values()
+
+    def get_many_values(self, spreadsheet_id, sheet_names):
+        response = open_spreadsheet(spreadsheet_id).values_batch_get(
+            [absolute_range_name(name) for name in sheet_names]
+        )
+        return [value_range.get('values', []) for value_range in response.get('valueRanges', [])]
+
+def _mirrored_sheets():
+    """Worksheets kept in the SQLite mirror."""
+    mirrored = [
+        (SPREADSHEET_ID, os.getenv("INSTRUCTORS_SHEET_NAME", "מדריכים")),
+        (SPREADSHEET_ID, os.getenv("clients_private_SHEET_NAME", "לקוחות פרטיים")),
+        (SPREADSHEET_ID, os.getenv("clients_institutional_SHEET_NAME", "לקוחות מוסדיים")),
+        (os.getenv('billing_SPREADSHEET_ID'), 'תעריפים והנחות'),
+        (os.getenv('payment_SPREADSHEET_ID'), 'שכר שעה')
+    ]
+    return [key for key in mirrored if key[0]]
+
+def _create_storage_backend():
+    """Pick the storage backend from STORAGE_BACKEND ('sheets' or 'sqlite')."""
+    backend = GoogleSheetsBackend()
+    if os.getenv("STORAGE_BACKEND", "sheets") == "sqlite":
+        backend = SQLiteBackend(
+            backend,
+            db_path=os.getenv("SQLITE_MIRROR_PATH", "sheets_mirror.db"),
+            mirrored=_mirrored_sheets(),
+            interval=int(os.getenv("SQLITE_SYNC_INTERVAL", 300))
+        )
+    return backend
+
+storage_backend = _create_storage_backend()
+
+def get_storage_status():
+    """Return the status of the active storage backend."""
+    return storage_backend.status()
+
+def invalidate_sheet(sheet_name, spreadsheet_id=None):
+    """Forget cached copies of a worksheet after writing to it."""
+    spreadsheet_id = spreadsheet_id or SPREADSHEET_ID
+    sheet_cache.invalidate(spreadsheet_id, sheet_name)
+    values_cache.invalidate(spreadsheet_id, sheet_name)
+    storage_backend.invalidate(spreadsheet_id, sheet_name)
+    with _versions_lock:
+        _spreadsheet_versions.pop(spreadsheet_id, None)
+
+def _flush_row_updates(spreadsheet_id, row_updates):
+    """Write {(sheet_name, row): {col: value}} with one values.batchUpdate."""
+    data = []
+    for (sheet_name, row), updates in row_updates.items():
+        # One range per run of adjacent columns
+        cols = sorted(updates)
+        run_start = cols[0]
+        run = []
+        for i, col in enumerate(cols):
+            run.append(updates[col])
+            if i + 1 == len(cols) or cols[i + 1] != col + 1:
+                a1_range = f"{rowcol_to_a1(row, run_start)}:{rowcol_to_a1(row, col)}"
+                data.append({
+                    'range': absolute_range_name(sheet_name, a1_range),
+                    'values': [run]
+                })
+                if i + 1 < len(cols):
+                    run_start = cols[i + 1]
+                    run = []
     
-    # Get headers from first row
-    headers = worksheet.row_values(1)
+    open_spreadsheet(spreadsheet_id).values_batch_update(body={
+        'valueInputOption': 'RAW',
+        'data': data
+    })
+    for sheet_name in {sheet_name for sheet_name, _ in row_updates}:
+        invalidate_sheet(sheet_name, spreadsheet_id)
+
+# Row edits are acknowledged immediately and flushed in the background
+WRITE_BEHIND_ENABLED = os.getenv("WRITE_BEHIND_ENABLED", "1") == "1"
+
+# Created by start_write_queue(); until then row edits are written directly
+write_queue = None
+
+def start_write_queue():
+    """Create the write-behind queue and replay its journal.
+
+    Only the first process to lock the journal queues writes. Other worker
+    processes write row edits directly: a queue there would not see the
+    owner's pending edits, and its reads would miss them.
+    """
+    global write_queue
+    if WRITE_BEHIND_ENABLED and write_queue is None:
+        try:
+            write_queue = WriteBehindQueue(
+                _flush_row_updates,
+                journal_path=os.getenv("WRITE_QUEUE_JOURNAL", "write_queue.journal"),
+                interval=float(os.getenv("WRITE_QUEUE_FLUSH_INTERVAL", 2)),
+                max_attempts=int(os.getenv("WRITE_QUEUE_MAX_ATTEMPTS", 5))
+            )
+        except JournalLockedError as e:
+            print(f"Write-behind disabled in this process: {e}")
+    return write_queue
+
+def get_write_queue_status():
+    """Return counters of the write-behind queue."""
+    if write_queue is None:
+        return {'running': False, 'enabled': WRITE_BEHIND_ENABLED}
+    return write_queue.status()
+
+def flush_pending_writes():
+    """Flush queued row updates to Google now."""
+    return write_queue.flush() if write_queue is not None else 0
+
+def _copy_sheet_data(headers, records, spreadsheet_id=None, sheet_name=None):
+    # Callers annotate records in place (e.g. 'sheet_row'), so never hand
+    # out the cached objects themselves.
+    headers, records = list(headers), [dict(record) for record in records]
     
-    # Get all records as dictionaries
-    records = worksheet.get_all_records()
+    # Show queued edits that have not been flushed yet
+    if sheet_name is not None and write_queue is not None:
+        for row, updates in write_queue.pending_for(spreadsheet_id, sheet_name).items():
+            if not 2 <= row < len(records) + 2:
+                continue
+            for col, value in updates.items():
+                if col <= len(headers):
+                    records[row - 2][headers[col - 1]] = value
+    return headers, records
+
+def _sheet_data_from_values(values):
+    """Build (headers, records) from a raw values payload.
+
+    Mirrors Worksheet.row_values(1) plus Worksheet.get_all_records(): the
+    first row is the header row, short rows are padded and values are
+    numericised.
+    """
+    if not values:
+        return [], []
+    width = max(len(row) for row in values)
+    keys = values[0] + [''] * (width - len(values[0]))
+    records = []
+    for row in values[1:]:
+        row = row + [''] * (width - len(row))
+        records.append(dict(zip(keys, numericise_all(row, empty2zero=False, default_blank=''))))
     
+    # row_values() never returned the trailing empty header cells
+    headers = list(values[0])
+    while headers and headers[-1] == '':
+        headers.pop()
     return headers, records
 
+def get_many_sheets(sheet_names, spreadsheet_id=None, use_cache=True):
+    """Fetch several worksheets with a single values.batchGet request.
+
+    Returns a list of (headers, records) tuples in the order of
+    sheet_names, with the same shape as get_sheet_data(). Worksheets that
+    are already cached, or whose spreadsheet has not changed since they
+    were cached, are not requested again.
+    """
+    spreadsheet_id = spreadsheet_id or SPREADSHEET_ID
+    results = {}
+    missing = []
+    for name in sheet_names:
+        cached = sheet_cache.get((spreadsheet_id, name)) if use_cache else None
+        if cached is not None:
+            results[name] = cached
+        elif name not in missing:
+            missing.append(name)
+    
+    version = get_source_version(spreadsheet_id) if missing else None
+    if use_cache and version is not None:
+        for name in list(missing):
+            stale = sheet_cache.peek((spreadsheet_id, name))
+            if stale is not None and stale[1] == version:
+                sheet_cache.touch((spreadsheet_id, name))
+                results[name] = stale[0]
+                missing.remove(name)
+    
+    if missing:
+        for name, values in zip(missing, storage_backend.get_many_values(spreadsheet_id, missing)):
+            data = _sheet_data_from_values(values)
+            sheet_cache.set((spreadsheet_id, name), data, version)
+            results[name] = data
+    
+    return [
+        _copy_sheet_data(*results[name], spreadsheet_id=spreadsheet_id, sheet_name=name)
+        for name in sheet_names
+    ]
+
+def get_sheet_data(sheet_name, use_cache=True, spreadsheet_id=None):
+    """Fetch both headers and data from a specific worksheet.
+
+    Reads are served from ``sheet_cache`` when fresh; pass use_cache=False
+    to force a read from the storage backend. spreadsheet_id defaults to
+    SPREADSHEET_ID.
+    """
+    spreadsheet_id = spreadsheet_id or SPREADSHEET_ID
+    
+    # Headers and records both come from a single request
+    headers, records = _read_through(
+        sheet_cache,
+        spreadsheet_id,
+        sheet_name,
+        lambda: _sheet_data_from_values(storage_backend.get_values(spreadsheet_id, sheet_name)),
+        use_cache=use_cache
+    )
+    return _copy_sheet_data(headers, records, spreadsheet_id=spreadsheet_id, sheet_name=sheet_name)
+
+_indexes_lock = threading.Lock()
+_sheet_indexes = {}  # (spreadsheet_id, sheet_name, build): (sheet data, index)
+
+def get_sheet_index(sheet_name, build, spreadsheet_id=None, use_cache=True):
+    """Return build(headers, records) for a worksheet, cached with it.
+
+    The index is rebuilt only when the worksheet is read again (it expired
+    and changed, or a write invalidated it), so lookups in between are
+    dictionary hits. build() gets the cached records and must not modify
+    them.
+    """
+    spreadsheet_id = spreadsheet_id or SPREADSHEET_ID
+    data = _read_through(
+        sheet_cache,
+        spreadsheet_id,
+        sheet_name,
+        lambda: _sheet_data_from_values(storage_backend.get_values(spreadsheet_id, sheet_name)),
+        use_cache=use_cache
+    )
+    key = (spreadsheet_id, sheet_name, build)
+    with _indexes_lock:
+        entry = _sheet_indexes.get(key)
+        if entry is not None and entry[0] is data:
+            return entry[1]
+    index = build(*data)
+    with _indexes_lock:
+        _sheet_indexes[key] = (data, index)
+    return index
+
 def fetch_instructors(sheet_name):
     """Fetch instructors data using get_sheet_data."""
     headers, records = get_sheet_data(sheet_name)
@@ -50,6 +627,9 @@ def update_instructor(sheet_name, row, updates):
         row: Row number (1-indexed)
         updates: Dictionary mapping column indices (1-indexed) to values
         
+    Once start_write_queue() has run the row is queued on ``write_queue``
+    and written by the next background flush.
+        
     Raises:
         Exception: If there's an error updating the worksheet
     """
@@ -57,18 +637,6 @@ def update_instructor(sheet_name, row, updates):
     print(f"Updates to process: {updates}")
     
     try:
-        print("Authenticating with Google Sheets API...")
-        gc = get_gspread_client()
-        print("Successfully authenticated")
-        
-        print(f"Opening spreadsheet with ID: {SPREADSHEET_ID}")
-        spreadsheet = gc.open_by_key(SPREADSHEET_ID)
-        print("Successfully opened spreadsheet")
-        
-        print(f"Getting worksheet: {sheet_name}")
-        worksheet = spreadsheet.worksheet(sheet_name)
-        print(f"Successfully accessed worksheet: {worksheet.title}")
-        
         # Convert row to integer in case it's passed as string
         row = int(row)
         print(f"Processing row: {row}")
@@ -95,9 +663,16 @@ def update_instructor(sheet_name, row, updates):
         # Verify the data before updating
         print(f"Data to update: {[values]}")
         
+        if write_queue is not None:
+            write_queue.enqueue(SPREADSHEET_ID, sheet_name, row, dict(enumerate(values, start=1)))
+            print("Queued update for background flush")
+            return
+        
         # Update the row with the new values
         print("Sending update to Google Sheets...")
-        worksheet.update(range_name, [values])
+        with pooled_worksheet(sheet_name) as worksheet:
+            worksheet.update(range_name, [values])
+        invalidate_sheet(sheet_name)
         print("Successfully updated worksheet")
         
     except Exception as e:
@@ -114,17 +689,18 @@ def update_instructor(sheet_name, row, updates):
         raise Exception(f"Failed to update Google Sheet: {error_msg}") from e
 
 def add_instructor(sheet_name, instructor_data):
-    gc = get_gspread_client()
-    worksheet = gc.open_by_key(SPREADSHEET_ID).worksheet(sheet_name)
-    worksheet.append_row(instructor_data)
+    with pooled_worksheet(sheet_name) as worksheet:
+        worksheet.append_row(instructor_data)
+    # The append may have grown the grid
+    evict_worksheet(sheet_name)
+    invalidate_sheet(sheet_name)
 
 def fetch_billing_data():
     """Fetch billing data from the dedicated billing spreadsheet."""
     try:
-        gc = get_gspread_client()
         # Use the dedicated billing spreadsheet ID
         billing_spreadsheet_id = os.getenv('billing_SPREADSHEET_ID')
-        worksheet = gc.open_by_key(billing_spreadsheet_id).sheet1  # Get first sheet
+        worksheet = open_spreadsheet(billing_spreadsheet_id).sheet1  # Get first sheet
         
         # Get all records including headers
         all_values = worksheet.get_all_values()
@@ -142,6 +718,8 @@ def fetch_billing_data():
         )
         
         return headers, sorted_records
+    except QuotaExceededError:
+        raise
     except Exception as e:
         print(f"Error fetching billing data: {e}")
         return [], []
@@ -154,12 +732,13 @@ def get_billing_worksheets():
     ]
     
     try:
-        gc = get_gspread_client()
         billing_spreadsheet_id = os.getenv('billing_SPREADSHEET_ID')
-        spreadsheet = gc.open_by_key(billing_spreadsheet_id)
+        spreadsheet = open_spreadsheet(billing_spreadsheet_id)
         # Filter worksheets that start with month names
         return [ws.title for ws in spreadsheet.worksheets() 
                 if any(ws.title.startswith(month) for month in hebrew_months)]
+    except QuotaExceededError:
+        raise
     except Exception as e:
         print(f"Error fetching worksheet names: {e}")
         return []
@@ -167,9 +746,7 @@ def get_billing_worksheets():
 def fetch_billing_data(worksheet_name=None):
     """Fetch billing data from specific worksheet."""
     try:
-        gc = get_gspread_client()
         billing_spreadsheet_id = os.getenv('billing_SPREADSHEET_ID')
-        spreadsheet = gc.open_by_key(billing_spreadsheet_id)
         
         # If no worksheet specified, use first available month worksheet
         if not worksheet_name:
@@ -179,8 +756,12 @@ def fetch_billing_data(worksheet_name=None):
         if not worksheet_name:
             return [], []
             
-        worksheet = spreadsheet.worksheet(worksheet_name)
-        all_values = worksheet.get_all_values()
+        all_values = _read_through(
+            values_cache,
+            billing_spreadsheet_id,
+            worksheet_name,
+            lambda: storage_backend.get_values(billing_spreadsheet_id, worksheet_name)
+        )
         
         if not all_values:
             return [], []
@@ -189,6 +770,8 @@ def fetch_billing_data(worksheet_name=None):
         records = [dict(zip(headers, row)) for row in all_values[1:]]
         
         return headers, records
+    except QuotaExceededError:
+        raise
     except Exception as e:
         print(f"Error fetching billing data: {e}")
         return [], []
@@ -200,11 +783,12 @@ def get_payment_worksheets():
         "יולי", "אוגוסט", "ספטמבר", "אוקטובר", "נובמבר", "דצמבר"
     ]
     try:
-        gc = get_gspread_client()
         payment_spreadsheet_id = os.getenv('payment_SPREADSHEET_ID')
-        spreadsheet = gc.open_by_key(payment_spreadsheet_id)
+        spreadsheet = open_spreadsheet(payment_spreadsheet_id)
         return [ws.title for ws in spreadsheet.worksheets()
                 if any(ws.title.startswith(month) for month in hebrew_months)]
+    except QuotaExceededError:
+        raise
     except Exception as e:
         print(f"Error fetching payment worksheet names: {e}")
         return []
@@ -212,16 +796,18 @@ def get_payment_worksheets():
 def fetch_payment_data(worksheet_name=None):
     """Fetch payment data from a specific worksheet in the payments spreadsheet."""
     try:
-        gc = get_gspread_client()
         payments_spreadsheet_id = os.getenv('payments_SPREADSHEET_ID')
         
+        # Get all records including headers
         if worksheet_name:
-            worksheet = gc.open_by_key(payments_spreadsheet_id).worksheet(worksheet_name)
+            all_values = _read_through(
+                values_cache,
+                payments_spreadsheet_id,
+                worksheet_name,
+                lambda: storage_backend.get_values(payments_spreadsheet_id, worksheet_name)
+            )
         else:
-            worksheet = gc.open_by_key(payments_spreadsheet_id).sheet1
-        
-        # Get all records including headers
-        all_values = worksheet.get_all_values()
+            all_values = open_spreadsheet(payments_spreadsheet_id).sheet1.get_all_values()
         if not all_values or len(all_values) < 2:  # Need at least headers and one data row
             return [], []
             
@@ -229,6 +815,8 @@ def fetch_payment_data(worksheet_name=None):
         records = [dict(zip(headers, row)) for row in all_values[1:]]  # Convert to dict
         
         return headers, records
+    except QuotaExceededError:
+        raise
     except Exception as e:
         print(f"Error fetching payment data: {e}")
         return [], []
@@ -244,9 +832,11 @@ def append_row(sheet_name, row_data):
         The result of the append operation
     """
     try:
-        gc = get_gspread_client()
-        worksheet = gc.open_by_key(SPREADSHEET_ID).worksheet(sheet_name)
-        result = worksheet.append_row(row_data)
+        with pooled_worksheet(sheet_name) as worksheet:
+            result = worksheet.append_row(row_data)
+        # The append may have grown the grid
+        evict_worksheet(sheet_name)
+        invalidate_sheet(sheet_name)
         return result
     except Exception as e:
         print(f"Error appending row to {sheet_name}: {e}")
@@ -261,11 +851,18 @@ def update_row(sheet_name, row_number, updates):
         updates: Dictionary of {column_letter: value} pairs to update
         
     Returns:
-        The result of the update operation
+        The result of the update operation (True once queued on the
+        write-behind queue)
     """
     try:
-        gc = get_gspread_client()
-        worksheet = gc.open_by_key(SPREADSHEET_ID).worksheet(sheet_name)
+        if write_queue is not None:
+            if not updates:
+                return False
+            write_queue.enqueue(SPREADSHEET_ID, sheet_name, row_number, {
+                a1_to_rowcol(f"{col_letter.upper()}1")[1]: value
+                for col_letter, value in updates.items()
+            })
+            return True
         
         # Convert column letters to A1 notation (e.g., {'A': 'value'} -> 'A2')
         cell_updates = []
@@ -277,7 +874,9 @@ def update_row(sheet_name, row_number, updates):
             })
         
         if cell_updates:
-            worksheet.batch_update(cell_updates)
+            with pooled_worksheet(sheet_name) as worksheet:
+                worksheet.batch_update(cell_updates)
+            invalidate_sheet(sheet_name)
             return True
         return False
     except Exception as e:
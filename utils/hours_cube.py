@@ -0,0 +1,134 @@
+try:
+    import numpy as np
+except ImportError:  # Optional: the cube falls back to plain lists
+    np = None
+
+
+class HoursCube:
+    """Event hours of a period as a client x instructor matrix.
+
+    Events are stored as columns of integer client / instructor ids and
+    durations; ids are assigned in order of first appearance. The matrix is
+    built with one group-by over the columns, and billing (client, then
+    instructor) and payroll (instructor, then client) are both read from
+    it. Uses NumPy when it is installed and plain lists otherwise; the
+    results are the same.
+    """
+
+    def __init__(self, clients, instructors, client_ids, instructor_ids, hours):
+        self.clients = list(clients)
+        self.instructors = list(instructors)
+        self.client_ids = list(client_ids)
+        self.instructor_ids = list(instructor_ids)
+        self.event_hours = list(hours)
+        self._client_index = {name: index for index, name in enumerate(self.clients)}
+        self._instructor_index = {name: index for index, name in enumerate(self.instructors)}
+        if np is not None:
+            self._build_arrays()
+        else:
+            self._build_lists()
+
+    @classmethod
+    def from_records(cls, records):
+        """Build the cube of the EventRecords that have a client."""
+        clients, instructors = {}, {}
+        client_ids, instructor_ids, hours = [], [], []
+        for record in records:
+            if not record.client:
+                continue
+            client_ids.append(clients.setdefault(record.client, len(clients)))
+            instructor_ids.append(instructors.setdefault(record.instructor, len(instructors)))
+            hours.append(record.hours)
+        return cls(clients, instructors, client_ids, instructor_ids, hours)
+
+    @classmethod
+    def combine(cls, cubes):
+        """Roll several cubes (e.g. the months of a year) up into one."""
+        clients, instructors = {}, {}
+        client_ids, instructor_ids, hours = [], [], []
+        for cube in cubes:
+            client_map = [clients.setdefault(name, len(clients)) for name in cube.clients]
+            instructor_map = [instructors.setdefault(name, len(instructors)) for name in cube.instructors]
+            client_ids.extend(client_map[index] for index in cube.client_ids)
+            instructor_ids.extend(instructor_map[index] for index in cube.instructor_ids)
+            hours.extend(cube.event_hours)
+        return cls(clients, instructors, client_ids, instructor_ids, hours)
+
+    def _build_arrays(self):
+        width = len(self.instructors)
+        cells = len(self.clients) * width
+        client_ids = np.asarray(self.client_ids, dtype=np.intp)
+        instructor_ids = np.asarray(self.instructor_ids, dtype=np.intp)
+        hours = np.asarray(self.event_hours, dtype=float)
+        flat = client_ids * width + instructor_ids
+        # bincount adds the weights in event order, like a running total
+        self._hours = np.bincount(flat, weights=hours, minlength=cells).reshape(len(self.clients), width)
+        self._client_totals = np.bincount(client_ids, weights=hours, minlength=len(self.clients))
+        self._instructor_totals = np.bincount(instructor_ids, weights=hours, minlength=width)
+        # Index of the first event in each cell; len(hours) marks an empty cell
+        first = np.full(cells, len(hours), dtype=np.intp)
+        np.minimum.at(first, flat, np.arange(len(hours), dtype=np.intp))
+        self._first = first.reshape(len(self.clients), width)
+
+    def _build_lists(self):
+        width = len(self.instructors)
+        self._hours = [[0.0] * width for _ in self.clients]
+        self._client_totals = [0.0] * len(self.clients)
+        self._instructor_totals = [0.0] * width
+        self._first = [[len(self.event_hours)] * width for _ in self.clients]
+        for position, (client, instructor, hours) in enumerate(
+            zip(self.client_ids, self.instructor_ids, self.event_hours)
+        ):
+            self._hours[client][instructor] += hours
+            self._client_totals[client] += hours
+            self._instructor_totals[instructor] += hours
+            if self._first[client][instructor] > position:
+                self._first[client][instructor] = position
+
+    def _cells(self, hours, first, names):
+        # Non-empty cells of one row or column, in order of their first event
+        empty = len(self.event_hours)
+        if np is not None:
+            present = np.flatnonzero(first < empty)
+            order = present[np.argsort(first[present])]
+        else:
+            order = sorted((index for index in range(len(names)) if first[index] < empty), key=first.__getitem__)
+        return [(names[index], float(hours[index])) for index in order]
+
+    @property
+    def total_hours(self):
+        return float(sum(self._client_totals))
+
+    def client_hours(self, client):
+        """Return (total hours, [(instructor, hours)]) of one client."""
+        index = self._client_index.get(client)
+        if index is None:
+            return 0.0, []
+        return float(self._client_totals[index]), self._cells(
+            self._hours[index], self._first[index], self.instructors
+        )
+
+    def instructor_hours(self, instructor):
+        """Return (total hours, [(client, hours)]) of one instructor."""
+        index = self._instructor_index.get(instructor)
+        if index is None:
+            return 0.0, []
+        if np is not None:
+            hours, first = self._hours[:, index], self._first[:, index]
+        else:
+            hours = [row[index] for row in self._hours]
+            first = [row[index] for row in self._first]
+        return float(self._instructor_totals[index]), self._cells(hours, first, self.clients)
+
+    def by_client(self):
+        """Yield (client, total hours, [(instructor, hours)]) for billing."""
+        for client in self.clients:
+            yield (client,) + self.client_hours(client)
+
+    def by_instructor(self):
+        """Yield (instructor, total hours, [(client, hours)]) for payroll."""
+        for instructor in self.instructors:
+            yield (instructor,) + self.instructor_hours(instructor)
+
+    def __len__(self):
+        return len(self.event_hours)
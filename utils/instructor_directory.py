@@ -0,0 +1,79 @@
+import threading
+
+
+class InstructorDirectory:
+    """Instructors of the instructors sheet, indexed for O(1) lookups.
+
+    An instructor can be found by full email and by email username (both
+    case-insensitive) or by display name. Unknown keys return None.
+    """
+
+    def __init__(self, instructors):
+        self.rows = list(instructors)
+        self._by_email = {}
+        self._by_username = {}
+        self._by_name = {}
+        for row in self.rows:
+            email = str(row.get('מייל', '')).strip().lower()
+            name = str(row.get('שם', '')).strip()
+            if '@' in email:
+                # An instructor without a name is shown by username
+                name = name or email.split('@')[0]
+                self._by_email.setdefault(email, name)
+                self._by_username.setdefault(email.split('@')[0], name)
+            if name:
+                self._by_name.setdefault(name, row)
+        self.names = frozenset(self._by_name)
+
+    def lookup(self, value):
+        """Return the instructor name for an email, username or name."""
+        value = (value or '').strip()
+        if not value:
+            return None
+        if value in self._by_name:
+            return value
+        key = value.lower()
+        if '@' in key:
+            return self._by_email.get(key) or self._by_username.get(key.split('@')[0])
+        return self._by_username.get(key)
+
+    def get(self, name):
+        """Return the sheet row of an instructor by name, or None."""
+        return self._by_name.get(name)
+
+    def resolve(self, event):
+        """Return (email, name) of the instructor of a Calendar event.
+
+        The organizer is tried first (it works for Microsoft accounts), then
+        the creator (Gmail). ``name`` is None when neither is a known
+        instructor; ``email`` is then the organizer's, else the creator's.
+        """
+        emails = [
+            (event.get(role) or {}).get('email', '').strip()
+            for role in ('organizer', 'creator')
+        ]
+        emails = [email for email in emails if email]
+        for email in emails:
+            name = self.lookup(email)
+            if name is not None:
+                return email, name
+        return (emails[0] if emails else ''), None
+
+    def __len__(self):
+        return len(self.names)
+
+
+_directory_lock = threading.Lock()
+_directory = None
+_directory_key = None
+
+
+def get_instructor_directory(instructors):
+    """Return a directory of the instructors rows, rebuilt only when they change."""
+    global _directory, _directory_key
+    key = tuple((str(row.get('מייל', '')), str(row.get('שם', ''))) for row in instructors)
+    with _directory_lock:
+        if _directory is None or key != _directory_key:
+            _directory = InstructorDirectory(instructors)
+            _directory_key = key
+        return _directory
@@ -0,0 +1,213 @@
+import os
+import threading
+
+import gspread
+from gspread.utils import absolute_range_name, rowcol_to_a1
+
+from utils.google_sheets import evict_worksheet, get_sheet_index, get_worksheet, invalidate_sheet, open_spreadsheet
+
+
+# One writer per worksheet in this process: apply() plans against the
+# index, verifies and writes under the worksheet's lock, so two batches
+# never claim the same blank row.
+_locks_lock = threading.Lock()
+_sheet_locks = {}  # (spreadsheet_id, sheet_name): Lock
+
+
+def _sheet_lock(spreadsheet_id, sheet_name):
+    with _locks_lock:
+        return _sheet_locks.setdefault((spreadsheet_id, sheet_name), threading.Lock())
+
+
+def _normalize(value):
+    return str(value).strip()
+
+
+class KeyedSheet:
+    """A worksheet whose rows are identified by their key columns.
+
+    Rows are found through an index kept with the cached worksheet (see
+    get_sheet_index()) and always written whole. apply() saves a batch of
+    upserts and deletes with one values.batchUpdate, plus one append once
+    no blank rows are left for new rows. Deleted rows are blanked rather
+    than removed, so the rows below never shift under a concurrent writer;
+    the index skips blank rows. Before writing, the target rows are read
+    back in one request and compared with their keys. If rows moved since
+    the index was built, the index is reloaded once. Batches on the same
+    worksheet run one at a time within a process; the read-back guards
+    against writers in other processes.
+    """
+
+    def __init__(self, sheet_name, headers, key_columns, spreadsheet_env, header_format=None):
+        self.sheet_name = sheet_name
+        self.headers = list(headers)
+        self.key_columns = list(key_columns)
+        self.spreadsheet_env = spreadsheet_env
+        self.header_format = header_format
+
+    @property
+    def spreadsheet_id(self):
+        return os.getenv(self.spreadsheet_env)
+
+    def key(self, row):
+        """Return the key of a {column: value} row, or None if a key cell is blank."""
+        key = tuple(_normalize(row.get(column, '')) for column in self.key_columns)
+        return key if all(key) else None
+
+    def _build(self, headers, records):
+        # ({key: (row number, record)}, [blank row numbers]); when a key
+        # repeats the last row wins
+        rows = {}
+        blank = []
+        for row_number, record in enumerate(records, start=2):
+            key = self.key(record)
+            if key is not None:
+                rows[key] = (row_number, record)
+            elif not any(_normalize(value) for value in record.values()):
+                blank.append(row_number)
+        return rows, blank
+
+    def _snapshot(self, use_cache=True):
+        try:
+            return get_sheet_index(
+                self.sheet_name, self._build, spreadsheet_id=self.spreadsheet_id, use_cache=use_cache
+            )
+        except gspread.exceptions.WorksheetNotFound:
+            return {}, []
+
+    def index(self, use_cache=True):
+        """Return {key: (row number, record)} of the worksheet."""
+        return self._snapshot(use_cache)[0]
+
+    def get(self, row):
+        """Return the record stored under the key of row, or None."""
+        entry = self.index().get(self.key(row))
+        return entry[1] if entry else None
+
+    def _worksheet(self):
+        # Get or create the worksheet
+        try:
+            return get_worksheet(self.sheet_name, self.spreadsheet_id)
+        except gspread.exceptions.WorksheetNotFound:
+            spreadsheet = open_spreadsheet(self.spreadsheet_id)
+            worksheet = spreadsheet.add_worksheet(title=self.sheet_name, rows=1000, cols=len(self.headers))
+            worksheet.append_row(self.headers)
+            if self.header_format:
+                worksheet.format(f"A1:{rowcol_to_a1(1, len(self.headers))}", self.header_format)
+            return worksheet
+
+    def _range(self, row_number):
+        return absolute_range_name(
+            self.sheet_name, f"A{row_number}:{rowcol_to_a1(row_number, len(self.headers))}"
+        )
+
+    def _rows_match(self, expected):
+        """Check that rows still hold the expected keys (None: blank)."""
+        if not expected:
+            return True
+        response = open_spreadsheet(self.spreadsheet_id).values_batch_get(
+            [self._range(row_number) for row_number, _ in expected]
+        )
+        for (_, key), value_range in zip(expected, response.get('valueRanges', [])):
+            values = (value_range.get('values') or [[]])[0]
+            if key is None:
+                if any(_normalize(value) for value in values):
+                    return False
+            elif self.key(dict(zip(self.headers, values))) != key:
+                return False
+        return True
+
+    def _plan(self, changes, use_cache):
+        """Return (writes, appends, results, expected) for changes."""
+        rows, blank = self._snapshot(use_cache)
+        free = list(blank)
+        # Rows freed by this batch can take its new rows
+        free.extend(rows[key][0] for key, row in changes.items() if row is None and key in rows)
+        free.sort()
+        blank = set(blank)
+        writes, appends, results, expected = [], [], {}, []
+        for key, row in changes.items():
+            entry = rows.get(key)
+            if entry is not None:
+                expected.append((entry[0], key))
+            if row is None:
+                if entry is None:
+                    results[key] = 'unchanged'
+                    continue
+                writes.append((entry[0], [''] * len(self.headers)))
+                results[key] = 'removed'
+                continue
+            current = entry[1] if entry else {}
+            values = [row.get(column, current.get(column, '')) for column in self.headers]
+            if entry is not None:
+                writes.append((entry[0], values))
+                results[key] = 'updated'
+            elif free:
+                row_number = free.pop(0)
+                if row_number in blank:
+                    expected.append((row_number, None))
+                writes.append((row_number, values))
+                results[key] = 'added'
+            else:
+                appends.append(values)
+                results[key] = 'added'
+        # A freed row that gets a new row must not also be blanked
+        final = {}
+        for row_number, values in writes:
+            if row_number not in final or any(_normalize(value) for value in values):
+                final[row_number] = values
+        return sorted(final.items()), appends, results, expected
+
+    def apply(self, upserts=(), deletes=()):
+        """Save a batch of changes in one round trip.
+
+        ``upserts`` are {column: value} rows; each replaces the row with the
+        same key or adds one, and columns it leaves out keep their current
+        value. ``deletes`` are rows (only the key columns are needed) to
+        remove; a key both upserted and deleted is deleted. New rows fill
+        blank rows before any are appended, so the table never has gaps an
+        append could skip into. Returns {key: 'added' | 'updated' |
+        'removed' | 'unchanged'}.
+        """
+        changes = {}
+        for row in upserts:
+            key = self.key(row)
+            if key is None:
+                raise ValueError(f"Every change needs all of {', '.join(self.key_columns)}")
+            changes[key] = dict(changes.get(key) or {}, **row)
+        for row in deletes:
+            key = self.key(row)
+            if key is None:
+                raise ValueError(f"Every change needs all of {', '.join(self.key_columns)}")
+            changes[key] = None
+        if not changes:
+            return {}
+        if not self.spreadsheet_id:
+            raise RuntimeError(f"{self.spreadsheet_env} is not set")
+
+        with _sheet_lock(self.spreadsheet_id, self.sheet_name):
+            worksheet = self._worksheet()
+            writes, appends, results, expected = self._plan(changes, use_cache=True)
+            if not self._rows_match(expected):
+                # The sheet was edited since it was indexed
+                writes, appends, results, expected = self._plan(changes, use_cache=False)
+                if not self._rows_match(expected):
+                    raise RuntimeError(f"Rows of {self.sheet_name} are changing; try again")
+
+            if writes:
+                open_spreadsheet(self.spreadsheet_id).values_batch_update(body={
+                    'valueInputOption': 'RAW',
+                    'data': [
+                        {'range': self._range(row_number), 'values': [values]}
+                        for row_number, values in writes
+                    ]
+                })
+            if appends:
+                try:
+                    worksheet.append_rows(appends, value_input_option='RAW')
+                finally:
+                    # The append grows the grid, which the pooled handle does not see
+                    evict_worksheet(self.sheet_name, self.spreadsheet_id)
+            if writes or appends:
+                invalidate_sheet(self.sheet_name, self.spreadsheet_id)
+        return results
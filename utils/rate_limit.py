@@ -0,0 +1,166 @@
+import contextvars
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+# Request priorities, most important first. Lower priorities may only take a
+# token while the bucket holds more than their reserve, which keeps headroom
+# for interactive page loads when the quota runs low.
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 1
+PRIORITY_EXPORT = 2
+
+# Fraction of bucket capacity each priority must leave untouched
+PRIORITY_RESERVE = {
+    PRIORITY_INTERACTIVE: 0.0,
+    PRIORITY_BACKGROUND: 0.25,
+    PRIORITY_EXPORT: 0.5
+}
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Threads without a request (write-behind flushes, mirror syncs, warmers)
+# run as background work.
+_current_priority = contextvars.ContextVar('api_priority', default=PRIORITY_BACKGROUND)
+
+
+class QuotaExceededError(Exception):
+    """Raised when a Google API call still hits its quota after all retries."""
+
+    def __init__(self, api, retry_after):
+        super().__init__(f"Google {api} quota exceeded, retry in {retry_after:.0f}s")
+        self.api = api
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled at ``per_minute`` tokens a minute."""
+
+    def __init__(self, per_minute, capacity=None):
+        self.rate = per_minute / 60.0
+        self.capacity = capacity or max(1, per_minute // 4)
+        self.tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._cond = threading.Condition()
+        self.acquired = 0
+        self.waited = 0.0
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, priority=PRIORITY_INTERACTIVE):
+        """Block until a token is available for the given priority."""
+        reserve = self.capacity * PRIORITY_RESERVE.get(priority, 0.0)
+        started = time.monotonic()
+        with self._cond:
+            while True:
+                self._refill()
+                if self.tokens - 1 >= reserve:
+                    self.tokens -= 1
+                    self.acquired += 1
+                    self.waited += time.monotonic() - started
+                    # Let other waiters re-check their own reserve
+                    self._cond.notify_all()
+                    return
+                self._cond.wait((reserve + 1 - self.tokens) / self.rate)
+
+    def stats(self):
+        with self._cond:
+            self._refill()
+            return {
+                'per_minute': round(self.rate * 60),
+                'capacity': self.capacity,
+                'tokens': round(self.tokens, 2),
+                'acquired': self.acquired,
+                'waited_seconds': round(self.waited, 2)
+            }
+
+
+buckets = {
+    'sheets_read': TokenBucket(int(os.getenv("SHEETS_READ_PER_MINUTE", 60))),
+    'sheets_write': TokenBucket(int(os.getenv("SHEETS_WRITE_PER_MINUTE", 60))),
+    'drive': TokenBucket(int(os.getenv("DRIVE_PER_MINUTE", 600))),
+    'calendar': TokenBucket(int(os.getenv("CALENDAR_PER_MINUTE", 600)))
+}
+
+MAX_RETRIES = int(os.getenv("API_MAX_RETRIES", 5))
+BACKOFF_BASE = float(os.getenv("API_BACKOFF_BASE", 1.0))
+BACKOFF_MAX = float(os.getenv("API_BACKOFF_MAX", 32.0))
+
+_stats_lock = threading.Lock()
+_retries = {}    # api: retries performed
+_exhausted = {}  # api: calls that gave up
+
+
+def set_request_priority(priority):
+    """Set the priority of API calls made by the current request/thread."""
+    _current_priority.set(priority)
+
+
+def get_request_priority():
+    return _current_priority.get()
+
+
+@contextmanager
+def priority_scope(priority):
+    """Run a block of API calls at the given priority."""
+    token = _current_priority.set(priority)
+    try:
+        yield
+    finally:
+        _current_priority.reset(token)
+
+
+def error_status(error):
+    """Extract the HTTP status from gspread or googleapiclient errors."""
+    response = getattr(error, 'response', None)  # gspread.exceptions.APIError
+    if response is not None and getattr(response, 'status_code', None):
+        return response.status_code
+    resp = getattr(error, 'resp', None)  # googleapiclient.errors.HttpError
+    if resp is not None and getattr(resp, 'status', None):
+        return int(resp.status)
+    return None
+
+
+def call_with_backoff(fn, api, priority=None):
+    """Call fn() within the quota of ``api``, retrying 429/5xx responses.
+
+    Retries use exponential backoff with full jitter. A call that is still
+    rate limited after MAX_RETRIES raises QuotaExceededError; other errors
+    are re-raised unchanged.
+    """
+    bucket = buckets[api]
+    priority = get_request_priority() if priority is None else priority
+    attempt = 0
+    while True:
+        bucket.acquire(priority)
+        try:
+            return fn()
+        except Exception as e:
+            status = error_status(e)
+            if status not in RETRY_STATUSES:
+                raise
+            delay = min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt))
+            if attempt >= MAX_RETRIES:
+                with _stats_lock:
+                    _exhausted[api] = _exhausted.get(api, 0) + 1
+                if status == 429:
+                    raise QuotaExceededError(api, delay) from e
+                raise
+            attempt += 1
+            with _stats_lock:
+                _retries[api] = _retries.get(api, 0) + 1
+            print(f"Google {api} returned {status}, retry {attempt}/{MAX_RETRIES}")
+            time.sleep(random.uniform(0, delay))
+
+
+def get_rate_limit_stats():
+    with _stats_lock:
+        return {
+            api: dict(bucket.stats(), retries=_retries.get(api, 0), exhausted=_exhausted.get(api, 0))
+            for api, bucket in buckets.items()
+        }
@@ -0,0 +1,105 @@
+import os
+
+import gspread
+
+from utils.google_sheets import get_sheet_index
+from utils.keyed_sheet import KeyedSheet
+
+RATES_SHEET_NAME = 'תעריפים והנחות'
+RATES_HEADERS = ['לקוח', 'חודש', 'שנה', 'סוג', 'ערך']
+
+# Values that need no row in the worksheet
+DEFAULT_VALUES = {'תמחור שעה': 350.0, 'הנחה %': 0.0}
+
+# Writes go through the keyed-upsert layer
+rates_sheet = KeyedSheet(
+    RATES_SHEET_NAME,
+    RATES_HEADERS,
+    ['שנה', 'חודש', 'לקוח', 'סוג'],
+    'billing_SPREADSHEET_ID',
+    header_format={
+        'textFormat': {'bold': True},
+        'backgroundColor': {'red': 0.9, 'green': 0.9, 'blue': 0.9},
+        'horizontalAlignment': 'CENTER',
+        'verticalAlignment': 'MIDDLE'
+    }
+)
+
+
+def _key(year, month, client, change_type):
+    try:
+        return int(str(year).strip()), int(str(month).strip()), str(client).strip(), str(change_type).strip()
+    except ValueError:
+        return None
+
+
+class RatesIndex:
+    """Rows of the rates-and-discounts worksheet keyed by (year, month, client, type).
+
+    When a key appears in several rows the last one wins, as it always did
+    for billing.
+    """
+
+    def __init__(self, headers, records):
+        self._values = {}    # key: value
+        self._months = {}    # (year, month): {client: {type: value}}
+        for record in records:
+            key = _key(record.get('שנה', ''), record.get('חודש', ''), record.get('לקוח', ''), record.get('סוג', ''))
+            if key is None:
+                continue
+            try:
+                value = float(record['ערך']) if record.get('ערך') else 0
+            except (TypeError, ValueError):
+                continue
+            year, month, client, change_type = key
+            self._values[key] = value
+            self._months.setdefault((year, month), {}).setdefault(client, {})[change_type] = value
+
+    def get(self, year, month, client, change_type):
+        """Return the saved value, or None if the default applies."""
+        return self._values.get(_key(year, month, client, change_type))
+
+    def for_month(self, year, month):
+        """Return all overrides of a month as {client: {type: value}}."""
+        return {client: dict(values) for client, values in self._months.get((int(year), int(month)), {}).items()}
+
+    def __len__(self):
+        return len(self._values)
+
+
+def get_rates_index(spreadsheet_id=None, use_cache=True):
+    """Return the index of the rates worksheet (empty if it does not exist)."""
+    spreadsheet_id = spreadsheet_id or os.getenv('billing_SPREADSHEET_ID')
+    try:
+        return get_sheet_index(RATES_SHEET_NAME, RatesIndex, spreadsheet_id=spreadsheet_id, use_cache=use_cache)
+    except gspread.exceptions.WorksheetNotFound:
+        return RatesIndex([], [])
+
+
+def get_month_rates(year, month, spreadsheet_id=None):
+    """Return {client: {type: value}} of the overrides saved for a month."""
+    return get_rates_index(spreadsheet_id).for_month(year, month)
+
+
+def save_rates(changes):
+    """Save several overrides in one round trip.
+
+    ``changes`` are (year, month, client, type, value) tuples; saving the
+    default value removes an override. Returns one of 'added', 'updated',
+    'removed' or 'unchanged' per change.
+    """
+    upserts, deletes, keys = [], [], []
+    for year, month, client, change_type, value in changes:
+        row = {'לקוח': client, 'חודש': str(month), 'שנה': str(year), 'סוג': change_type}
+        if abs(value - DEFAULT_VALUES.get(change_type, 0.0)) < 0.01:
+            deletes.append(row)
+        else:
+            upserts.append(dict(row, **{'ערך': value}))
+        keys.append(rates_sheet.key(row))
+    results = rates_sheet.apply(upserts, deletes)
+    return [results[key] for key in keys]
+
+
+def save_rate(year, month, client, change_type, value):
+    """Upsert one override; saving the default value removes it."""
+    return save_rates([(year, month, client, change_type, value)])[0]
@@ -0,0 +1,119 @@
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime
+
+
+def fingerprint(value):
+    """Return the SHA-256 of a JSON-serializable value, independent of key order."""
+    payload = json.dumps(value, sort_keys=True, ensure_ascii=False, separators=(',', ':'), default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class SnapshotStore:
+    """Computed monthly results persisted as one JSON file per month.
+
+    A snapshot keeps the result, the SHA-256 of its content and the
+    versions of the sources it was computed from ({name: version}).
+    get() returns the result only while those versions are unchanged and
+    the content still hashes to the stored value, so a restarted or new
+    worker serves an unchanged month without recomputing it, and a torn or
+    edited file is recomputed rather than served. A version of None means
+    "unknown" and never matches. Files are replaced atomically, so several
+    workers can share the directory.
+    """
+
+    def __init__(self, directory, name):
+        self.directory = directory
+        self.name = name
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.corrupt = 0
+        self.writes = 0
+        self.last_error = None
+
+    def _path(self, year, month):
+        return os.path.join(self.directory, f"{self.name}-{int(year):04d}-{int(month):02d}.json")
+
+    def _load(self, year, month):
+        try:
+            with open(self._path(year, month), encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            print(f"Error reading {self.name} snapshot {year}-{month:02d}: {e}")
+            return {}
+
+    def get(self, year, month, sources):
+        """Return the stored result of a month, or None if it must be recomputed."""
+        if any(version is None for version in sources.values()):
+            return None
+        snapshot = self._load(year, month)
+        with self._lock:
+            if snapshot is None:
+                self.misses += 1
+                return None
+            if snapshot.get('sources') != sources:
+                self.stale += 1
+                return None
+            if 'data' not in snapshot or fingerprint(snapshot['data']) != snapshot.get('content_hash'):
+                self.corrupt += 1
+                return None
+            self.hits += 1
+        return snapshot['data']
+
+    def put(self, year, month, sources, data):
+        """Persist a month's result; returns its content hash."""
+        content_hash = fingerprint(data)
+        if any(version is None for version in sources.values()):
+            return content_hash
+        snapshot = {
+            'year': int(year),
+            'month': int(month),
+            'computed_at': datetime.now().isoformat(timespec='seconds'),
+            'sources': sources,
+            'content_hash': content_hash,
+            'data': data
+        }
+        path = self._path(year, month)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(snapshot, f, ensure_ascii=False)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+        except OSError as e:
+            self.last_error = f"{type(e).__name__}: {e}"
+            print(f"Error writing {self.name} snapshot {year}-{month:02d}: {e}")
+            return content_hash
+        with self._lock:
+            self.writes += 1
+        return content_hash
+
+    def drop(self, year, month):
+        """Delete a month's snapshot, so it is recomputed on next use."""
+        try:
+            os.remove(self._path(year, month))
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            self.last_error = f"{type(e).__name__}: {e}"
+            print(f"Error deleting {self.name} snapshot {year}-{month:02d}: {e}")
+
+    def status(self):
+        with self._lock:
+            return {
+                'directory': self.directory,
+                'hits': self.hits,
+                'misses': self.misses,
+                'stale': self.stale,
+                'corrupt': self.corrupt,
+                'writes': self.writes,
+                'last_error': self.last_error
+            }
@@ -0,0 +1,235 @@
+import json
+import sqlite3
+import threading
+import time
+import traceback
+
+
+class StorageBackend:
+    """Interface the data-access helpers in utils.google_sheets read through.
+
+    Backends deal in raw worksheet values (a list of rows, header row first),
+    exactly what Worksheet.get_all_values() returns. Turning them into
+    records is left to utils.google_sheets.
+    """
+
+    name = 'base'
+
+    def get_values(self, spreadsheet_id, sheet_name):
+        raise NotImplementedError
+
+    def get_many_values(self, spreadsheet_id, sheet_names):
+        return [self.get_values(spreadsheet_id, name) for name in sheet_names]
+
+    def invalidate(self, spreadsheet_id, sheet_name=None):
+        """Called after a worksheet was written to."""
+
+    def data_version(self, spreadsheet_id):
+        """Return what, besides the file's own version, reads depend on.
+
+        '' when reads go straight to the source; None while unknown.
+        """
+        return ''
+
+    def status(self):
+        return {'backend': self.name}
+
+
+class SQLiteBackend(StorageBackend):
+    """Local SQLite mirror of selected worksheets.
+
+    ``mirrored`` lists the (spreadsheet_id, sheet_name) worksheets to
+    mirror. Reads of mirrored worksheets are served from the
+    database; everything else is passed to ``source``. Google Sheets stays
+    the source of truth: a background thread re-pulls every mirrored
+    worksheet each ``interval`` seconds, and a worksheet that was written to
+    is re-read from ``source`` on its next access.
+    """
+
+    name = 'sqlite'
+
+    def __init__(self, source, db_path, mirrored, interval=300):
+        self.source = source
+        self.db_path = db_path
+        self.mirrored = set(mirrored)
+        self.interval = interval
+        self._lock = threading.RLock()
+        self._stale = set(self.mirrored)
+        self._versions = {}  # bumped by invalidate() to detect racing refreshes
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._create_schema()
+        self.last_sync = None
+        self.last_error = None
+        self.local_reads = 0
+        self.source_reads = 0
+        self._thread = threading.Thread(target=self._run, name='sqlite-mirror-sync', daemon=True)
+        self._thread.start()
+
+    def _create_schema(self):
+        with self._lock, self._conn:
+            self._conn.executescript('''
+                CREATE TABLE IF NOT EXISTS sheets (
+                    spreadsheet_id TEXT NOT NULL,
+                    sheet_name TEXT NOT NULL,
+                    header TEXT NOT NULL,
+                    synced_at REAL NOT NULL,
+                    PRIMARY KEY (spreadsheet_id, sheet_name)
+                );
+                CREATE TABLE IF NOT EXISTS rows (
+                    spreadsheet_id TEXT NOT NULL,
+                    sheet_name TEXT NOT NULL,
+                    row_number INTEGER NOT NULL,
+                    cells TEXT NOT NULL,
+                    PRIMARY KEY (spreadsheet_id, sheet_name, row_number)
+                );
+                DROP TABLE IF EXISTS row_index;
+            ''')
+
+    def get_values(self, spreadsheet_id, sheet_name):
+        key = (spreadsheet_id, sheet_name)
+        if key not in self.mirrored:
+            self.source_reads += 1
+            return self.source.get_values(spreadsheet_id, sheet_name)
+        if key in self._stale:
+            self.refresh(spreadsheet_id, [sheet_name])
+        self.local_reads += 1
+        return self._load(spreadsheet_id, sheet_name)
+
+    def get_many_values(self, spreadsheet_id, sheet_names):
+        stale = [
+            name for name in sheet_names
+            if (spreadsheet_id, name) in self.mirrored and (spreadsheet_id, name) in self._stale
+        ]
+        if stale:
+            self.refresh(spreadsheet_id, stale)
+        unmirrored = [name for name in sheet_names if (spreadsheet_id, name) not in self.mirrored]
+        fetched = {}
+        if unmirrored:
+            self.source_reads += 1
+            fetched = dict(zip(unmirrored, self.source.get_many_values(spreadsheet_id, unmirrored)))
+        results = []
+        for name in sheet_names:
+            if name in fetched:
+                results.append(fetched[name])
+            else:
+                self.local_reads += 1
+                results.append(self._load(spreadsheet_id, name))
+        return results
+
+    def invalidate(self, spreadsheet_id, sheet_name=None):
+        with self._lock:
+            for key in self.mirrored:
+                if key[0] == spreadsheet_id and (sheet_name is None or key[1] == sheet_name):
+                    self._stale.add(key)
+                    self._versions[key] = self._versions.get(key, 0) + 1
+
+    def data_version(self, spreadsheet_id):
+        # The mirror can lag behind the file until the next full sync
+        if not any(key[0] == spreadsheet_id for key in self.mirrored):
+            return ''
+        return self.last_sync
+
+    def refresh(self, spreadsheet_id, sheet_names):
+        """Pull the given worksheets from source into the mirror."""
+        with self._lock:
+            versions = [self._versions.get((spreadsheet_id, name), 0) for name in sheet_names]
+        if len(sheet_names) == 1:
+            # Lets a missing worksheet surface as the source's own error
+            payloads = [self.source.get_values(spreadsheet_id, sheet_names[0])]
+        else:
+            payloads = self.source.get_many_values(spreadsheet_id, sheet_names)
+        self.source_reads += 1
+        for name, values, version in zip(sheet_names, payloads, versions):
+            self._store(spreadsheet_id, name, values, version)
+
+    def sync_all(self):
+        """Re-pull every mirrored worksheet, one batch per spreadsheet."""
+        by_spreadsheet = {}
+        for spreadsheet_id, sheet_name in self.mirrored:
+            by_spreadsheet.setdefault(spreadsheet_id, []).append(sheet_name)
+        for spreadsheet_id, sheet_names in by_spreadsheet.items():
+            try:
+                self.refresh(spreadsheet_id, sheet_names)
+            except Exception:
+                # A missing worksheet fails the whole batch; retry one by one
+                for sheet_name in sheet_names:
+                    try:
+                        self.refresh(spreadsheet_id, [sheet_name])
+                    except Exception as e:
+                        self.last_error = f"{sheet_name}: {type(e).__name__}: {e}"
+                        print(f"Error syncing {sheet_name} into SQLite mirror: {e}")
+        self.last_sync = time.time()
+
+    def _store(self, spreadsheet_id, sheet_name, values, version=0):
+        header = values[0] if values else []
+        with self._lock, self._conn:
+            self._conn.execute(
+                'DELETE FROM rows WHERE spreadsheet_id = ? AND sheet_name = ?',
+                (spreadsheet_id, sheet_name)
+            )
+            self._conn.execute(
+                'INSERT OR REPLACE INTO sheets (spreadsheet_id, sheet_name, header, synced_at) '
+                'VALUES (?, ?, ?, ?)',
+                (spreadsheet_id, sheet_name, json.dumps(header, ensure_ascii=False), time.time())
+            )
+            self._conn.executemany(
+                'INSERT INTO rows (spreadsheet_id, sheet_name, row_number, cells) VALUES (?, ?, ?, ?)',
+                [
+                    (spreadsheet_id, sheet_name, row_number, json.dumps(row, ensure_ascii=False))
+                    for row_number, row in enumerate(values[1:], start=2)
+                ]
+            )
+            # Stay stale if the worksheet was written to while we were reading
+            if self._versions.get((spreadsheet_id, sheet_name), 0) == version:
+                self._stale.discard((spreadsheet_id, sheet_name))
+
+    def _load(self, spreadsheet_id, sheet_name):
+        with self._lock:
+            header_row = self._conn.execute(
+                'SELECT header FROM sheets WHERE spreadsheet_id = ? AND sheet_name = ?',
+                (spreadsheet_id, sheet_name)
+            ).fetchone()
+            if header_row is None:
+                return []
+            rows = self._conn.execute(
+                'SELECT cells FROM rows WHERE spreadsheet_id = ? AND sheet_name = ? ORDER BY row_number',
+                (spreadsheet_id, sheet_name)
+            ).fetchall()
+        header = json.loads(header_row[0])
+        if not header and not rows:
+            return []
+        return [header] + [json.loads(cells) for (cells,) in rows]
+
+    def _run(self):
+        while True:
+            try:
+                self.sync_all()
+            except Exception as e:
+                self.last_error = f"{type(e).__name__}: {e}"
+                print(f"Error in SQLite mirror sync: {e}")
+                traceback.print_exc()
+            time.sleep(self.interval)
+
+    def status(self):
+        with self._lock:
+            sheets = self._conn.execute(
+                'SELECT s.spreadsheet_id, s.sheet_name, s.synced_at, COUNT(r.row_number) '
+                'FROM sheets s LEFT JOIN rows r '
+                'ON r.spreadsheet_id = s.spreadsheet_id AND r.sheet_name = s.sheet_name '
+                'GROUP BY s.spreadsheet_id, s.sheet_name'
+            ).fetchall()
+        return {
+            'backend': self.name,
+            'db_path': self.db_path,
+            'interval': self.interval,
+            'last_sync': self.last_sync,
+            'last_error': self.last_error,
+            'local_reads': self.local_reads,
+            'source_reads': self.source_reads,
+            'stale': sorted(name for _, name in self._stale),
+            'sheets': [
+                {'sheet_name': name, 'rows': count, 'synced_at': synced_at}
+                for _, name, synced_at, count in sheets
+            ]
+        }
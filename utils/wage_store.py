@@ -0,0 +1,86 @@
+import os
+from datetime import datetime
+
+import gspread
+
+from utils.google_sheets import get_sheet_index
+from utils.keyed_sheet import KeyedSheet
+
+WAGES_SHEET_NAME = 'שכר שעה'
+WAGES_HEADERS = ['מדריך', 'חודש', 'שנה', 'שכר שעה', 'תאריך עדכון']
+DEFAULT_HOURLY_WAGE = 200
+
+# Writes go through the keyed-upsert layer
+wages_sheet = KeyedSheet(WAGES_SHEET_NAME, WAGES_HEADERS, ['מדריך', 'חודש', 'שנה'], 'payment_SPREADSHEET_ID')
+
+
+def _key(instructor, month, year):
+    try:
+        return str(instructor).strip(), int(str(month).strip()), int(str(year).strip())
+    except ValueError:
+        return None
+
+
+class WageIndex:
+    """Saved hourly wages keyed by (instructor, month, year).
+
+    When a key appears in several rows the last one wins, as before.
+    """
+
+    def __init__(self, headers, records):
+        self.wages = {}  # key: wage
+        for record in records:
+            key = _key(record.get('מדריך', ''), record.get('חודש', ''), record.get('שנה', ''))
+            if key is None:
+                continue
+            try:
+                self.wages[key] = float(record.get('שכר שעה'))
+            except (TypeError, ValueError):
+                continue
+
+    def get(self, instructor, month, year):
+        """Return the saved wage, or None if the default applies."""
+        return self.wages.get(_key(instructor, month, year))
+
+    def __len__(self):
+        return len(self.wages)
+
+
+def get_wage_index(spreadsheet_id=None, use_cache=True):
+    """Return the index of the wages worksheet (empty if it does not exist).
+
+    The worksheet is read once and then served from the sheet cache, so
+    a payroll page costs one read however many instructors it shows.
+    """
+    spreadsheet_id = spreadsheet_id or os.getenv('payment_SPREADSHEET_ID')
+    if not spreadsheet_id:
+        return WageIndex([], [])
+    try:
+        return get_sheet_index(WAGES_SHEET_NAME, WageIndex, spreadsheet_id=spreadsheet_id, use_cache=use_cache)
+    except gspread.exceptions.WorksheetNotFound:
+        return WageIndex([], [])
+
+
+def load_hourly_wages(spreadsheet_id=None):
+    """Return all saved wages as {(instructor, month, year): wage}."""
+    return dict(get_wage_index(spreadsheet_id).wages)
+
+
+def save_wages(changes):
+    """Save several wages in one round trip.
+
+    ``changes`` are (instructor, month, year, wage) tuples; saving the
+    default wage removes the row. Returns one of 'added', 'updated',
+    'removed' or 'unchanged' per change.
+    """
+    updated_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    upserts, deletes, keys = [], [], []
+    for instructor, month, year, wage in changes:
+        row = {'מדריך': instructor, 'חודש': month, 'שנה': year}
+        if abs(float(wage) - DEFAULT_HOURLY_WAGE) < 0.01:
+            deletes.append(row)
+        else:
+            upserts.append(dict(row, **{'שכר שעה': wage, 'תאריך עדכון': updated_at}))
+        keys.append(wages_sheet.key(row))
+    results = wages_sheet.apply(upserts, deletes)
+    return [results[key] for key in keys]
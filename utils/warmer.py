@@ -0,0 +1,79 @@
+import random
+import threading
+import time
+import traceback
+from datetime import datetime
+
+
+class CacheWarmer:
+    """Background thread that keeps caches hot by re-running jobs.
+
+    ``jobs`` maps a job name to a zero-argument callable. All jobs run once
+    right after start() and then every ``interval`` seconds, stretched or
+    shortened at random by up to ``jitter`` (a fraction of the interval) so
+    several workers do not hit Google in lockstep.
+    """
+
+    def __init__(self, jobs, interval=45.0, jitter=0.2):
+        self.jobs = dict(jobs)
+        self.interval = interval
+        self.jitter = jitter
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self.runs = 0
+        self.last_run = None
+        self.next_run = None
+        self.job_status = {
+            name: {'last_success': None, 'last_error': None, 'duration': None, 'failures': 0}
+            for name in self.jobs
+        }
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name='cache-warmer', daemon=True)
+            self._thread.start()
+
+    def trigger(self):
+        """Run all jobs now instead of waiting for the next round."""
+        self._wakeup.set()
+
+    def run_once(self):
+        for name, job in self.jobs.items():
+            status = self.job_status[name]
+            started = time.monotonic()
+            try:
+                job()
+                status['last_success'] = datetime.now().isoformat(timespec='seconds')
+            except Exception as e:
+                status['failures'] += 1
+                status['last_error'] = f"{type(e).__name__}: {e}"
+                print(f"Error warming {name}: {e}")
+                traceback.print_exc()
+            status['duration'] = round(time.monotonic() - started, 3)
+        self.runs += 1
+        self.last_run = datetime.now().isoformat(timespec='seconds')
+
+    def _delay(self):
+        return max(1.0, self.interval * (1 + random.uniform(-self.jitter, self.jitter)))
+
+    def _run(self):
+        while True:
+            self.run_once()
+            delay = self._delay()
+            self.next_run = datetime.fromtimestamp(time.time() + delay).isoformat(timespec='seconds')
+            self._wakeup.wait(delay)
+            self._wakeup.clear()
+
+    def status(self):
+        return {
+            'running': self._thread is not None and self._thread.is_alive(),
+            'interval': self.interval,
+            'jitter': self.jitter,
+            'runs': self.runs,
+            'last_run': self.last_run,
+            'next_run': self.next_run,
+            'jobs': {name: dict(status) for name, status in self.job_status.items()}
+        }
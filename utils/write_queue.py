@@ -0,0 +1,272 @@
+import json
+import os
+import threading
+import time
+import traceback
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:  # Windows: a single process is assumed
+    fcntl = None
+
+from utils.rate_limit import RETRY_STATUSES, error_status
+
+
+class JournalLockedError(Exception):
+    """Raised when another process already owns a write-queue journal."""
+
+    def __init__(self, journal_path):
+        super().__init__(f"{journal_path} is owned by another process")
+        self.journal_path = journal_path
+
+
+def _retryable(error):
+    # Quota, server and network errors; anything else Google rejected
+    status = error_status(error)
+    return status is None or status in RETRY_STATUSES
+
+
+class WriteBehindQueue:
+    """Coalescing write-behind queue for row updates.
+
+    Updates are keyed by (spreadsheet_id, sheet_name, row) and merged column
+    by column, so several saves of the same row before a flush cost a single
+    write. A background thread hands everything pending to ``flush_fn`` every
+    ``interval`` seconds, one call per spreadsheet:
+
+        flush_fn(spreadsheet_id, {(sheet_name, row): {col: value}})
+
+    Every accepted update is appended to a JSON-lines journal first and the
+    journal is replayed on start-up, so acknowledged edits survive a restart.
+    The queue holds an exclusive lock on ``<journal>.lock`` for its
+    lifetime; a second queue on the same journal, e.g. in another worker
+    process, raises JournalLockedError instead of replaying and rewriting
+    the owner's edits.
+
+    A failed flush is retried on the next round. A row whose write was
+    rejected outright (a 4xx such as a bad range or a deleted worksheet),
+    or that failed ``max_attempts`` times, is moved to ``dead_letters``
+    and reported in status() instead of blocking the rows behind it.
+    """
+
+    def __init__(self, flush_fn, journal_path=None, interval=2.0, max_attempts=5, max_dead_letters=100):
+        self.flush_fn = flush_fn
+        self.journal_path = journal_path
+        self.interval = interval
+        self.max_attempts = max_attempts
+        self.max_dead_letters = max_dead_letters
+        self._pending = {}  # (spreadsheet_id, sheet_name, row): {col: value}
+        self._attempts = {}  # (spreadsheet_id, sheet_name, row): failed flushes
+        self.dead_letters = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self.enqueued = 0
+        self.coalesced = 0
+        self.flushed_batches = 0
+        self.flushed_rows = 0
+        self.failures = 0
+        self.last_flush = None
+        self.last_error = None
+        self._lock_file = self._lock_journal()
+        self._replay_journal()
+
+    def enqueue(self, spreadsheet_id, sheet_name, row, updates):
+        """Queue {col_index: value} updates (1-indexed) for one row."""
+        key = (spreadsheet_id, sheet_name, int(row))
+        updates = {int(col): ('' if value is None else value) for col, value in updates.items()}
+        with self._lock:
+            self._journal_append(key, updates)
+            if key in self._pending:
+                self._pending[key].update(updates)
+                self.coalesced += 1
+            else:
+                self._pending[key] = dict(updates)
+            self.enqueued += 1
+        self._ensure_worker()
+
+    def pending_for(self, spreadsheet_id, sheet_name):
+        """Return {row: {col: value}} of unflushed updates for a worksheet."""
+        with self._lock:
+            return {
+                key[2]: dict(updates)
+                for key, updates in self._pending.items()
+                if key[0] == spreadsheet_id and key[1] == sheet_name
+            }
+
+    def flush(self):
+        """Write everything pending now. Returns the number of rows written."""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, {}
+            if not batch:
+                return 0
+
+            by_spreadsheet = {}
+            for (spreadsheet_id, sheet_name, row), updates in batch.items():
+                by_spreadsheet.setdefault(spreadsheet_id, {})[(sheet_name, row)] = updates
+
+            written = 0
+            failed = {}  # key: error
+            for spreadsheet_id, row_updates in by_spreadsheet.items():
+                written += self._flush_batch(spreadsheet_id, row_updates, failed)
+
+            with self._lock:
+                for key, updates in batch.items():
+                    if key not in failed:
+                        self._attempts.pop(key, None)
+                        continue
+                    attempts = self._attempts.get(key, 0) + 1
+                    if not _retryable(failed[key]) or attempts >= self.max_attempts:
+                        self._dead_letter(key, updates, failed[key], attempts)
+                        continue
+                    # Put back what failed; newer edits win over older ones
+                    self._attempts[key] = attempts
+                    merged = dict(updates)
+                    merged.update(self._pending.get(key, {}))
+                    self._pending[key] = merged
+                self._rewrite_journal()
+
+            self.flushed_rows += written
+            self.last_flush = datetime.now().isoformat(timespec='seconds')
+            return written
+
+    def _flush_batch(self, spreadsheet_id, row_updates, failed):
+        """Write one spreadsheet's rows; records failed keys in ``failed``."""
+        try:
+            self.flush_fn(spreadsheet_id, row_updates)
+            self.flushed_batches += 1
+            return len(row_updates)
+        except Exception as e:
+            self.failures += 1
+            self.last_error = f"{type(e).__name__}: {e}"
+            print(f"Error flushing write queue for {spreadsheet_id}: {e}")
+            traceback.print_exc()
+            if _retryable(e) or len(row_updates) == 1:
+                for sheet_name, row in row_updates:
+                    failed[(spreadsheet_id, sheet_name, row)] = e
+                return 0
+        # Rejected outright: write the rows one by one to find the bad ones
+        return sum(
+            self._flush_batch(spreadsheet_id, {key: updates}, failed)
+            for key, updates in row_updates.items()
+        )
+
+    def _dead_letter(self, key, updates, error, attempts):
+        self._attempts.pop(key, None)
+        self.dead_letters.append({
+            'spreadsheet_id': key[0],
+            'sheet_name': key[1],
+            'row': key[2],
+            'updates': {str(col): value for col, value in updates.items()},
+            'attempts': attempts,
+            'error': f"{type(error).__name__}: {error}",
+            'at': datetime.now().isoformat(timespec='seconds')
+        })
+        del self.dead_letters[:-self.max_dead_letters]
+        print(f"Gave up writing row {key[2]} of {key[1]} after {attempts} attempts: {error}")
+
+    def status(self):
+        with self._lock:
+            pending = len(self._pending)
+        return {
+            'pending_rows': pending,
+            'enqueued': self.enqueued,
+            'coalesced': self.coalesced,
+            'flushed_batches': self.flushed_batches,
+            'flushed_rows': self.flushed_rows,
+            'failures': self.failures,
+            'dead_letters': list(self.dead_letters),
+            'last_flush': self.last_flush,
+            'last_error': self.last_error,
+            'interval': self.interval,
+            'journal': self.journal_path
+        }
+
+    def _ensure_worker(self):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name='sheets-write-behind', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Error in write queue worker: {e}")
+                time.sleep(self.interval)
+
+    def close(self):
+        """Release the journal, e.g. before another queue takes it over."""
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+
+    # Journal (JSON lines, one accepted update per line)
+
+    def _lock_journal(self):
+        if not self.journal_path or fcntl is None:
+            return None
+        lock_file = open(self.journal_path + '.lock', 'a')
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            raise JournalLockedError(self.journal_path)
+        return lock_file
+
+    def _journal_append(self, key, updates):
+        if not self.journal_path:
+            return
+        entry = {
+            'spreadsheet_id': key[0],
+            'sheet_name': key[1],
+            'row': key[2],
+            'updates': [[col, value] for col, value in updates.items()]
+        }
+        with open(self.journal_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _rewrite_journal(self):
+        if not self.journal_path:
+            return
+        tmp_path = self.journal_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for key, updates in self._pending.items():
+                f.write(json.dumps({
+                    'spreadsheet_id': key[0],
+                    'sheet_name': key[1],
+                    'row': key[2],
+                    'updates': [[col, value] for col, value in updates.items()]
+                }, ensure_ascii=False) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.journal_path)
+
+    def _replay_journal(self):
+        if not self.journal_path or not os.path.exists(self.journal_path):
+            return
+        replayed = 0
+        with open(self.journal_path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # A torn last line from a crash mid-write
+                    continue
+                key = (entry['spreadsheet_id'], entry['sheet_name'], int(entry['row']))
+                self._pending.setdefault(key, {}).update(
+                    {int(col): value for col, value in entry['updates']}
+                )
+                replayed += 1
+        if self._pending:
+            print(f"Replayed {replayed} journaled sheet updates ({len(self._pending)} rows)")
+            self._ensure_worker()